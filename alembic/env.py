@@ -4,6 +4,9 @@ from sqlalchemy import engine_from_config, pool
 
 from alembic import context
 from app.core.postgres_database import DATABASE_URL, Base
+from app.models.tables.account_balance_model import (  # pylint: disable=unused-import
+    AccountBalance,
+)
 from app.models.tables.account_model import Account  # pylint: disable=unused-import
 from app.models.tables.customer_model import Customer  # pylint: disable=unused-import
 from app.models.tables.transaction_model import (
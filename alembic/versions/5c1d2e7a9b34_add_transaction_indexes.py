@@ -0,0 +1,80 @@
+"""add transaction indexes
+
+Revision ID: 5c1d2e7a9b34
+Revises: 0adbf64e1fd6
+Create Date: 2026-10-18 10:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d2e7a9b34'
+down_revision: Union[str, Sequence[str], None] = '0adbf64e1fd6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so writes to ``transaction`` are not blocked while the
+    # indexes are created; CREATE INDEX CONCURRENTLY cannot run in a transaction.
+    with op.get_context().autocommit_block():
+        # count_transaction_by_user_channel / get_recent_transactions:
+        # equality on the pair and channel, range on created_at, reads amount.
+        op.create_index(
+            'ix_transaction_velocity',
+            'transaction',
+            ['origin_account_id', 'destination_account_id', 'channel', 'created_at'],
+            unique=False,
+            postgresql_include=['amount'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Account statement and balance: origin OR destination = account,
+        # ORDER BY created_at DESC; each side of the OR uses its own index.
+        op.create_index(
+            'ix_transaction_origin_created_at',
+            'transaction',
+            ['origin_account_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_include=['amount'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_transaction_destination_created_at',
+            'transaction',
+            ['destination_account_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_include=['amount'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.execute('ANALYZE transaction')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transaction_destination_created_at',
+            table_name='transaction',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_transaction_origin_created_at',
+            table_name='transaction',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_transaction_velocity',
+            table_name='transaction',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,51 @@
+"""create account balance
+
+Revision ID: 9e4b7f2c1a86
+Revises: 5c1d2e7a9b34
+Create Date: 2026-10-18 11:02:17.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7f2c1a86'
+down_revision: Union[str, Sequence[str], None] = '5c1d2e7a9b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('account_balance',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['account.id'], ),
+    sa.PrimaryKeyConstraint('account_id')
+    )
+    # Backfill from the ledger. The transaction table is locked against writes
+    # (reads still allowed) so no insert is missed between the sum and the switch.
+    op.execute('LOCK TABLE transaction IN SHARE MODE')
+    op.execute(
+        """
+        INSERT INTO account_balance (account_id, balance, updated_at)
+        SELECT account_id, sum(delta), localtimestamp
+        FROM (
+            SELECT destination_account_id AS account_id, amount AS delta
+            FROM transaction
+            UNION ALL
+            SELECT origin_account_id AS account_id, -amount AS delta
+            FROM transaction
+        ) movements
+        GROUP BY account_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('account_balance')
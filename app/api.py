@@ -1,17 +1,55 @@
 """FastAPI application entry point."""
 
-from fastapi import APIRouter, FastAPI, Request, status
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI, Request, Response, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse, RedirectResponse
 
 from app.__version__ import get_version
-from app.core.config import APPLICATION_PORT, FASTAPI_CONFIG
-from app.helpers.mongo_helper import MongoHelper
-from app.models.collections.rules_model import Rule
+from app.core.config import APPLICATION_PORT, FASTAPI_CONFIG, REQUEST_LOG_ENABLED
+from app.core.mongo_database import close_async_mongo, close_mongo, init_mongo
+from app.core.postgres_database import async_engine
+from app.core.request_audit import RequestAuditMiddleware
+from app.helpers.async_frequency_buffer_helper import frequency_buffer
+from app.helpers.async_request_log_helper import request_log_writer
+from app.helpers.balance_helper import balance_reconciler
+from app.helpers.rule_cache_helper import rule_cache
 from app.routes.customer_routes import router as customer_router
+from app.routes.metrics_routes import router as metrics_router
 from app.routes.transaction_routes import router as transaction_router
 
-app = FastAPI(**FASTAPI_CONFIG)
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    Application lifespan.
+
+    Creates the pooled MongoDB client, warms the rule cache and starts its
+    background refresh on startup, along with the balance reconciliation job if
+    enabled, the request audit log writer and the destination frequency
+    write-behind buffer; stops them (writing the queued audit entries and, unless
+    in fire-and-forget mode, the buffered frequency increments) and closes the
+    database clients (synchronous and asyncio) on shutdown.
+    """
+    init_mongo()
+    rule_cache.start()
+    balance_reconciler.start()
+    request_log_writer.start()
+    frequency_buffer.start()
+    yield
+    await frequency_buffer.stop()
+    await request_log_writer.stop()
+    balance_reconciler.stop()
+    rule_cache.stop()
+    close_mongo()
+    await close_async_mongo()
+    await async_engine.dispose()
+
+
+app = FastAPI(**FASTAPI_CONFIG, lifespan=lifespan)
+if REQUEST_LOG_ENABLED:
+    app.add_middleware(RequestAuditMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -37,20 +75,19 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 
 @app.get("/rules")
-def get_rules():
+def get_rules(response: Response):
     """
-    Retrieves the list of known destinations.
+    Retrieves the rules used to evaluate the risk of a transaction.
 
-    This endpoint is used to retrieve the list of known destination accounts,
-    which are used to evaluate the risk of a transaction.
+    The rules are served from the in-process rule cache. The version of the
+    cached rule set is returned in the ``X-Rules-Version`` header, so operators
+    can check that every worker converged to the same rule set.
 
     Returns:
-        List[KnowlegedDestinations]: A list of known destination accounts.
+        List[dict]: The rules, with their name and conditions.
     """
-    mongo_helper = MongoHelper()
-    result = [rule.to_mongo().to_dict() for rule in mongo_helper.find_documents(Rule)]
-    for item in result:
-        item.pop("_id")
+    result = rule_cache.get_documents()
+    response.headers["X-Rules-Version"] = rule_cache.version
     return result
 
 
@@ -80,6 +117,7 @@ def version():
 api_router = APIRouter()
 api_router.include_router(customer_router, tags=["customers"])
 api_router.include_router(transaction_router, tags=["transaction"])
+api_router.include_router(metrics_router, tags=["metrics"])
 app.include_router(api_router)
 
 if __name__ == "__main__":
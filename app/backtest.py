@@ -0,0 +1,113 @@
+"""
+Replays stored transactions through the rules to measure what they would flag.
+
+Usage::
+
+    python -m app.backtest --start 2025-01-01 --end 2025-02-01
+    python -m app.backtest --start 2025-01-01 --end 2025-02-01 --rules draft.json
+
+Rules are read from the ``rules`` collection, or from a JSON file mapping rule
+names to their conditions (the format of ``app.migrate.INITIAL_RULES``) to try
+a rule before saving it. Every transaction of the range is evaluated as of its
+own timestamp: the velocity and destination frequency transforms only see the
+transactions made before it. The report gives the hits per rule and how the
+result differs from the stored ``suspect`` flags.
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+
+from rich.console import Console
+from rich.table import Table
+
+from app.core.mongo_database import close_mongo, init_mongo
+from app.helpers.backtest_helper import BacktestHelper, BacktestResult
+from app.helpers.rule_cache_helper import rule_cache
+
+
+def load_rule_documents(path: str = None) -> dict:
+    """
+    Reads the rules to replay.
+
+    Args:
+        path (str): A JSON file of conditions per rule name; when not given,
+            the rules collection is read.
+
+    Returns:
+        dict: The conditions per rule name.
+    """
+    if path:
+        with open(path, encoding="utf-8") as stream:
+            return json.load(stream)
+    init_mongo()
+    try:
+        return {item["name"]: item["conditions"] for item in rule_cache.get_documents()}
+    finally:
+        close_mongo()
+
+
+def print_report(result: BacktestResult, rule_names: list, console: Console):
+    """Prints the hits per rule and the difference with the stored flags."""
+    evaluated = result.evaluated or 1
+    rules = Table(title=f"Rule hits ({result.evaluated:,} transactions)")
+    rules.add_column("Rule")
+    rules.add_column("Hits", justify="right")
+    rules.add_column("%", justify="right")
+    for name in rule_names:
+        hits = result.rule_hits[name]
+        rules.add_row(name, f"{hits:,}", f"{hits / evaluated:.2%}")
+    console.print(rules)
+
+    diff = Table(title="Replayed vs stored suspect flags")
+    diff.add_column("")
+    diff.add_column("Transactions", justify="right")
+    diff.add_row("Flagged now", f"{result.flagged:,}")
+    diff.add_row("Stored as suspect", f"{result.stored_suspect:,}")
+    diff.add_row("Newly flagged", f"{result.newly_flagged:,}")
+    diff.add_row("No longer flagged", f"{result.cleared:,}")
+    console.print(diff)
+    if result.newly_flagged_ids:
+        console.print("Newly flagged, e.g.: " + ", ".join(result.newly_flagged_ids))
+    if result.cleared_ids:
+        console.print("No longer flagged, e.g.: " + ", ".join(result.cleared_ids))
+
+
+def main():
+    """Parses the command line and runs the backtest."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--start", type=datetime.fromisoformat, required=True, help="ISO date or time"
+    )
+    parser.add_argument(
+        "--end",
+        type=datetime.fromisoformat,
+        required=True,
+        help="ISO date or time, excluded",
+    )
+    parser.add_argument("--rules", help="JSON file of conditions per rule name")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="processes, each replaying a range of origin accounts "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=20,
+        help="differing transaction ids listed (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    rule_documents = load_rule_documents(args.rules)
+    result = BacktestHelper().run(
+        rule_documents, args.start, args.end, args.workers, args.samples
+    )
+    print_report(result, list(rule_documents), Console())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Loads historical transactions from CSV or NDJSON files with PostgreSQL COPY.
+
+Usage::
+
+    python -m app.bulk_load 2023.csv 2024.jsonl
+    python -m app.bulk_load --score --batch-size 100000 history.jsonl
+
+Each record has the ``PutTransactionRequest`` fields (CSV files name them in
+their header). Transactions whose id is already stored are skipped, so a load
+can be run again after a failure. With ``--score`` every transaction is
+evaluated by the rules as of its own timestamp, against the transactions
+loaded before it; the files must then be given in chronological order.
+"""
+
+import argparse
+import sys
+from typing import Iterator, List
+
+from rich.console import Console
+from rich.table import Table
+
+from app.core.config import BULK_LOAD_BATCH_SIZE
+from app.core.mongo_database import close_mongo, init_mongo
+from app.helpers.bulk_load_helper import (
+    BulkLoadHelper,
+    BulkLoadStats,
+    Record,
+    read_csv,
+    read_ndjson,
+)
+
+
+def read_files(paths: List[str], file_format: str) -> Iterator[Record]:
+    """
+    Reads the records of every file, in order.
+
+    Args:
+        paths (List[str]): The files, or - for stdin.
+        file_format (str): csv, ndjson, or auto to pick it from each file extension.
+
+    Yields:
+        Record: The records read.
+    """
+    for path in paths:
+        current = file_format
+        if current == "auto":
+            current = "csv" if path.lower().endswith(".csv") else "ndjson"
+        reader = read_csv if current == "csv" else read_ndjson
+        if path == "-":
+            yield from reader(sys.stdin)
+        else:
+            with open(path, encoding="utf-8", newline="") as stream:
+                yield from reader(stream)
+
+
+def print_report(stats: BulkLoadStats, console: Console):
+    """Prints the counters and the throughput of a load."""
+    table = Table(title="Bulk load")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row("Records read", f"{stats.read:,}")
+    table.add_row("Loaded", f"{stats.loaded:,}")
+    table.add_row("Skipped (id already stored)", f"{stats.duplicates:,}")
+    table.add_row("Suspect", f"{stats.suspect:,}")
+    for reason, count in stats.rejected.most_common():
+        table.add_row(f"Rejected: {reason}", f"{count:,}")
+    table.add_row("Elapsed", f"{stats.elapsed:.1f} s")
+    table.add_row("Throughput", f"{stats.rows_per_second:,.0f} rows/s")
+    console.print(table)
+
+
+def main():
+    """Parses the command line and runs the load."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("paths", nargs="+", help="files to load, or - for stdin")
+    parser.add_argument(
+        "--format",
+        choices=("auto", "csv", "ndjson"),
+        default="auto",
+        help="input format (default: from the file extension)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BULK_LOAD_BATCH_SIZE,
+        help="transactions per COPY (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--score", action="store_true", help="flag suspect transactions with the rules"
+    )
+    args = parser.parse_args()
+
+    init_mongo()
+    try:
+        helper = BulkLoadHelper(batch_size=args.batch_size, score=args.score)
+        stats = helper.load(read_files(args.paths, args.format))
+    finally:
+        close_mongo()
+    print_report(stats, Console(stderr=True))
+    if stats.rejected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
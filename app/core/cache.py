@@ -0,0 +1,127 @@
+"""In-process LRU cache with per-entry expiration."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """
+    Thread-safe, bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    When the cache is full the least recently used entry is evicted.
+    A ``maxsize`` of zero disables the cache.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups not found in the cache, including expired entries.
+        evictions (int): Entries dropped because the cache was full.
+        expirations (int): Entries dropped because they expired.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value for ``key``.
+
+        Args:
+            key (Hashable): The cache key.
+            default (Any): Returned when the key is missing or expired.
+
+        Returns:
+            Any: The cached value, or ``default``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Stores ``value`` under ``key``, evicting the least recently used entries
+        if the cache is full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to cache.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """
+        Removes ``key`` from the cache, if present.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Removes every entry for which ``predicate(key, value)`` is true.
+
+        Args:
+            predicate (Callable[[Hashable, Any], bool]): The selection function.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        with self._lock:
+            keys = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Size, limits, hit/miss/eviction/expiration counters and hit ratio.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -9,15 +9,111 @@ POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_PORT = 5432
 POSTGRES_HOST = os.getenv("POSTGRES_CONTAINER_NAME")
+POSTGRES_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "20"))
+POSTGRES_MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW", "20"))
 # MongoDB
 MONGO_USERNAME = os.getenv("MONGO_USERNAME")
 MONGO_PASSWORD = os.getenv("MONGO_PASSWORD")
 MONGO_PORT = 27017
 MONGO_DB = "test"
 MONGO_HOST = os.getenv("MONGO_CONTAINER_NAME")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+)
 
 APPLICATION_PORT = int(os.getenv("APPLICATION_PORT"))
 
+# Logging: "dev" writes colored console lines on the calling thread; "prod" writes
+# JSON lines from a background thread, keeping LOG_INFO_SAMPLE_RATE of the records
+# below WARNING and dropping records when LOG_QUEUE_SIZE are already waiting.
+LOG_MODE = os.getenv("LOG_MODE", "dev").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_INFO_SAMPLE_RATE = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1.0"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Request audit log: API calls are queued (up to REQUEST_LOG_QUEUE_SIZE, dropped
+# beyond) and written to request_log by a background task, REQUEST_LOG_BATCH_SIZE
+# at a time or every REQUEST_LOG_FLUSH_INTERVAL_SECONDS. Batches not written within
+# REQUEST_LOG_WRITE_TIMEOUT_SECONDS are appended to REQUEST_LOG_SPILL_PATH as JSON
+# lines (dropped if unset). Bodies above REQUEST_LOG_MAX_BODY_BYTES are not kept.
+REQUEST_LOG_ENABLED = os.getenv("REQUEST_LOG_ENABLED", "true").lower() == "true"
+REQUEST_LOG_QUEUE_SIZE = int(os.getenv("REQUEST_LOG_QUEUE_SIZE", "10000"))
+REQUEST_LOG_BATCH_SIZE = int(os.getenv("REQUEST_LOG_BATCH_SIZE", "500"))
+REQUEST_LOG_FLUSH_INTERVAL_SECONDS = float(
+    os.getenv("REQUEST_LOG_FLUSH_INTERVAL_SECONDS", "1.0")
+)
+REQUEST_LOG_WRITE_TIMEOUT_SECONDS = float(
+    os.getenv("REQUEST_LOG_WRITE_TIMEOUT_SECONDS", "2.0")
+)
+REQUEST_LOG_SPILL_PATH = os.getenv("REQUEST_LOG_SPILL_PATH", "")
+REQUEST_LOG_MAX_BODY_BYTES = int(os.getenv("REQUEST_LOG_MAX_BODY_BYTES", "65536"))
+
+# destination_frequency writes of the request path: "sync" writes before the
+# response; "buffered" coalesces the pairs in memory and writes them every
+# FREQUENCY_FLUSH_INTERVAL_SECONDS (or once FREQUENCY_BUFFER_MAX_PAIRS are pending),
+# writing what is pending on shutdown; "fire_and_forget" does the same but discards
+# what is pending on shutdown. The counts of a write that failed without being
+# applied (e.g. no primary was reachable) are retried, for up to
+# FREQUENCY_BUFFER_MAX_RETRY_PAIRS pairs.
+FREQUENCY_WRITE_MODE = os.getenv("FREQUENCY_WRITE_MODE", "buffered").lower()
+FREQUENCY_FLUSH_INTERVAL_SECONDS = float(
+    os.getenv("FREQUENCY_FLUSH_INTERVAL_SECONDS", "1.0")
+)
+FREQUENCY_BUFFER_MAX_PAIRS = int(os.getenv("FREQUENCY_BUFFER_MAX_PAIRS", "1000"))
+FREQUENCY_BUFFER_MAX_RETRY_PAIRS = int(
+    os.getenv("FREQUENCY_BUFFER_MAX_RETRY_PAIRS", "10000")
+)
+
+# Account and customer lookup cache
+LOOKUP_CACHE_MAXSIZE = int(os.getenv("LOOKUP_CACHE_MAXSIZE", "10000"))
+LOOKUP_CACHE_TTL_SECONDS = int(os.getenv("LOOKUP_CACHE_TTL_SECONDS", "300"))
+
+# Sliding-window transaction history used by the velocity rules. The store is per
+# process: the transactions inserted by other workers are only seen once a pair
+# is loaded again, HISTORY_STORE_TTL_SECONDS after it was warmed.
+HISTORY_WINDOW_MAX_MINUTES = int(os.getenv("HISTORY_WINDOW_MAX_MINUTES", "43200"))
+HISTORY_STORE_MAX_PAIRS = int(os.getenv("HISTORY_STORE_MAX_PAIRS", "100000"))
+HISTORY_STORE_TTL_SECONDS = int(os.getenv("HISTORY_STORE_TTL_SECONDS", "300"))
+
+# Balance reconciliation (0 disables the in-process job; see app/reconcile_balances.py)
+BALANCE_RECONCILE_INTERVAL_SECONDS = int(
+    os.getenv("BALANCE_RECONCILE_INTERVAL_SECONDS", "0")
+)
+BALANCE_RECONCILE_FIX = os.getenv("BALANCE_RECONCILE_FIX", "false").lower() == "true"
+
+# Account statement pagination
+STATEMENT_PAGE_SIZE = int(os.getenv("STATEMENT_PAGE_SIZE", "100"))
+STATEMENT_MAX_PAGE_SIZE = int(os.getenv("STATEMENT_MAX_PAGE_SIZE", "1000"))
+
+# Batch scoring
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "200"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+
+# Bulk loader (app/bulk_load.py)
+BULK_LOAD_BATCH_SIZE = int(os.getenv("BULK_LOAD_BATCH_SIZE", "50000"))
+
+# Rule backtest (app/backtest.py)
+BACKTEST_FETCH_SIZE = int(os.getenv("BACKTEST_FETCH_SIZE", "10000"))
+
+# Risk evaluation latency budget, for the database-backed transforms of a request
+# (0 waits for every transform)
+RISK_LATENCY_BUDGET_MS = int(os.getenv("RISK_LATENCY_BUDGET_MS", "500"))
+
+# Rules cache
+RULES_REFRESH_INTERVAL_SECONDS = int(os.getenv("RULES_REFRESH_INTERVAL_SECONDS", "30"))
+RULES_WATCH_CHANGES = os.getenv("RULES_WATCH_CHANGES", "true").lower() == "true"
+# Adaptive condition order: one evaluation in RULE_ORDER_SAMPLE_INTERVAL is measured
+# (0 keeps the cost-class order), and the order is updated every
+# RULE_ORDER_REORDER_SAMPLES measured evaluations.
+RULE_ORDER_SAMPLE_INTERVAL = int(os.getenv("RULE_ORDER_SAMPLE_INTERVAL", "16"))
+RULE_ORDER_REORDER_SAMPLES = int(os.getenv("RULE_ORDER_REORDER_SAMPLES", "64"))
+
 FASTAPI_CONFIG = {
     "title": "Transaction Behavior Check API",
     "description": "API to Simulate Financial Transaction Risk Calculation",
@@ -20,3 +20,23 @@ class ChannelEnum(enum.IntEnum):
     IBK = 2
     MOBILE_BANKING = 3
     MBK = 3
+
+    @classmethod
+    def from_code(cls, code) -> "ChannelEnum":
+        """
+        Parses a channel given either as its integer code or as its name.
+
+        Args:
+            code (Union[int, str]): The channel code or name.
+
+        Returns:
+            ChannelEnum: The channel.
+
+        Raises:
+            ValueError: If the code or name is not a known channel.
+        """
+        if isinstance(code, int):
+            return cls(code)
+        if code in [member.name for member in cls]:
+            return cls[code]
+        raise ValueError(f"Invalid channel code: {code}")
@@ -0,0 +1,515 @@
+"""In-process sliding-window history of recent transactions."""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import (
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+
+class _ChannelWindow:
+    """
+    The recent transactions of one pair in one channel, ordered by ``created_at``.
+
+    ``sums[i]`` is the total of the amounts before position ``i`` (plus those
+    pruned), so the total from any position is ``sums[-1] - sums[i]``.
+    """
+
+    __slots__ = ("times", "amounts", "ids", "sums")
+
+    def __init__(self):
+        self.times: List[datetime] = []
+        self.amounts: List[float] = []
+        self.ids: List[Optional[Hashable]] = []
+        self.sums: List[float] = [0.0]
+
+    def add(self, amount: float, created_at: datetime, transaction_id: Hashable):
+        index = bisect_right(self.times, created_at)
+        if index == len(self.times):
+            self.times.append(created_at)
+            self.amounts.append(amount)
+            self.ids.append(transaction_id)
+            self.sums.append(self.sums[-1] + amount)
+            return
+        # A late transaction: the sums after it are shifted.
+        self.times.insert(index, created_at)
+        self.amounts.insert(index, amount)
+        self.ids.insert(index, transaction_id)
+        self.sums.insert(index + 1, self.sums[index])
+        for position in range(index + 1, len(self.sums)):
+            self.sums[position] += amount
+
+    def prune(self, oldest: datetime) -> List[Optional[Hashable]]:
+        """Drops the transactions up to ``oldest``; returns their ids."""
+        index = bisect_right(self.times, oldest)
+        if not index:
+            return []
+        pruned = self.ids[:index]
+        del self.times[:index]
+        del self.amounts[:index]
+        del self.ids[:index]
+        del self.sums[:index]
+        return pruned
+
+
+class _SortedAmounts:
+    """
+    The amounts of the transactions of some channels made after ``start``,
+    sorted, for the median queries of one (channels, interval) window.
+
+    ``start`` only moves forward, as the window slides, so each transaction is
+    inserted and removed once.
+    """
+
+    __slots__ = ("channels", "start", "amounts")
+
+    def __init__(self, channels: FrozenSet[int], start: datetime):
+        self.channels = channels
+        self.start = start
+        self.amounts: List[float] = []
+
+    def median(self) -> float:
+        middle = len(self.amounts) // 2
+        if len(self.amounts) % 2:
+            return self.amounts[middle]
+        return (self.amounts[middle - 1] + self.amounts[middle]) / 2
+
+    def count_between(self, lower: float, upper: float) -> int:
+        return bisect_right(self.amounts, upper) - bisect_left(self.amounts, lower)
+
+
+class _PairWindow:
+    """
+    The recent transactions of one pair, by channel, and the sorted amounts of
+    the windows queried for a median.
+    """
+
+    __slots__ = ("channels", "ids", "expires_at", "sorted")
+
+    def __init__(self, expires_at: float):
+        self.channels: Dict[int, _ChannelWindow] = {}
+        self.ids: Set[Hashable] = set()
+        self.expires_at = expires_at
+        self.sorted: Dict[Tuple[FrozenSet[int], int], _SortedAmounts] = {}
+
+    def add(
+        self,
+        channel: int,
+        amount: float,
+        created_at: datetime,
+        transaction_id: Optional[Hashable] = None,
+    ):
+        if transaction_id is not None:
+            if transaction_id in self.ids:
+                return
+            self.ids.add(transaction_id)
+        window = self.channels.get(channel)
+        if window is None:
+            window = self.channels[channel] = _ChannelWindow()
+        window.add(amount, created_at, transaction_id)
+        for amounts in self.sorted.values():
+            if channel in amounts.channels and created_at > amounts.start:
+                insort(amounts.amounts, amount)
+
+    def prune(self, oldest: datetime):
+        for amounts in self.sorted.values():
+            if amounts.start < oldest:
+                self._slide(amounts, oldest)
+        for window in self.channels.values():
+            self.ids.difference_update(window.prune(oldest))
+
+    def sorted_amounts(
+        self, channels: FrozenSet[int], interval_minutes: int, start_at: datetime
+    ) -> _SortedAmounts:
+        """Returns the sorted amounts of the window, slid to ``start_at``."""
+        key = (channels, interval_minutes)
+        amounts = self.sorted.get(key)
+        if amounts is None or start_at < amounts.start:
+            # First query of the window, or the clock went back: built once.
+            amounts = self.sorted[key] = _SortedAmounts(channels, start_at)
+            for channel in channels:
+                window = self.channels.get(channel)
+                if window is not None:
+                    start = bisect_right(window.times, start_at)
+                    amounts.amounts.extend(window.amounts[start:])
+            amounts.amounts.sort()
+        elif start_at > amounts.start:
+            self._slide(amounts, start_at)
+        return amounts
+
+    def _slide(self, amounts: _SortedAmounts, start_at: datetime):
+        """Removes the amounts made up to ``start_at`` from a sorted window."""
+        for channel in amounts.channels:
+            window = self.channels.get(channel)
+            if window is None:
+                continue
+            first = bisect_right(window.times, amounts.start)
+            last = bisect_right(window.times, start_at)
+            for amount in window.amounts[first:last]:
+                del amounts.amounts[bisect_left(amounts.amounts, amount)]
+        amounts.start = start_at
+
+    def rows(self) -> Iterator[Tuple[int, float, datetime, Optional[Hashable]]]:
+        for channel, window in self.channels.items():
+            for created_at, amount, transaction_id in zip(
+                window.times, window.amounts, window.ids
+            ):
+                yield channel, amount, created_at, transaction_id
+
+    def __len__(self) -> int:
+        return sum(len(window.times) for window in self.channels.values())
+
+
+class TransactionHistoryStore:
+    """
+    Thread-safe history of the transactions made between (origin, destination)
+    pairs in the last ``max_window_minutes``, kept per process.
+
+    Each pair keeps its transactions sorted by ``created_at`` per channel, with
+    the running total of their amounts, so the count and the total of any window
+    take a binary search per channel instead of a table scan; the amounts of the
+    windows queried for a median are also kept sorted. A pair is loaded
+    from the database the first time it is queried ("warmed") and then kept up
+    to date by ``record``; transactions recorded while the pair is ``loading``
+    are merged, by id, into the loaded history, since they may have been
+    committed after it was read. A pair is dropped, and loaded again on its next
+    query, ``ttl`` seconds after being warmed: the store only sees the
+    transactions recorded by its own process, so those inserted by other
+    workers are seen within that delay. When more than ``max_pairs`` pairs are
+    warm the least recently used one is dropped. A ``max_pairs`` of zero
+    disables the store.
+
+    Attributes:
+        hits (int): Queries answered by the store.
+        misses (int): Queries on pairs that were not warm.
+        evictions (int): Pairs dropped because the store was full.
+        expirations (int): Pairs dropped because their ``ttl`` elapsed.
+    """
+
+    def __init__(self, max_window_minutes: int, max_pairs: int, ttl: float):
+        self.max_window_minutes = max_window_minutes
+        self.max_pairs = max_pairs
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._pairs: "OrderedDict[Hashable, _PairWindow]" = OrderedDict()
+        # Pairs being loaded: the number of loads, and the transactions recorded
+        # since the first one started.
+        self._loading: Dict[Hashable, Tuple[int, list]] = {}
+        self._lock = threading.Lock()
+
+    def covers(self, interval_minutes: int) -> bool:
+        """
+        Tells whether a window of ``interval_minutes`` can be answered by the store.
+
+        Args:
+            interval_minutes (int): The window length.
+
+        Returns:
+            bool: True if the store is enabled and keeps that much history.
+        """
+        return self.max_pairs > 0 and interval_minutes <= self.max_window_minutes
+
+    def lookback(self) -> datetime:
+        """
+        Returns the oldest ``created_at`` kept by the store.
+
+        Returns:
+            datetime: The start of the widest window, to load pairs from.
+        """
+        return datetime.now() - timedelta(minutes=self.max_window_minutes)
+
+    def _get(self, pair: Hashable) -> Optional[_PairWindow]:
+        window = self._pairs.get(pair)
+        if window is None:
+            return None
+        if window.expires_at <= time.monotonic():
+            del self._pairs[pair]
+            self.expirations += 1
+            return None
+        self._pairs.move_to_end(pair)
+        return window
+
+    def is_warm(self, pair: Hashable) -> bool:
+        """
+        Tells whether the history of a pair is loaded.
+
+        Args:
+            pair (Hashable): The (origin, destination) account ids.
+
+        Returns:
+            bool: True if queries on the pair are answered by the store.
+        """
+        with self._lock:
+            return self._get(pair) is not None
+
+    @contextmanager
+    def loading(self, pair: Hashable):
+        """
+        Marks a pair as being loaded while its history is read and ``load``-ed.
+
+        The transactions recorded in the meantime are merged by ``load``, since
+        they may have been committed after the read.
+
+        Args:
+            pair (Hashable): The (origin, destination) account ids.
+        """
+        with self._lock:
+            loads, recorded = self._loading.get(pair, (0, []))
+            self._loading[pair] = (loads + 1, recorded)
+        try:
+            yield
+        finally:
+            with self._lock:
+                loads, recorded = self._loading[pair]
+                if loads == 1:
+                    del self._loading[pair]
+                else:
+                    self._loading[pair] = (loads - 1, recorded)
+
+    def load(self, pair: Hashable, rows: Iterable[tuple]):
+        """
+        Warms a pair with the transactions read from the database.
+
+        The transactions recorded while the pair was ``loading``, and those of a
+        concurrent load that completed first, are kept along with the rows.
+
+        Args:
+            pair (Hashable): The (origin, destination) account ids.
+            rows (Iterable[tuple]): The channel, amount, ``created_at`` and
+                (optionally) id of the pair transactions since ``lookback()``.
+        """
+        if self.max_pairs <= 0:
+            return
+        oldest = self.lookback()
+        window = _PairWindow(time.monotonic() + self.ttl)
+        for channel, amount, created_at, *transaction_id in sorted(
+            rows, key=lambda row: row[2]
+        ):
+            if created_at > oldest:
+                window.add(int(channel), float(amount), created_at, *transaction_id)
+        with self._lock:
+            merged = list(self._loading.get(pair, (0, []))[1])
+            current = self._get(pair)
+            if current is not None:
+                merged.extend(current.rows())
+            for channel, amount, created_at, transaction_id in merged:
+                if created_at > oldest:
+                    window.add(channel, amount, created_at, transaction_id)
+            self._pairs[pair] = window
+            self._pairs.move_to_end(pair)
+            while len(self._pairs) > self.max_pairs:
+                self._pairs.popitem(last=False)
+                self.evictions += 1
+
+    def record(
+        self,
+        pair: Hashable,
+        channel: int,
+        amount: float,
+        created_at: datetime,
+        transaction_id: Optional[Hashable] = None,
+    ):
+        """
+        Adds a stored transaction to the history of its pair.
+
+        Pairs that are neither warm nor loading are left alone: the transaction
+        is read from the database with the rest of the pair history when it is
+        warmed.
+
+        Args:
+            pair (Hashable): The (origin, destination) account ids.
+            channel (int): The transaction channel code.
+            amount (float): The transaction amount.
+            created_at (datetime): The transaction timestamp.
+            transaction_id (Optional[Hashable]): The transaction id, which keeps
+                a transaction from being counted twice by a load.
+        """
+        oldest = self.lookback()
+        with self._lock:
+            loading = self._loading.get(pair)
+            window = self._get(pair)
+            if (loading is None and window is None) or created_at <= oldest:
+                return
+            entry = (int(channel), float(amount), created_at, transaction_id)
+            if loading is not None:
+                loading[1].append(entry)
+            if window is not None:
+                window.prune(oldest)
+                window.add(*entry)
+
+    def _window(self, pair: Hashable, interval_minutes: int) -> Optional[_PairWindow]:
+        """Returns the warm window of a pair, counting the hit or miss; locked."""
+        if not self.covers(interval_minutes):
+            return None
+        window = self._get(pair)
+        if window is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return window
+
+    def amounts(
+        self, pair: Hashable, channels: Iterable[int], interval_minutes: int
+    ) -> Optional[List[float]]:
+        """
+        Returns the amounts of the pair transactions in a window.
+
+        Args:
+            pair (Hashable): The (origin, destination) account ids.
+            channels (Iterable[int]): The channel codes to include.
+            interval_minutes (int): The window length, up to ``max_window_minutes``.
+
+        Returns:
+            Optional[List[float]]: The amounts of the transactions made after
+            ``now - interval_minutes`` in the given channels, or None if the
+            pair is not warm or the window is wider than the store.
+        """
+        start_at = datetime.now() - timedelta(minutes=interval_minutes)
+        with self._lock:
+            window = self._window(pair, interval_minutes)
+            if window is None:
+                return None
+            values = []
+            for channel in set(channels):
+                channel_window = window.channels.get(channel)
+                if channel_window is not None:
+                    start = bisect_right(channel_window.times, start_at)
+                    values.extend(channel_window.amounts[start:])
+            return values
+
+    def count(
+        self, pair: Hashable, channels: Iterable[int], interval_minutes: int
+    ) -> Optional[int]:
+        """
+        Counts the pair transactions in a window, with a binary search per
+        channel; see ``amounts``.
+        """
+        start_at = datetime.now() - timedelta(minutes=interval_minutes)
+        with self._lock:
+            window = self._window(pair, interval_minutes)
+            if window is None:
+                return None
+            count = 0
+            for channel in set(channels):
+                channel_window = window.channels.get(channel)
+                if channel_window is not None:
+                    times = channel_window.times
+                    count += len(times) - bisect_right(times, start_at)
+            return count
+
+    def total(
+        self, pair: Hashable, channels: Iterable[int], interval_minutes: int
+    ) -> Optional[float]:
+        """
+        Sums the pair transaction amounts in a window, from the running totals
+        of each channel; see ``amounts``.
+        """
+        start_at = datetime.now() - timedelta(minutes=interval_minutes)
+        with self._lock:
+            window = self._window(pair, interval_minutes)
+            if window is None:
+                return None
+            total = 0.0
+            for channel in set(channels):
+                channel_window = window.channels.get(channel)
+                if channel_window is not None:
+                    start = bisect_right(channel_window.times, start_at)
+                    sums = channel_window.sums
+                    total += sums[-1] - sums[start]
+            return total
+
+    def count_similar(
+        self,
+        pair: Hashable,
+        channels: Iterable[int],
+        interval_minutes: int,
+        variation: Optional[float] = None,
+    ) -> Optional[int]:
+        """
+        Counts the pair transactions in a window whose amount is within
+        ``variation`` of the median amount of that window.
+
+        Without a ``variation`` this is ``count``. With one, the amounts of the
+        window are kept sorted from its first query on, and slid forward by the
+        next ones, so the median and the band count take binary searches; only
+        the first query of a (channels, interval) window sorts its amounts.
+
+        Args:
+            pair (Hashable): The (origin, destination) account ids.
+            channels (Iterable[int]): The channel codes to include.
+            interval_minutes (int): The window length.
+            variation (Optional[float]): The accepted relative distance to the
+                median; when not set, every transaction in the window is counted.
+
+        Returns:
+            Optional[int]: The number of matching transactions, or None if the
+            store cannot answer (see ``amounts``).
+        """
+        if not variation:
+            return self.count(pair, channels, interval_minutes)
+        start_at = datetime.now() - timedelta(minutes=interval_minutes)
+        with self._lock:
+            window = self._window(pair, interval_minutes)
+            if window is None:
+                return None
+            amounts = window.sorted_amounts(
+                frozenset(channels), interval_minutes, start_at
+            )
+            if not amounts.amounts:
+                return 0
+            median = amounts.median()
+            return amounts.count_between(
+                median * (1 - variation), median * (1 + variation)
+            )
+
+    def invalidate(self, pair: Hashable):
+        """
+        Drops the history of a pair.
+
+        Args:
+            pair (Hashable): The (origin, destination) account ids.
+        """
+        with self._lock:
+            self._pairs.pop(pair, None)
+
+    def clear(self):
+        """Drops the history of every pair."""
+        with self._lock:
+            self._pairs.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the store counters.
+
+        Returns:
+            dict: Warm pairs, stored transactions, limits and hit/miss counters.
+        """
+        with self._lock:
+            queries = self.hits + self.misses
+            return {
+                "pairs": len(self._pairs),
+                "transactions": sum(len(w) for w in self._pairs.values()),
+                "max_pairs": self.max_pairs,
+                "max_window_minutes": self.max_window_minutes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / queries if queries else 0.0,
+            }
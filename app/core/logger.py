@@ -1,14 +1,158 @@
-"""Configura o logger para salvar logs em formato JSON."""
+"""Configures the application logger, as Rich console output or JSON lines."""
 
+import copy
+import json
 import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
 from rich.logging import RichHandler
 
-logging.basicConfig(
-    level="INFO",  # nível mínimo do logger
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler()],
-)
+from app.core.config import LOG_INFO_SAMPLE_RATE, LOG_LEVEL, LOG_MODE, LOG_QUEUE_SIZE
 
-logger = logging.getLogger("rich")
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a compact JSON object on a single line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps every record from WARNING up, and a random ``rate`` of the others.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    ``QueueHandler`` that never waits for the writer thread.
+
+    The message is merged with its arguments and the traceback is rendered on the
+    calling thread, since both may refer to objects that change afterwards; JSON
+    encoding and I/O are left to the ``QueueListener``. Records arriving while
+    the queue is full are dropped and counted.
+
+    Attributes:
+        dropped (int): Records dropped because the queue was full.
+        listener (Optional[QueueListener]): The writer of the queued records.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.listener: Optional[QueueListener] = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Writes the queued records, then stops the writer thread."""
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        super().close()
+
+
+# The application logger, and its name before it was renamed, still configured
+# for the code and logging setups using it.
+APP_LOGGERS = ("app", "rich")
+HANDLER_NAME = "app-log"
+
+
+def configure_logging(
+    mode: str = LOG_MODE,
+    level: str = LOG_LEVEL,
+    sample_rate: float = LOG_INFO_SAMPLE_RATE,
+    queue_size: int = LOG_QUEUE_SIZE,
+) -> logging.Handler:
+    """
+    Configures the application loggers, ``APP_LOGGERS``.
+
+    In ``"prod"`` mode records are sampled, queued by the calling thread and
+    written as JSON lines to stdout by a background thread, stopped (after
+    writing the queued records) when the handler is closed, which
+    ``logging.shutdown`` does when the process exits. Any other mode writes
+    Rich console output on the calling thread.
+
+    The handler replaces the one of a previous call, and the root logger is left
+    alone: the handlers installed by the host (e.g. uvicorn, pytest) are kept,
+    and still receive the application records, which propagate.
+
+    Args:
+        mode (str): ``"prod"`` or ``"dev"``.
+        level (str): The minimum level of the records written.
+        sample_rate (float): The share of records below WARNING kept in
+            ``"prod"`` mode.
+        queue_size (int): The number of records waiting to be written above
+            which new records are dropped, in ``"prod"`` mode.
+
+    Returns:
+        logging.Handler: The handler installed on the application loggers.
+    """
+    if mode != "prod":
+        handler = RichHandler()
+        handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+    else:
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter())
+        handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        handler.addFilter(SamplingFilter(sample_rate))
+        handler.listener = QueueListener(
+            handler.queue, stream, respect_handler_level=True
+        )
+        handler.listener.start()
+    handler.set_name(HANDLER_NAME)
+
+    previous = set()
+    for name in APP_LOGGERS:
+        app_logger = logging.getLogger(name)
+        for installed in app_logger.handlers[:]:
+            if installed.get_name() == HANDLER_NAME:
+                app_logger.removeHandler(installed)
+                previous.add(installed)
+        app_logger.addHandler(handler)
+        app_logger.setLevel(level)
+    for installed in previous:
+        installed.close()
+    return handler
+
+
+log_handler = configure_logging()
+logger = logging.getLogger("app")
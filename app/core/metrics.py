@@ -0,0 +1,121 @@
+"""Prometheus metrics of the risk evaluation and of its background writers."""
+
+import functools
+import inspect
+import time
+from typing import Callable
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# From 50µs to 2.5s: conditions are evaluated in microseconds, queries in
+# milliseconds.
+LATENCY_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+RULE_SECONDS = Histogram(
+    "risk_rule_evaluation_seconds",
+    "Time spent evaluating a block of a rule.",
+    ["rule"],
+    buckets=LATENCY_BUCKETS,
+)
+RULE_MATCHES = Counter(
+    "risk_rule_matches",
+    "Transactions flagged, by the rule found to match.",
+    ["rule"],
+)
+TRANSFORM_SECONDS = Histogram(
+    "risk_transform_seconds",
+    "Time spent computing a rule transform.",
+    ["transform"],
+    buckets=LATENCY_BUCKETS,
+)
+TRANSFORM_CONTEXT_HITS = Counter(
+    "risk_transform_context_hits",
+    "Transform results read from the evaluation context instead of computed.",
+    ["transform"],
+)
+QUERY_SECONDS = Histogram(
+    "risk_query_seconds",
+    "Time spent in a helper query read by the risk evaluation.",
+    ["helper", "query"],
+    buckets=LATENCY_BUCKETS,
+)
+EVALUATIONS = Counter(
+    "risk_evaluations",
+    "Transactions evaluated by the request path, by mode (normal or degraded).",
+    ["mode"],
+)
+DEGRADED_TRANSFORMS = Counter(
+    "risk_degraded_transforms",
+    "Transforms approximated or skipped to stay within the latency budget.",
+    ["transform", "mode"],
+)
+
+REQUEST_LOG_ENTRIES = Counter(
+    "request_log_entries",
+    "API audit log entries, by outcome (written, spilled or dropped).",
+    ["outcome"],
+)
+FREQUENCY_BUFFER_PAIRS = Gauge(
+    "destination_frequency_buffer_pairs",
+    "Origin/destination pairs with increments waiting to be written.",
+)
+FREQUENCY_FLUSH_SECONDS = Histogram(
+    "destination_frequency_flush_seconds",
+    "Time spent writing the buffered destination_frequency increments.",
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def timed_query(function: Callable) -> Callable:
+    """
+    Observes the duration of a helper query in ``risk_query_seconds``.
+
+    The helper and query labels are the class and method names. Coroutine
+    functions are timed until they complete.
+
+    Args:
+        function (Callable): The helper method, synchronous or asynchronous.
+
+    Returns:
+        Callable: The wrapped method.
+    """
+    helper, _, query = function.__qualname__.rpartition(".")
+    observe = QUERY_SECONDS.labels(helper, query).observe
+
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                observe(time.perf_counter() - started)
+
+        return async_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            observe(time.perf_counter() - started)
+
+    return wrapper
@@ -1,41 +1,206 @@
 """MongoDB database factory."""
 
+import threading
 from contextlib import contextmanager
 
 from mongoengine import connect, disconnect
 from mongoengine.connection import get_db
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.monitoring import ConnectionPoolListener
 
 from app.core.config import (
+    MONGO_CONNECT_TIMEOUT_MS,
     MONGO_DB,
     MONGO_HOST,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
     MONGO_PASSWORD,
     MONGO_PORT,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
     MONGO_USERNAME,
 )
 
 
+class PoolMetricsListener(ConnectionPoolListener):
+    """
+    Collects connection pool metrics from the MongoDB driver events.
+
+    Attributes:
+        checked_out (int): Connections currently checked out of the pool.
+        open_connections (int): Connections currently open.
+        checkouts (int): Total successful checkouts.
+        checkout_failures (int): Total failed checkouts (e.g. wait queue timeouts).
+        wait_time_total (float): Total seconds spent waiting for a connection.
+        wait_time_max (float): Longest wait for a connection, in seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.open_connections = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current pool metrics.
+
+        Returns:
+            dict: The pool metrics, including the average checkout wait time.
+        """
+        with self._lock:
+            return {
+                "checked_out": self.checked_out,
+                "open_connections": self.open_connections,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_time_total_seconds": self.wait_time_total,
+                "wait_time_avg_seconds": (
+                    self.wait_time_total / self.checkouts if self.checkouts else 0.0
+                ),
+                "wait_time_max_seconds": self.wait_time_max,
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_time_total += event.duration
+            self.wait_time_max = max(self.wait_time_max, event.duration)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+
+pool_metrics = PoolMetricsListener()
+
+_connected = False
+_connection_lock = threading.Lock()
+_async_client = None
+
+
+def init_mongo():
+    """
+    Creates the shared, pooled MongoDB client.
+
+    The client is created once per process (normally at application startup)
+    and reused by every operation. Calling it again is a no-op.
+    """
+    global _connected  # pylint: disable=global-statement
+    with _connection_lock:
+        if _connected:
+            return
+        connect(
+            db=MONGO_DB,
+            host=MONGO_HOST,
+            port=MONGO_PORT,
+            username=MONGO_USERNAME,
+            password=MONGO_PASSWORD,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=[pool_metrics],
+        )
+        _connected = True
+
+
+def close_mongo():
+    """Closes the shared MongoDB client (normally at application shutdown)."""
+    global _connected  # pylint: disable=global-statement
+    with _connection_lock:
+        if _connected:
+            disconnect()
+            _connected = False
+
+
 @contextmanager
 def mongo_connection():
     """
-    Context manager for connecting to a MongoDB database.
+    Context manager for using the MongoDB database.
 
-    Establishes a connection to the MongoDB database using the provided
-    configuration parameters and yields a database object. Ensures that
-    the connection is properly closed when the context is exited.
+    Yields the database object of the shared, pooled client, creating the client
+    on first use. The connection is returned to the pool by the driver, so the
+    client is not closed when the context is exited.
 
     Yields:
         Database object: The MongoDB database object for performing
         operations within the context.
     """
+    init_mongo()
+    yield get_db()
+
+
+def get_async_mongo_db() -> AsyncDatabase:
+    """
+    Returns the database of the shared asyncio MongoDB client.
+
+    The client is created on first use, with the same pool settings as the
+    synchronous one, and must be used from the application event loop.
+
+    Returns:
+        AsyncDatabase: The MongoDB database object for async operations.
+    """
+    global _async_client  # pylint: disable=global-statement
+    if _async_client is None:
+        _async_client = AsyncMongoClient(
+            host=MONGO_HOST,
+            port=MONGO_PORT,
+            username=MONGO_USERNAME,
+            password=MONGO_PASSWORD,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=[pool_metrics],
+        )
+    return _async_client[MONGO_DB]
+
 
-    connect(
-        db=MONGO_DB,
-        host=MONGO_HOST,
-        port=MONGO_PORT,
-        username=MONGO_USERNAME,
-        password=MONGO_PASSWORD,
-    )
-    try:
-        yield get_db()
-    finally:
-        disconnect()
+async def close_async_mongo():
+    """Closes the shared asyncio MongoDB client."""
+    global _async_client  # pylint: disable=global-statement
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
@@ -1,15 +1,18 @@
 """PostgreSQL database factory."""
 
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import (
     POSTGRES_DB,
     POSTGRES_HOST,
+    POSTGRES_MAX_OVERFLOW,
     POSTGRES_PASSWORD,
+    POSTGRES_POOL_SIZE,
     POSTGRES_PORT,
     POSTGRES_USER,
 )
@@ -19,10 +22,30 @@ DATABASE_URL = (
     f"{POSTGRES_USER}:{POSTGRES_PASSWORD}"
     f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
+ASYNC_DATABASE_URL = (
+    "postgresql+asyncpg://"
+    f"{POSTGRES_USER}:{POSTGRES_PASSWORD}"
+    f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+)
 
-engine = create_engine(DATABASE_URL, echo=False)
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    pool_size=POSTGRES_POOL_SIZE,
+    max_overflow=POSTGRES_MAX_OVERFLOW,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    pool_size=POSTGRES_POOL_SIZE,
+    max_overflow=POSTGRES_MAX_OVERFLOW,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -39,3 +62,19 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@asynccontextmanager
+async def get_async_db():
+    """
+    Dependency to get an asyncio database session.
+
+    Yields an ``AsyncSession`` for use in async path operation functions.
+    Attributes are not expired on commit, so objects can still be read after
+    the session is closed without an implicit (blocking) reload.
+    """
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
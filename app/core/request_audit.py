@@ -0,0 +1,106 @@
+"""ASGI middleware recording every API call in the request audit log."""
+
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.core.config import REQUEST_LOG_MAX_BODY_BYTES
+from app.helpers.async_request_log_helper import RequestLogWriter, request_log_writer
+
+# Operational endpoints, polled by tools rather than called by clients.
+EXCLUDED_PATH_PREFIXES = ("/metrics", "/docs", "/redoc", "/openapi.json")
+
+
+class BodyCapture:
+    """
+    Accumulates the chunks of a body up to ``limit`` bytes.
+
+    Attributes:
+        body (Optional[bytearray]): The body so far, or None once it went over
+            the limit.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.body: Optional[bytearray] = bytearray()
+
+    def add(self, chunk: bytes):
+        """Appends a chunk, giving up on the body if it goes over the limit."""
+        if self.body is None:
+            return
+        if len(self.body) + len(chunk) > self.limit:
+            self.body = None
+        else:
+            self.body += chunk
+
+    def value(self) -> Optional[bytes]:
+        """Returns the body, or None if it went over the limit."""
+        return bytes(self.body) if self.body is not None else None
+
+
+class RequestAuditMiddleware:
+    """
+    Records the method, parameters, status code and response of every API call
+    in the request audit log.
+
+    The middleware wraps ``receive`` and ``send`` instead of reading the request
+    and response itself, so streamed bodies keep streaming; it only copies their
+    chunks, up to ``max_body_bytes`` each. The call is handed to the
+    ``RequestLogWriter`` once the response is sent, without waiting: decoding
+    and writing happen in the writer task.
+    """
+
+    def __init__(
+        self,
+        app,
+        writer: RequestLogWriter = request_log_writer,
+        max_body_bytes: int = REQUEST_LOG_MAX_BODY_BYTES,
+    ):
+        self.app = app
+        self.writer = writer
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(
+            EXCLUDED_PATH_PREFIXES
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        created_at = datetime.now()
+        started = time.perf_counter()
+        request_body = BodyCapture(self.max_body_bytes)
+        response_body = BodyCapture(self.max_body_bytes)
+        status = 500
+
+        async def audited_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.add(message.get("body", b""))
+            return message
+
+        async def audited_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_body.add(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, audited_receive, audited_send)
+        finally:
+            self.writer.submit(
+                {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    # Set by the router on the same scope
+                    "path_params": scope.get("path_params", {}),
+                    "query_string": scope.get("query_string", b""),
+                    "request_body": request_body.value(),
+                    "status": status,
+                    "response_body": response_body.value(),
+                    "duration_ms": (time.perf_counter() - started) * 1000,
+                    "created_at": created_at,
+                }
+            )
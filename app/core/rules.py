@@ -0,0 +1,502 @@
+"""Compiles rule filters into cached predicate trees."""
+
+import hashlib
+import json
+import threading
+import time as clock
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+
+from pydantic import ValidationError
+
+from app.core.config import RULE_ORDER_REORDER_SAMPLES, RULE_ORDER_SAMPLE_INTERVAL
+from app.core.constants import ChannelEnum
+from app.core.logger import logger
+from app.core.metrics import RULE_MATCHES, RULE_SECONDS
+from app.schemas.rules_schemas import SimpleCondition
+
+# A compiled predicate receives the RiskEvaluator (which owns the transforms and
+# the comparison operators), the transaction being evaluated and the evaluation
+# context, a dict holding the transform results already known for that transaction.
+Predicate = Callable[[Any, Any, dict], bool]
+
+COUNT_SAME_TRX_TRANSFORM = "!count_same_trx_by_channel_user_in_last_in_period"
+DESTINATION_FREQUENCY_TRANSFORM = "!destination_account_frequency"
+TIME_TRANSFORM = "!time"
+# Transforms that read the transaction history from a database.
+IO_TRANSFORMS = (COUNT_SAME_TRX_TRANSFORM, DESTINATION_FREQUENCY_TRANSFORM)
+
+# Expected cost of a leaf before any evaluation of it is measured, in nanoseconds:
+# a field comparison, a ``!time`` comparison, and a transform reading a database.
+FIELD_COST_NS = 1_000
+TIME_COST_NS = 2_000
+IO_COST_NS = 1_000_000
+
+
+class RuleCompilationError(ValueError):
+    """Raised when a rule filter cannot be compiled into a predicate."""
+
+
+@dataclass(frozen=True)
+class CompiledBlock:
+    """
+    A single compiled block of a rule.
+
+    Attributes:
+        filter (dict): The original filter tree, kept for logging.
+        predicate (Predicate): The compiled predicate for the filter tree.
+        cost (int): The expected cost of the predicate, in nanoseconds.
+    """
+
+    filter: dict
+    predicate: Predicate
+    cost: int = FIELD_COST_NS
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """
+    A rule document compiled into predicate trees.
+
+    Attributes:
+        name (str): The rule name.
+        version (str): Hash of the rule conditions the predicates were built from.
+        blocks (Tuple[CompiledBlock, ...]): The compiled blocks, in stored order.
+        transforms (Tuple[Tuple[str, dict], ...]): The database-backed transforms
+            used by the rule, with their params.
+    """
+
+    name: str
+    version: str
+    blocks: Tuple[CompiledBlock, ...]
+    transforms: Tuple[Tuple[str, dict], ...] = ()
+
+
+def rule_version(conditions: Any) -> str:
+    """
+    Computes a stable hash of the rule conditions.
+
+    Args:
+        conditions (Any): The rule conditions as stored in MongoDB.
+
+    Returns:
+        str: A short hexadecimal digest identifying this version of the rule.
+    """
+    payload = json.dumps(conditions, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _channel_value(value: Any) -> Any:
+    """Converts channel names in a condition value to their integer codes."""
+    if isinstance(value, list):
+        return [ChannelEnum[item].value for item in value]
+    return ChannelEnum[value].value
+
+
+class ConditionOrder:
+    """
+    Evaluates predicates in the order expected to decide their result soonest.
+
+    An ``and`` node is decided by the first child returning False and an ``or``
+    node by the first one returning True. Children are ranked by their expected
+    cost divided by the probability that they decide the node, so cheap and
+    selective conditions run first and database-backed transforms only run when
+    the cheaper children left the node undecided. The ranking starts from the
+    cost class of each leaf; then one evaluation in ``sample_interval`` times
+    each child it runs and counts the ones deciding, and the order is updated
+    every ``reorder_samples`` measured evaluations.
+
+    Both operators are commutative, predicates only add transform results to
+    the context, and a leaf whose field is missing, including a dotted path
+    through a None relation, is False instead of raising; so the result does not
+    depend on the order. Only errors of transforms (e.g. database errors) may
+    surface in one order and be skipped in another. Counters are
+    updated without a lock: concurrent evaluations may lose a sample, never
+    change a result.
+
+    ``on_measure``, if given, is called with the stored position, the duration
+    in nanoseconds and the outcome of every measured child evaluation.
+    """
+
+    def __init__(
+        self,
+        children: Sequence[Predicate],
+        costs: Sequence[int],
+        decisive: bool,
+        sample_interval: int = RULE_ORDER_SAMPLE_INTERVAL,
+        reorder_samples: int = RULE_ORDER_REORDER_SAMPLES,
+        on_measure: Optional[Callable[[int, int, bool], None]] = None,
+    ):
+        self.children = tuple(children)
+        self.costs = tuple(costs)
+        self.decisive = decisive
+        self.sample_interval = sample_interval
+        self.reorder_samples = max(reorder_samples, 1)
+        self.on_measure = on_measure
+        self.calls = [0] * len(self.children)
+        self.decided = [0] * len(self.children)
+        self.elapsed_ns = [0] * len(self.children)
+        self.evaluations = 0
+        self.samples = 0
+        self._set_order(sorted(range(len(self.children)), key=self.costs.__getitem__))
+
+    @property
+    def cost(self) -> int:
+        """The expected cost of evaluating every child, in nanoseconds."""
+        return sum(self.costs)
+
+    def __call__(self, evaluator, transaction, context) -> bool:
+        if self.decide(evaluator, transaction, context) < 0:
+            return not self.decisive
+        return self.decisive
+
+    def decide(self, evaluator, transaction, context) -> int:
+        """
+        Evaluates the children until one decides the node.
+
+        Args:
+            evaluator (RiskEvaluator): The evaluator owning the transforms.
+            transaction (Any): The transaction being evaluated.
+            context (dict): The evaluation context.
+
+        Returns:
+            int: The stored position of the deciding child, or -1 if none did.
+        """
+        self.evaluations += 1
+        if self.sample_interval and self.evaluations % self.sample_interval == 0:
+            return self._measure(evaluator, transaction, context)
+        decisive = self.decisive
+        for index, child in self._ordered:
+            if bool(child(evaluator, transaction, context)) is decisive:
+                return index
+        return -1
+
+    def rank(self, index: int) -> float:
+        """
+        Returns the expected cost of a child per evaluation it decides.
+
+        The cost class counts as one measurement, and the deciding rate starts
+        at one half, so children measured a few times are not overtaken by noise.
+        """
+        calls = self.calls[index]
+        cost = (self.elapsed_ns[index] + self.costs[index]) / (calls + 1)
+        return cost * (calls + 2) / (self.decided[index] + 1)
+
+    def reorder(self):
+        """Sorts the children by rank, keeping stored order between equal ranks."""
+        self._set_order(sorted(range(len(self.children)), key=self.rank))
+
+    @property
+    def order(self) -> Tuple[int, ...]:
+        """The stored positions of the children, in evaluation order."""
+        return tuple(index for index, _ in self._ordered)
+
+    def _set_order(self, order: Sequence[int]):
+        # A single assignment, so concurrent evaluations see either order.
+        self._ordered = tuple((index, self.children[index]) for index in order)
+
+    def _measure(self, evaluator, transaction, context) -> int:
+        decided = -1
+        for index, child in self._ordered:
+            started = clock.perf_counter_ns()
+            result = bool(child(evaluator, transaction, context))
+            elapsed = clock.perf_counter_ns() - started
+            self.elapsed_ns[index] += elapsed
+            self.calls[index] += 1
+            if self.on_measure is not None:
+                self.on_measure(index, elapsed, result)
+            if result is self.decisive:
+                self.decided[index] += 1
+                decided = index
+                break
+        self.samples += 1
+        if self.samples % self.reorder_samples == 0:
+            self.reorder()
+        return decided
+
+
+def leaf_cost(condition: SimpleCondition) -> int:
+    """
+    Classifies a simple condition by the cost of evaluating it.
+
+    Args:
+        condition (SimpleCondition): The condition.
+
+    Returns:
+        int: The expected cost, in nanoseconds.
+    """
+    if condition.transform in IO_TRANSFORMS:
+        return IO_COST_NS
+    if condition.transform == TIME_TRANSFORM:
+        return TIME_COST_NS
+    return FIELD_COST_NS
+
+
+def _compile_leaf(condition: SimpleCondition) -> Predicate:
+    """
+    Compiles a simple condition into a predicate.
+
+    Everything that only depends on the condition (field path, channel codes,
+    transform dispatch) is resolved here, once, instead of on every evaluation.
+    """
+    field = condition.field
+    op = condition.op
+    value = condition.value
+    transform = condition.transform
+    params = condition.params
+    path = field.split(".") if "." in field else None
+    value_is_time = isinstance(value, time)
+    try:
+        channel_value = _channel_value(value)
+    except (KeyError, TypeError):
+        # Only needed when the field turns out to be a channel, in which case the
+        # conversion is retried at evaluation time and raises as before.
+        channel_value = None
+
+    def leaf(evaluator, transaction, context) -> bool:
+        field_value = None
+        condition_value = value
+
+        if path is None and field and hasattr(transaction, field):
+            field_value = getattr(transaction, field)
+            if isinstance(field_value, ChannelEnum):
+                condition_value = (
+                    channel_value if channel_value is not None else _channel_value(value)
+                )
+                field_value = field_value.value
+            if value_is_time and isinstance(field_value, datetime):
+                field_value = field_value.time()
+
+        if transform:
+            result = evaluator.process_transform(
+                transform, transaction, condition_value, params, context
+            )
+            if transform == TIME_TRANSFORM:
+                return evaluator.compare(op, field_value, result)
+            return evaluator.compare(op, result, condition_value)
+
+        if path is not None:
+            field_value = transaction
+            for part in path:
+                if field_value is None:
+                    # A missing relation, e.g. an account without customer
+                    return False
+                field_value = getattr(field_value, part)
+            if field_value is None:
+                return False
+            return evaluator.compare(op, field_value, condition_value)
+
+        if field_value is not None:
+            return evaluator.compare(op, field_value, condition_value)
+        return False
+
+    return leaf
+
+
+def compile_condition(condition: Union[SimpleCondition, Dict[str, Any]]) -> Predicate:
+    """
+    Compiles a filter tree into a predicate.
+
+    The tree uses the same structure as the stored rules: ``{"and": [...]}``,
+    ``{"or": [...]}`` or a leaf matching ``SimpleCondition``. The children of
+    ``and``/``or`` nodes are evaluated in the order kept by a ``ConditionOrder``.
+
+    Args:
+        condition (Union[SimpleCondition, Dict[str, Any]]): The filter tree.
+
+    Returns:
+        Predicate: A callable ``predicate(evaluator, transaction, context) -> bool``.
+
+    Raises:
+        RuleCompilationError: If the tree, or any leaf in it, is invalid.
+    """
+    return _compile(condition)[0]
+
+
+def _compile(
+    condition: Union[SimpleCondition, Dict[str, Any]],
+) -> Tuple[Predicate, int]:
+    """Compiles a filter tree into a predicate and its expected cost."""
+    if isinstance(condition, SimpleCondition):
+        return _compile_leaf(condition), leaf_cost(condition)
+
+    if not isinstance(condition, dict):
+        raise RuleCompilationError(f"Invalid condition: {condition!r}")
+
+    for key, decisive in (("and", False), ("or", True)):
+        if key in condition:
+            compiled = [_compile(sub) for sub in condition[key]]
+            node = ConditionOrder(
+                [predicate for predicate, _ in compiled],
+                [cost for _, cost in compiled],
+                decisive,
+            )
+            return node, node.cost
+
+    try:
+        leaf = SimpleCondition(**condition)
+    except ValidationError as e:
+        raise RuleCompilationError(f"Invalid condition: {condition!r}") from e
+    return _compile_leaf(leaf), leaf_cost(leaf)
+
+
+def _collect_transforms(condition: Any, found: list):
+    """Appends the database-backed transforms used in a filter tree to ``found``."""
+    if not isinstance(condition, dict):
+        return
+    for key in ("and", "or"):
+        if key in condition:
+            for sub in condition[key]:
+                _collect_transforms(sub, found)
+            return
+    transform = condition.get("transform")
+    if transform in IO_TRANSFORMS:
+        item = (transform, condition.get("params") or {})
+        if item not in found:
+            found.append(item)
+
+
+def compile_rule(name: str, conditions: list, version: str = None) -> CompiledRule:
+    """
+    Compiles every block of a rule.
+
+    Blocks without a filter are ignored, as are blocks whose filter is invalid;
+    the latter are logged so the rule can be fixed in the collection.
+
+    Args:
+        name (str): The rule name.
+        conditions (list): The rule blocks, each one holding a ``filter`` tree.
+        version (str, optional): The precomputed rule version.
+
+    Returns:
+        CompiledRule: The compiled rule.
+    """
+    blocks = []
+    transforms = []
+    for block in conditions or []:
+        filter_dict = block.get("filter")
+        if not filter_dict:
+            continue
+        try:
+            blocks.append(CompiledBlock(filter_dict, *_compile(filter_dict)))
+        except RuleCompilationError:
+            logger.error("Skipping invalid block in rule %s", name, exc_info=True)
+            continue
+        _collect_transforms(filter_dict, transforms)
+    return CompiledRule(
+        name=name,
+        version=version or rule_version(conditions),
+        blocks=tuple(blocks),
+        transforms=tuple(transforms),
+    )
+
+
+_compiled_rules: Dict[Tuple[str, str], CompiledRule] = {}
+_compiled_rules_lock = threading.Lock()
+
+
+def get_compiled_rule(name: str, conditions: list) -> CompiledRule:
+    """
+    Returns the compiled form of a rule, compiling it only when it changed.
+
+    Compiled rules are cached per process, keyed by rule name and version.
+    Older versions of the same rule are dropped when a new one is compiled.
+
+    Args:
+        name (str): The rule name.
+        conditions (list): The rule blocks.
+
+    Returns:
+        CompiledRule: The compiled rule.
+    """
+    version = rule_version(conditions)
+    key = (name, version)
+    compiled = _compiled_rules.get(key)
+    if compiled is not None:
+        return compiled
+
+    compiled = compile_rule(name, conditions, version)
+    with _compiled_rules_lock:
+        for stale in [k for k in _compiled_rules if k[0] == name and k != key]:
+            del _compiled_rules[stale]
+        _compiled_rules[key] = compiled
+    return compiled
+
+
+class RuleSetOrder:
+    """
+    The blocks of a rule set, evaluated like the children of an ``or`` node.
+
+    A transaction is suspect when any block of any rule matches, so blocks are
+    ranked across rules by a ``ConditionOrder`` in the same way. Every block
+    evaluation is measured, which also feeds the ``risk_rule_evaluation_seconds``
+    and ``risk_rule_matches`` metrics of its rule.
+
+    Attributes:
+        blocks (Tuple[Tuple[CompiledRule, CompiledBlock], ...]): Every block of
+            the rule set, with its rule, in stored order.
+    """
+
+    def __init__(self, rules: Sequence[CompiledRule]):
+        self.blocks = tuple((rule, block) for rule in rules for block in rule.blocks)
+        self._observe = [
+            RULE_SECONDS.labels(rule.name).observe for rule, _ in self.blocks
+        ]
+        self._matched = [RULE_MATCHES.labels(rule.name).inc for rule, _ in self.blocks]
+        self.order = ConditionOrder(
+            [block.predicate for _, block in self.blocks],
+            [block.cost for _, block in self.blocks],
+            decisive=True,
+            sample_interval=1,
+            on_measure=self._measured,
+        )
+
+    def _measured(self, index: int, elapsed_ns: int, matched: bool):
+        self._observe[index](elapsed_ns / 1e9)
+        if matched:
+            self._matched[index]()
+
+    def first_match(
+        self, evaluator, transaction, context
+    ) -> Optional[Tuple[CompiledRule, CompiledBlock]]:
+        """
+        Evaluates the blocks until one matches.
+
+        Args:
+            evaluator (RiskEvaluator): The evaluator owning the transforms.
+            transaction (Any): The transaction being evaluated.
+            context (dict): The evaluation context.
+
+        Returns:
+            Optional[Tuple[CompiledRule, CompiledBlock]]: The matching block and
+            its rule, or None if no block matched.
+        """
+        index = self.order.decide(evaluator, transaction, context)
+        return self.blocks[index] if index >= 0 else None
+
+
+_rule_set_orders: Dict[Tuple[Tuple[str, str], ...], RuleSetOrder] = {}
+
+
+def get_rule_set_order(rules: Sequence[CompiledRule]) -> RuleSetOrder:
+    """
+    Returns the evaluation order of a rule set, keeping its measurements for as
+    long as the rule set does not change.
+
+    Args:
+        rules (Sequence[CompiledRule]): The compiled rules.
+
+    Returns:
+        RuleSetOrder: The evaluation order of the blocks.
+    """
+    key = tuple((rule.name, rule.version) for rule in rules)
+    order = _rule_set_orders.get(key)
+    if order is not None:
+        return order
+
+    order = RuleSetOrder(rules)
+    with _compiled_rules_lock:
+        _rule_set_orders.clear()
+        _rule_set_orders[key] = order
+    return order
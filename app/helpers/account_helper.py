@@ -1,16 +1,39 @@
 """Helper class for account-related database operations."""
 
-from sqlalchemy import case, cast, desc, func, literal, or_
+from typing import Iterator, Optional
+
+from sqlalchemy import (
+    case,
+    cast,
+    desc,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    union_all,
+)
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm import Session, aliased, joinedload
 from sqlalchemy.sql.selectable import Subquery
 
+from app.core.config import STATEMENT_PAGE_SIZE
 from app.core.postgres_database import get_db
+from app.helpers.lookup_cache_helper import (
+    cache_account,
+    cache_resolution,
+    get_cached_account,
+    get_cached_resolution,
+    invalidate_account,
+)
 from app.interfaces.account_interface import AccountInterface
+from app.models.tables.account_balance_model import AccountBalance
 from app.models.tables.account_model import Account
 from app.models.tables.customer_model import Customer
 from app.models.tables.transaction_model import Transaction
+from app.schemas.account_schemas import AccountResolution, StatementCursor
 
 
 class AccountHelper(AccountInterface):
@@ -33,58 +56,30 @@ class AccountHelper(AccountInterface):
             try:
                 db.add(account)
                 db.commit()
+                invalidate_account(account.agency, account.account)
             except SQLAlchemyError as e:
                 db.rollback()
                 raise e
 
     def __get_balance_subquery(self, account: Account, db: Session) -> Subquery:
         """
-        Creates a subquery to calculate the balance of a given account.
+        Creates a subquery to read the balance of a given account.
 
         Args:
-            account (Account): The account for which to calculate the balance.
+            account (Account): The account for which to read the balance.
             db (Session): The database session.
 
         Returns:
-            Subquery: A SQLAlchemy subquery that calculates the balance by summing
-                    the transaction amounts where the account is either the origin
-                    or the destination. Credits are added and debits are subtracted.
+            Subquery: A SQLAlchemy subquery returning a single row with the
+                    maintained balance of the account (credits added, debits
+                    subtracted), or 0 if the account has no transactions yet.
         """
-
-        balance_expr = func.coalesce(
-            func.sum(
-                case(
-                    (
-                        Transaction.destination_account_id == account.id,
-                        Transaction.amount,
-                    ),
-                    else_=0,
-                )
-            ),
-            0,
-        ) - func.coalesce(
-            func.sum(
-                case(
-                    (
-                        Transaction.origin_account_id == account.id,
-                        Transaction.amount,
-                    ),
-                    else_=0,
-                )
-            ),
-            0,
-        )
-
-        return (
-            db.query(balance_expr.label("balance"))
-            .filter(
-                or_(
-                    Transaction.origin_account_id == account.id,
-                    Transaction.destination_account_id == account.id,
-                )
-            )
-            .subquery()
+        stored_balance = (
+            db.query(AccountBalance.balance)
+            .filter(AccountBalance.account_id == account.id)
+            .scalar_subquery()
         )
+        return db.query(func.coalesce(stored_balance, 0).label("balance")).subquery()
 
     def __get_transactions_subquery(
         self, account: Account, last_n: int, db: Session
@@ -234,7 +229,7 @@ class AccountHelper(AccountInterface):
 
     def get_account(self, account_data: Account) -> Account | None:
         """
-        Retrieves an account from the database.
+        Retrieves an account, from the lookup cache when possible.
 
         Args:
             account_data (Account): The agency and account numbers to be searched.
@@ -246,9 +241,13 @@ class AccountHelper(AccountInterface):
             SQLAlchemyError: If an error occurs during the database operation,
                 the transaction is rolled back and the exception is raised.
         """
+        cached = get_cached_account(account_data.agency, account_data.account)
+        if cached is not None:
+            return cached
+
         with get_db() as db:
             try:
-                return (
+                account = (
                     db.query(Account)
                     .filter(
                         Account.agency == account_data.agency,
@@ -256,5 +255,168 @@ class AccountHelper(AccountInterface):
                     )
                     .first()
                 )
+                if account is not None:
+                    cache_account(account)
+                return account
+            except SQLAlchemyError as e:
+                raise e
+
+    def resolve_transfer_accounts(
+        self, origin: Account, destination: Account
+    ) -> AccountResolution:
+        """
+        Retrieves the origin and destination accounts of a transfer in one query.
+
+        The customer of each account is eager-loaded in the same statement.
+        If both accounts are in the lookup cache, no query is made.
+
+        Args:
+            origin (Account): The agency and account numbers of the origin.
+            destination (Account): The agency and account numbers of the destination.
+
+        Returns:
+            AccountResolution: The accounts found; a missing account is None.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation.
+        """
+        cached = get_cached_resolution(origin, destination)
+        if cached is not None:
+            return cached
+
+        with get_db() as db:
+            try:
+                accounts = (
+                    db.query(Account)
+                    .options(joinedload(Account.customer_rel))
+                    .filter(
+                        tuple_(Account.agency, Account.account).in_(
+                            [
+                                (origin.agency, origin.account),
+                                (destination.agency, destination.account),
+                            ]
+                        )
+                    )
+                    .all()
+                )
+                resolution = AccountResolution.from_accounts(
+                    accounts, origin, destination
+                )
+                cache_resolution(resolution)
+                return resolution
             except SQLAlchemyError as e:
                 raise e
+
+    def iter_account_keys(self, fetch_size: int = 10000) -> Iterator:
+        """
+        Iterates over every account with its customer, without loading ORM objects.
+
+        Args:
+            fetch_size (int): Rows fetched per round trip from a server-side cursor.
+
+        Yields:
+            Row: id, agency, account, customer_id, name and age.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation.
+        """
+        statement = (
+            select(
+                Account.id,
+                Account.agency,
+                Account.account,
+                Account.customer_id,
+                Customer.name,
+                Customer.age,
+            )
+            .join(Customer, Customer.id == Account.customer_id)
+            .execution_options(stream_results=True, yield_per=fetch_size)
+        )
+        with get_db() as db:
+            try:
+                yield from db.execute(statement)
+            except SQLAlchemyError as e:
+                db.rollback()
+                raise e
+
+    def iter_statement(
+        self,
+        account: Account,
+        limit: int,
+        cursor: Optional[StatementCursor] = None,
+        fetch_size: int = STATEMENT_PAGE_SIZE,
+    ) -> Iterator:
+        """
+        Iterates over a page of the account statement, newest first.
+
+        Pages use keyset pagination on ``(created_at, id)``: a page starts right
+        after the cursor key instead of skipping rows with OFFSET. The debits and
+        the credits are read by separate branches, each one walking its own
+        ``(account, created_at DESC)`` index from the cursor, so the cost of a
+        page does not depend on how far back it is. Rows are streamed from a
+        server-side cursor, ``fetch_size`` at a time.
+
+        Args:
+            account (Account): The account, with its id.
+            limit (int): The maximum number of rows.
+            cursor (Optional[StatementCursor]): The key of the last row of the
+                previous page; None for the first page.
+            fetch_size (int): Rows fetched per round trip.
+
+        Yields:
+            Row: id, created_at, tx_type, agencia, conta, amount, channel and suspect.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation.
+        """
+        counterpart = aliased(Account)
+
+        def branch(own_column, other_column, tx_type: str):
+            query = (
+                select(
+                    Transaction.id,
+                    Transaction.created_at,
+                    literal_column(f"'{tx_type}'").label("tx_type"),
+                    counterpart.agency.label("agencia"),
+                    counterpart.account.label("conta"),
+                    Transaction.amount,
+                    Transaction.channel,
+                    Transaction.suspect,
+                )
+                .join(counterpart, counterpart.id == other_column)
+                .where(own_column == account.id)
+            )
+            if cursor is not None:
+                query = query.where(
+                    tuple_(Transaction.created_at, Transaction.id)
+                    < tuple_(cursor.created_at, cursor.id)
+                )
+            return query.order_by(
+                desc(Transaction.created_at), desc(Transaction.id)
+            ).limit(limit)
+
+        statement = union_all(
+            branch(
+                Transaction.origin_account_id,
+                Transaction.destination_account_id,
+                "debit",
+            ).subquery().select(),
+            branch(
+                Transaction.destination_account_id,
+                Transaction.origin_account_id,
+                "credit",
+            ).subquery().select(),
+        ).subquery()
+        statement = (
+            select(statement)
+            .order_by(desc(statement.c.created_at), desc(statement.c.id))
+            .limit(limit)
+            .execution_options(stream_results=True, yield_per=fetch_size)
+        )
+
+        with get_db() as db:
+            try:
+                yield from db.execute(statement)
+            except SQLAlchemyError as e:
+                db.rollback()
+                raise e
@@ -0,0 +1,174 @@
+"""Asyncio helper class for account-related database operations."""
+
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+
+from app.core.postgres_database import get_async_db
+from app.helpers.lookup_cache_helper import (
+    cache_account,
+    cache_resolution,
+    get_cached_account,
+    get_cached_resolution,
+    invalidate_account,
+)
+from app.models.tables.account_model import Account
+from app.schemas.account_schemas import AccountResolution
+
+# Maximum number of keys sent in a single IN clause.
+QUERY_CHUNK_SIZE = 1000
+
+
+class AsyncAccountHelper:
+    """
+    Asyncio variant of ``AccountHelper`` for the async request path.
+    """
+
+    async def save_account(self, account: Account):
+        """
+        Saves an account to the database.
+
+        Args:
+            account (Account): The account object to be saved.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation,
+                the transaction is rolled back and the exception is raised.
+        """
+        async with get_async_db() as db:
+            try:
+                db.add(account)
+                await db.commit()
+                invalidate_account(account.agency, account.account)
+            except SQLAlchemyError as e:
+                await db.rollback()
+                raise e
+
+    async def get_account(self, account_data: Account) -> Account | None:
+        """
+        Retrieves an account, from the lookup cache when possible.
+
+        Args:
+            account_data (Account): The agency and account numbers to be searched.
+
+        Returns:
+            Account: The account object if found, None otherwise.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation.
+        """
+        cached = get_cached_account(account_data.agency, account_data.account)
+        if cached is not None:
+            return cached
+
+        async with get_async_db() as db:
+            try:
+                result = await db.execute(
+                    select(Account).where(
+                        Account.agency == account_data.agency,
+                        Account.account == account_data.account,
+                    )
+                )
+                account = result.scalars().first()
+                if account is not None:
+                    cache_account(account)
+                return account
+            except SQLAlchemyError as e:
+                raise e
+
+    async def resolve_transfer_accounts(
+        self, origin: Account, destination: Account
+    ) -> AccountResolution:
+        """
+        Retrieves the origin and destination accounts of a transfer in one query.
+
+        The customer of each account is eager-loaded in the same statement.
+        If both accounts are in the lookup cache, no query is made.
+
+        Args:
+            origin (Account): The agency and account numbers of the origin.
+            destination (Account): The agency and account numbers of the destination.
+
+        Returns:
+            AccountResolution: The accounts found; a missing account is None.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation.
+        """
+        cached = get_cached_resolution(origin, destination)
+        if cached is not None:
+            return cached
+
+        async with get_async_db() as db:
+            try:
+                result = await db.execute(
+                    select(Account)
+                    .options(joinedload(Account.customer_rel))
+                    .where(
+                        tuple_(Account.agency, Account.account).in_(
+                            [
+                                (origin.agency, origin.account),
+                                (destination.agency, destination.account),
+                            ]
+                        )
+                    )
+                )
+                resolution = AccountResolution.from_accounts(
+                    result.scalars().unique().all(), origin, destination
+                )
+                cache_resolution(resolution)
+                return resolution
+            except SQLAlchemyError as e:
+                raise e
+
+    async def get_accounts_by_numbers(
+        self, numbers: Iterable[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], Account]:
+        """
+        Retrieves many accounts, with their customers, by agency and account number.
+
+        Accounts in the lookup cache are not queried; the others are read in
+        chunks of ``QUERY_CHUNK_SIZE`` pairs, one statement per chunk.
+
+        Args:
+            numbers (Iterable[Tuple[int, int]]): The (agency, account) pairs.
+
+        Returns:
+            Dict[Tuple[int, int], Account]: The accounts found, keyed by
+            (agency, account).
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation.
+        """
+        accounts = {}
+        customers = {}
+        missing = []
+        for agency, account in set(numbers):
+            cached = get_cached_account(
+                agency, account, with_customer=True, customers=customers
+            )
+            if cached is not None:
+                accounts[(agency, account)] = cached
+            else:
+                missing.append((agency, account))
+
+        async with get_async_db() as db:
+            try:
+                for start in range(0, len(missing), QUERY_CHUNK_SIZE):
+                    result = await db.execute(
+                        select(Account)
+                        .options(joinedload(Account.customer_rel))
+                        .where(
+                            tuple_(Account.agency, Account.account).in_(
+                                missing[start : start + QUERY_CHUNK_SIZE]
+                            )
+                        )
+                    )
+                    for account in result.scalars().unique().all():
+                        cache_account(account)
+                        accounts[(account.agency, account.account)] = account
+            except SQLAlchemyError as e:
+                raise e
+        return accounts
@@ -0,0 +1,87 @@
+"""Asyncio helper class for customer-related database operations."""
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.core.postgres_database import get_async_db
+from app.helpers.lookup_cache_helper import (
+    cache_customer,
+    get_cached_customer,
+    invalidate_customer,
+)
+from app.models.tables.customer_model import Customer
+
+
+class AsyncCustomerHelper:
+    """
+    Asyncio variant of ``CustomerHelper`` for the async request path.
+    """
+
+    async def get_customer_by_id(self, customer: Customer) -> Customer:
+        """
+        Retrieves a customer by their account.
+
+        Args:
+            customer (Customer): The customer to be retrieved.
+
+        Returns:
+            Customer: The retrieved customer object.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database query.
+        """
+        cached = get_cached_customer(customer.customer_id)
+        if cached is not None:
+            return cached
+
+        async with get_async_db() as db:
+            try:
+                result = await db.execute(
+                    select(Customer).where(Customer.id == customer.customer_id)
+                )
+                found = result.scalars().first()
+                if found is not None:
+                    cache_customer(found)
+                return found
+            except SQLAlchemyError as e:
+                raise e
+
+    async def insert(self, customer: Customer) -> Customer:
+        """
+        Saves a customer profile into the database.
+
+        Args:
+            customer (Customer): The customer to be saved.
+
+        Returns:
+            Customer: The saved customer object.
+        """
+        async with get_async_db() as db:
+            try:
+                db.add(customer)
+                await db.commit()
+                await db.refresh(customer)
+                invalidate_customer(customer.id)
+                return customer
+
+            except IntegrityError as e:
+                raise e
+
+            except SQLAlchemyError as e:
+                await db.rollback()
+                raise e
+
+    async def delete(self, customer: Customer):
+        """
+        Deletes a customer.
+
+        Args:
+            customer (Customer): The customer to be deleted.
+        """
+        try:
+            async with get_async_db() as db:
+                await db.delete(customer)
+                await db.commit()
+            invalidate_customer(customer.id)
+        except SQLAlchemyError as e:
+            raise e
@@ -0,0 +1,148 @@
+"""Asyncio helper class for the origin/destination transaction counters."""
+
+from collections import Counter
+from typing import Iterable, Mapping, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.core.logger import logger
+from app.core.metrics import timed_query
+from app.core.mongo_database import get_async_mongo_db
+from app.helpers.destination_frequency_helper import (
+    count_recent,
+    increment_update,
+    prune_update,
+)
+from app.models.collections.user_cache_model import DestinationFrequency
+
+# Maximum number of pairs looked up by a single query.
+QUERY_CHUNK_SIZE = 1000
+
+
+def _collection():
+    # pylint: disable=protected-access
+    return get_async_mongo_db()[DestinationFrequency._get_collection_name()]
+
+
+class AsyncDestinationFrequencyHelper:
+    """
+    Asyncio variant of ``DestinationFrequencyHelper`` for the async request path.
+    """
+
+    async def increment(self, origin_account_id: int, destination_account_id: int):
+        """
+        Records a transaction from an origin to a destination.
+
+        Args:
+            origin_account_id (int): The origin account id.
+            destination_account_id (int): The destination account id.
+
+        Raises:
+            PyMongoError: If an error occurs during the update.
+        """
+        try:
+            await _collection().update_one(
+                {
+                    "origin_user": origin_account_id,
+                    "destination_user": destination_account_id,
+                },
+                increment_update(),
+                upsert=True,
+            )
+        except PyMongoError as e:
+            logger.error("Error updating destination frequency", exc_info=True)
+            raise e
+
+    async def increment_many(self, counts: Mapping[Tuple[int, int], int]):
+        """
+        Records many transactions with a single unordered bulk write.
+
+        Args:
+            counts (Mapping[Tuple[int, int], int]): Transactions to add per
+                (origin, destination) pair.
+
+        Raises:
+            PyMongoError: If an error occurs during the update.
+        """
+        if not counts:
+            return
+        try:
+            await _collection().bulk_write(
+                [
+                    UpdateOne(
+                        {"origin_user": origin, "destination_user": destination},
+                        increment_update(count),
+                        upsert=True,
+                    )
+                    for (origin, destination), count in counts.items()
+                ],
+                ordered=False,
+            )
+        except PyMongoError as e:
+            logger.error("Error updating destination frequencies", exc_info=True)
+            raise e
+
+    async def get_frequency(
+        self, origin_account_id: int, destination_account_id: int
+    ) -> int:
+        """
+        Counts the transactions from an origin to a destination in the last
+        ``KNOWN_DESTINATION_TTL_DAYS`` days.
+
+        Args:
+            origin_account_id (int): The origin account id.
+            destination_account_id (int): The destination account id.
+
+        Returns:
+            int: The number of transactions.
+
+        Raises:
+            PyMongoError: If an error occurs during the query.
+        """
+        frequencies = await self.get_frequencies(
+            [(origin_account_id, destination_account_id)]
+        )
+        return frequencies[(origin_account_id, destination_account_id)]
+
+    @timed_query
+    async def get_frequencies(self, pairs: Iterable[Tuple[int, int]]) -> Counter:
+        """
+        Counts the recent transactions of many origin/destination pairs.
+
+        Args:
+            pairs (Iterable[Tuple[int, int]]): The (origin, destination) pairs.
+
+        Returns:
+            Counter: The number of transactions per pair; missing pairs count zero.
+
+        Raises:
+            PyMongoError: If an error occurs during the query.
+        """
+        filters = [
+            {"origin_user": origin, "destination_user": destination}
+            for origin, destination in set(pairs)
+        ]
+        frequencies = Counter()
+        collection = _collection()
+        prune = []
+        try:
+            for start in range(0, len(filters), QUERY_CHUNK_SIZE):
+                chunk = filters[start : start + QUERY_CHUNK_SIZE]
+                cursor = collection.find(
+                    chunk[0] if len(chunk) == 1 else {"$or": chunk},
+                    {"origin_user": 1, "destination_user": 1, "days": 1},
+                )
+                async for document in cursor:
+                    pair = (document["origin_user"], document["destination_user"])
+                    frequencies[pair], stale = count_recent(document.get("days"))
+                    if stale:
+                        prune.append(
+                            UpdateOne({"_id": document["_id"]}, prune_update(stale))
+                        )
+            if prune:
+                await collection.bulk_write(prune, ordered=False)
+        except PyMongoError as e:
+            logger.error("Error reading destination frequencies", exc_info=True)
+            raise e
+        return frequencies
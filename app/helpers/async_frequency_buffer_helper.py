@@ -0,0 +1,213 @@
+"""Write-behind buffer of the origin/destination transaction counters."""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Mapping, Optional, Tuple
+
+from pymongo.errors import (
+    BulkWriteError,
+    ConnectionFailure,
+    NetworkTimeout,
+    PyMongoError,
+)
+
+from app.core.config import (
+    FREQUENCY_BUFFER_MAX_PAIRS,
+    FREQUENCY_BUFFER_MAX_RETRY_PAIRS,
+    FREQUENCY_FLUSH_INTERVAL_SECONDS,
+    FREQUENCY_WRITE_MODE,
+)
+from app.core.logger import logger
+from app.core.metrics import FREQUENCY_BUFFER_PAIRS, FREQUENCY_FLUSH_SECONDS
+from app.helpers.async_destination_frequency_helper import (
+    AsyncDestinationFrequencyHelper,
+)
+
+
+class FrequencyWriteBuffer:
+    """
+    Takes the ``destination_frequency`` increments off the request path.
+
+    In ``"sync"`` mode, or while the buffer is not started, ``record`` writes
+    the increment before returning. Otherwise it only counts the transaction in
+    memory, coalescing the transactions of a pair, and a background task writes
+    the counts with one unordered bulk upsert every ``flush_interval`` seconds,
+    or as soon as ``max_pairs`` pairs are pending. The counts of the updates that
+    were not applied are kept for the next write: those reported by the bulk
+    write, or all of them when no server could be reached. Up to
+    ``max_retry_pairs`` pairs are kept that way. When the write may have been
+    applied, e.g. on a network timeout, its counts are dropped instead, since
+    ``$inc`` is not idempotent.
+
+    Until written, the counts are reported by ``pending``, which the frequency
+    reads add to the stored counters, so a transaction is seen by the risk
+    evaluation of the next one as soon as it is recorded.
+
+    ``stop`` writes the pending counts before returning, except in
+    ``"fire_and_forget"`` mode, where they are discarded.
+    """
+
+    def __init__(
+        self,
+        mode: str = "buffered",
+        flush_interval: float = 1.0,
+        max_pairs: int = 1000,
+        max_retry_pairs: int = 10000,
+    ):
+        self.mode = mode
+        self.flush_interval = flush_interval
+        self.max_pairs = max_pairs
+        self.max_retry_pairs = max_retry_pairs
+        self.frequency_helper = AsyncDestinationFrequencyHelper()
+        self._pending: Counter = Counter()
+        self._flushing: Counter = Counter()
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Starts the flush task on the running event loop, unless in sync mode."""
+        if self.mode == "sync":
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: float = 10):
+        """
+        Stops the flush task, writing the pending counts first unless in
+        ``"fire_and_forget"`` mode.
+
+        Args:
+            timeout (float): Seconds to wait for the last write.
+        """
+        task, self._task = self._task, None
+        if task is None:
+            return
+        if self.mode == "fire_and_forget":
+            task.cancel()
+            if self._pending:
+                logger.warning(
+                    "Discarded the frequency increments of %s pairs",
+                    len(self._pending),
+                )
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                "Frequency increments of %s pairs not written on shutdown",
+                len(self._pending) + len(self._flushing),
+            )
+
+    async def record(self, origin_account_id: int, destination_account_id: int):
+        """
+        Records a transaction from an origin to a destination.
+
+        Args:
+            origin_account_id (int): The origin account id.
+            destination_account_id (int): The destination account id.
+
+        Raises:
+            PyMongoError: If an error occurs during a synchronous update.
+        """
+        if self._task is None:
+            await self.frequency_helper.increment(
+                origin_account_id, destination_account_id
+            )
+            return
+        self._pending[(origin_account_id, destination_account_id)] += 1
+        if len(self._pending) >= self.max_pairs:
+            self._wakeup.set()
+
+    def pending(self, pair: Tuple[int, int]) -> int:
+        """
+        Returns the transactions of a pair recorded but not written yet.
+
+        Args:
+            pair (Tuple[int, int]): The (origin, destination) account ids.
+
+        Returns:
+            int: The number of transactions.
+        """
+        return self._pending[pair] + self._flushing[pair]
+
+    def depth(self) -> int:
+        """Returns the number of pairs with counts waiting to be written."""
+        return len(self._pending) + len(self._flushing)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            # Read before the write, so that one last flush follows ``stop``
+            stopping = self._stopping
+            self._wakeup.clear()
+            await self._flush()
+        if self._pending:
+            logger.error(
+                "Frequency increments of %s pairs not written on shutdown",
+                len(self._pending),
+            )
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        self._flushing, self._pending = self._pending, Counter()
+        started = time.perf_counter()
+        try:
+            await self.frequency_helper.increment_many(self._flushing)
+        except BulkWriteError as e:
+            # Logged by the helper; the failed updates are retried with the next
+            # flush. Their indexes follow the order of the counts.
+            pairs = list(self._flushing)
+            errors = e.details.get("writeErrors", [])
+            failed = [pairs[error["index"]] for error in errors]
+            self._retry({pair: self._flushing[pair] for pair in failed})
+        except ConnectionFailure as e:
+            if isinstance(e, NetworkTimeout):
+                # The server may have applied the write before the timeout.
+                self._drop(self._flushing, "may have been written")
+            else:
+                # No server selected or connection lost: retried.
+                self._retry(self._flushing)
+        except PyMongoError:
+            self._drop(self._flushing, "may have been written")
+        finally:
+            FREQUENCY_FLUSH_SECONDS.observe(time.perf_counter() - started)
+            self._flushing = Counter()
+
+    def _retry(self, counts: Mapping[Tuple[int, int], int]):
+        """Keeps counts for the next flush, up to ``max_retry_pairs`` pairs."""
+        dropped = Counter()
+        for pair, count in counts.items():
+            if pair in self._pending or len(self._pending) < self.max_retry_pairs:
+                self._pending[pair] += count
+            else:
+                dropped[pair] = count
+        if dropped:
+            self._drop(dropped, "too many pairs are waiting for a retry")
+
+    @staticmethod
+    def _drop(counts: Mapping[Tuple[int, int], int], reason: str):
+        logger.error(
+            "Dropped %s frequency increments of %s pairs: %s",
+            sum(counts.values()),
+            len(counts),
+            reason,
+        )
+
+
+frequency_buffer = FrequencyWriteBuffer(
+    FREQUENCY_WRITE_MODE,
+    FREQUENCY_FLUSH_INTERVAL_SECONDS,
+    FREQUENCY_BUFFER_MAX_PAIRS,
+    FREQUENCY_BUFFER_MAX_RETRY_PAIRS,
+)
+FREQUENCY_BUFFER_PAIRS.set_function(frequency_buffer.depth)
@@ -0,0 +1,88 @@
+"""Asyncio helper class for MongoDB operations."""
+
+from typing import List, Optional, Type
+
+from mongoengine import Document
+from pymongo.errors import PyMongoError
+
+from app.core.logger import logger
+from app.core.mongo_database import get_async_mongo_db
+
+
+class AsyncMongoHelper:
+    """
+    Asyncio variant of ``MongoHelper`` for the async request path.
+
+    MongoEngine documents are still used as models: they are validated and
+    converted with MongoEngine, and read/written with the asyncio driver.
+    """
+
+    async def save(self, document: Document):
+        """
+        Inserts a document into its MongoDB collection.
+
+        Args:
+            document (Document): A MongoEngine document to be saved.
+
+        Raises:
+            PyMongoError: If an error occurs during the insertion.
+        """
+        # pylint: disable=protected-access
+        collection = get_async_mongo_db()[document._get_collection_name()]
+        try:
+            document.validate()
+            result = await collection.insert_one(document.to_mongo())
+            document.pk = result.inserted_id
+        except PyMongoError as e:
+            logger.error("Error saving document", exc_info=True)
+            raise e
+
+    async def find_documents(
+        self, document: Type[Document], filters: Optional[dict] = None, limit: int = 0
+    ) -> List[Document]:
+        """
+        Searches for documents in the specified MongoDB collection.
+
+        Args:
+            document (Type[Document]): The model class to query, representing a MongoDB collection.
+            filters (Optional[dict]): A dictionary with the raw query filters to apply.
+            limit (int): The maximum number of documents to return. A value of 0 means no limit.
+
+        Returns:
+            List[Document]: A list of documents matching the query criteria.
+
+        Raises:
+            PyMongoError: If an error occurs during the query operation.
+        """
+        # pylint: disable=protected-access
+        collection = get_async_mongo_db()[document._get_collection_name()]
+        try:
+            cursor = collection.find(filters or {}, limit=limit)
+            return [document._from_son(son) async for son in cursor]
+        except PyMongoError as e:
+            logger.error("Error finding documents", exc_info=True)
+            raise e
+
+    async def insert_many(self, documents: List[Document]):
+        """
+        Inserts many documents of the same model with a single unordered bulk write.
+
+        Args:
+            documents (List[Document]): MongoEngine documents to be saved.
+
+        Raises:
+            PyMongoError: If an error occurs during the insertion.
+        """
+        if not documents:
+            return
+        # pylint: disable=protected-access
+        collection = get_async_mongo_db()[documents[0]._get_collection_name()]
+        try:
+            for document in documents:
+                document.validate()
+            await collection.insert_many(
+                [document.to_mongo() for document in documents], ordered=False
+            )
+        except PyMongoError as e:
+            logger.error("Error saving documents", exc_info=True)
+            raise e
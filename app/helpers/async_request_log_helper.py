@@ -0,0 +1,299 @@
+"""Asyncio helper class writing the API audit trail to MongoDB in batches."""
+
+import asyncio
+import json
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+import bson
+from bson import json_util
+from bson.errors import InvalidDocument
+from mongoengine import ValidationError
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.core.config import (
+    REQUEST_LOG_BATCH_SIZE,
+    REQUEST_LOG_FLUSH_INTERVAL_SECONDS,
+    REQUEST_LOG_QUEUE_SIZE,
+    REQUEST_LOG_SPILL_PATH,
+    REQUEST_LOG_WRITE_TIMEOUT_SECONDS,
+)
+from app.core.logger import logger
+from app.core.metrics import REQUEST_LOG_ENTRIES
+from app.core.mongo_database import get_async_mongo_db
+from app.models.collections.requests_log_model import RequestLog
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def decode_body(body: Optional[bytes]):
+    """
+    Decodes a captured request or response body.
+
+    Args:
+        body (Optional[bytes]): The body, or None if it was too large to keep.
+
+    Returns:
+        The decoded JSON value, the text of a body that is not JSON, or None for
+        an empty or missing body.
+    """
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body.decode("utf-8", "replace")
+
+
+def request_log_document(entry: dict) -> dict:
+    """
+    Converts an entry submitted by the audit middleware into a ``RequestLog``
+    document.
+
+    Bodies and query strings are captured raw on the request path and only
+    decoded here, off it.
+
+    Args:
+        entry (dict): The method, path, path_params, query_string, request_body,
+            status, response_body, duration_ms and created_at of an API call.
+
+    Returns:
+        dict: The validated document, as written to the request_log collection.
+
+    Raises:
+        ValidationError: If the entry does not make a valid document.
+    """
+    params = {
+        "path": entry["path_params"],
+        "query": dict(parse_qsl(entry["query_string"].decode("latin-1"))),
+        "body": decode_body(entry["request_body"]),
+    }
+    document = RequestLog(
+        method=entry["method"],
+        path=entry["path"],
+        params={key: value for key, value in params.items() if value},
+        response_status_code=entry["status"],
+        response_json=decode_body(entry["response_body"]),
+        duration_ms=entry["duration_ms"],
+        created_at=entry["created_at"],
+    )
+    document.validate()
+    return document.to_mongo().to_dict()
+
+
+class RequestLogWriter:
+    """
+    Writes the API audit trail to the request_log collection from a background
+    task, so that logging a call never adds to its latency.
+
+    ``submit`` only puts the entry in a bounded queue, and drops it when the
+    queue is full. The task takes up to ``batch_size`` entries, waiting at most
+    ``flush_interval`` seconds after the first one, and writes them with a single
+    unordered ``insert_many``. The documents of a batch that fails or is not
+    written within ``write_timeout`` seconds are appended to ``spill_path`` as
+    MongoDB extended JSON lines, to be loaded later (their ``_id`` is kept, so a
+    batch partially written before the timeout is not duplicated), or dropped
+    when no spill file is configured. Documents BSON cannot encode are dropped
+    alone, and any other failure drops its batch without stopping the task.
+
+    Attributes:
+        written (int): Entries written to the collection.
+        spilled (int): Entries appended to the spill file.
+        dropped (int): Entries dropped, on a full queue or a failed write.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+        write_timeout: float,
+        spill_path: str = "",
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_timeout = write_timeout
+        self.spill_path = spill_path
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Starts the writer task on the running event loop."""
+        self._queue = asyncio.Queue(self.queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: float = 10):
+        """
+        Stops the writer task, after writing the entries already queued.
+
+        Args:
+            timeout (float): Seconds to wait for the queued entries to be
+                written, after which the task is cancelled.
+        """
+        task, self._task = self._task, None
+        if task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.put(None), timeout)
+            await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            task.cancel()
+            self._count("dropped", self._queue.qsize())
+            logger.warning("Request log writer stopped before writing its queue")
+
+    def submit(self, entry: dict):
+        """
+        Queues an API call for the audit log, without waiting.
+
+        Args:
+            entry (dict): The call, as described in ``request_log_document``.
+        """
+        if self._task is None:
+            self._count("dropped", 1)
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self._count("dropped", 1)
+
+    def stats(self) -> dict:
+        """
+        Returns the writer counters.
+
+        Returns:
+            dict: The queued, written, spilled and dropped entries.
+        """
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+        }
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if not batch:
+                continue
+            try:
+                await self._write(batch)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # An unexpected failure loses the batch, not the writer.
+                self._count("dropped", len(batch))
+                logger.error(
+                    "Could not write %s request log entries", len(batch), exc_info=True
+                )
+
+    async def _next_batch(self) -> Tuple[List[dict], bool]:
+        """Waits for a batch of entries; also tells whether ``stop`` was called."""
+        loop = asyncio.get_running_loop()
+        entry = await self._queue.get()
+        deadline = loop.time() + self.flush_interval
+        batch: List[dict] = []
+        while entry is not None:
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                entry = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                try:
+                    entry = await asyncio.wait_for(
+                        self._queue.get(), deadline - loop.time()
+                    )
+                except asyncio.TimeoutError:
+                    return batch, False
+        return batch, True
+
+    async def _write(self, batch: List[dict]):
+        documents = []
+        for entry in batch:
+            try:
+                documents.append(request_log_document(entry))
+            except ValidationError:
+                self._count("dropped", 1)
+                logger.warning("Invalid request log entry", exc_info=True)
+        try:
+            await self._insert(documents)
+        except (InvalidDocument, OverflowError):
+            # A document the driver cannot encode (such as an integer above 64
+            # bits in a body) fails the whole batch: the others are written.
+            await self._insert(self._encodable(documents))
+
+    async def _insert(self, documents: List[dict]):
+        if not documents:
+            return
+        # pylint: disable=protected-access
+        collection = get_async_mongo_db()[RequestLog._get_collection_name()]
+        try:
+            await asyncio.wait_for(
+                collection.insert_many(documents, ordered=False), self.write_timeout
+            )
+            self._count("written", len(documents))
+            return
+        except BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            # Duplicate _id: written by an attempt interrupted by an encoding error
+            duplicates = sum(error["code"] == DUPLICATE_KEY_ERROR for error in errors)
+            failed = {
+                error["index"]
+                for error in errors
+                if error["code"] != DUPLICATE_KEY_ERROR
+            }
+            self._count("written", e.details["nInserted"] + duplicates)
+            documents = [
+                document
+                for index, document in enumerate(documents)
+                if index in failed
+            ]
+            logger.warning("Could not write %s request log entries", len(documents))
+        except (PyMongoError, asyncio.TimeoutError):
+            logger.warning(
+                "Could not write %s request log entries", len(documents), exc_info=True
+            )
+        await self._spill(documents)
+
+    def _encodable(self, documents: List[dict]) -> List[dict]:
+        """Returns the documents BSON can encode, dropping the others."""
+        encodable = []
+        for document in documents:
+            try:
+                bson.encode(document)
+                encodable.append(document)
+            except (InvalidDocument, OverflowError):
+                self._count("dropped", 1)
+                logger.warning("Request log entry cannot be encoded", exc_info=True)
+        return encodable
+
+    async def _spill(self, documents: List[dict]):
+        if not self.spill_path:
+            self._count("dropped", len(documents))
+            return
+        try:
+            await asyncio.to_thread(self._append, documents)
+            self._count("spilled", len(documents))
+        except OSError:
+            self._count("dropped", len(documents))
+            logger.error("Could not spill the request log entries", exc_info=True)
+
+    def _append(self, documents: List[dict]):
+        with open(self.spill_path, "a", encoding="utf-8") as spill:
+            spill.writelines(json_util.dumps(document) + "\n" for document in documents)
+
+    def _count(self, outcome: str, entries: int):
+        setattr(self, outcome, getattr(self, outcome) + entries)
+        REQUEST_LOG_ENTRIES.labels(outcome).inc(entries)
+
+
+request_log_writer = RequestLogWriter(
+    REQUEST_LOG_QUEUE_SIZE,
+    REQUEST_LOG_BATCH_SIZE,
+    REQUEST_LOG_FLUSH_INTERVAL_SECONDS,
+    REQUEST_LOG_WRITE_TIMEOUT_SECONDS,
+    REQUEST_LOG_SPILL_PATH,
+)
@@ -0,0 +1,353 @@
+"""Asyncio helper class for evaluating behavioral transaction risk."""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.config import RISK_LATENCY_BUDGET_MS
+from app.core.constants import ChannelEnum
+from app.core.logger import logger
+from app.core.metrics import DEGRADED_TRANSFORMS, EVALUATIONS
+from app.core.rules import COUNT_SAME_TRX_TRANSFORM, CompiledRule
+from app.helpers.async_destination_frequency_helper import (
+    AsyncDestinationFrequencyHelper,
+)
+from app.helpers.async_frequency_buffer_helper import frequency_buffer
+from app.helpers.async_transaction_helper import AsyncTransactionHelper
+from app.helpers.history_store_helper import (
+    count_similar_in_history,
+    history_store,
+    load_pair,
+)
+from app.helpers.risk_engine_helper import (
+    TRANSFORM_TIMERS,
+    UNKNOWN,
+    EvaluationContext,
+    RiskEvaluator,
+)
+from app.helpers.rule_cache_helper import rule_cache
+from app.models.collections.user_cache_model import KNOWN_DESTINATION_TTL_DAYS
+from app.models.tables.transaction_model import Transaction
+
+
+@dataclass(frozen=True)
+class RiskDecision:
+    """
+    Outcome of a transaction evaluation.
+
+    Attributes:
+        suspect (bool): True if the transaction matched any rule.
+        degraded_rules (Tuple[str, ...]): The rules evaluated with a transform
+            approximated or skipped to stay within the latency budget.
+    """
+
+    suspect: bool
+    degraded_rules: Tuple[str, ...] = ()
+
+
+class DegradedModeMetrics:
+    """
+    Counts the evaluations that ran out of latency budget.
+
+    Attributes:
+        evaluations (int): Evaluations made.
+        degraded (int): Evaluations with at least one transform not computed.
+        approximated (Counter): Transforms answered from the in-memory history,
+            per transform name.
+        skipped (Counter): Transforms left unknown, per transform name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.evaluations = 0
+        self.degraded = 0
+        self.approximated = Counter()
+        self.skipped = Counter()
+
+    def record(self, degraded: Dict[tuple, str]):
+        """
+        Counts an evaluation, here and in the Prometheus metrics.
+
+        Args:
+            degraded (Dict[tuple, str]): The ``EvaluationContext.degraded`` of
+                the evaluation.
+        """
+        EVALUATIONS.labels("degraded" if degraded else "normal").inc()
+        for key, mode in degraded.items():
+            DEGRADED_TRANSFORMS.labels(key[0], mode).inc()
+        with self._lock:
+            self.evaluations += 1
+            if degraded:
+                self.degraded += 1
+            for key, mode in degraded.items():
+                if mode == "approximated":
+                    self.approximated[key[0]] += 1
+                else:
+                    self.skipped[key[0]] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Returns the counters.
+
+        Returns:
+            dict: The evaluations, degraded evaluations and ratio, and the
+            approximated and skipped transforms per transform name.
+        """
+        with self._lock:
+            return {
+                "latency_budget_ms": RISK_LATENCY_BUDGET_MS,
+                "evaluations": self.evaluations,
+                "degraded": self.degraded,
+                "degraded_ratio": (
+                    self.degraded / self.evaluations if self.evaluations else 0.0
+                ),
+                "approximated": dict(self.approximated),
+                "skipped": dict(self.skipped),
+            }
+
+
+degraded_metrics = DegradedModeMetrics()
+
+
+class AsyncRiskEvaluator(RiskEvaluator):
+    """
+    Evaluates transaction risk without blocking the event loop.
+
+    The database-backed transforms used by the rule set are fetched with the
+    asyncio helpers first, concurrently; the compiled rules then run against
+    those results, so the evaluation itself never touches a database.
+
+    The fetch waits at most ``latency_budget`` seconds. Transforms still running
+    then are cancelled and answered from the sliding-window history when it
+    holds the pair, or left unknown, in which case the conditions reading them
+    do not match; the decision names the rules evaluated this way.
+    """
+
+    def __init__(self, latency_budget: Optional[float] = RISK_LATENCY_BUDGET_MS / 1000):
+        super().__init__()
+        self.async_frequency_helper = AsyncDestinationFrequencyHelper()
+        self.async_transaction_helper = AsyncTransactionHelper()
+        self.latency_budget = latency_budget or None
+
+    async def prefetch(
+        self,
+        transaction: Transaction,
+        rules: Iterable[CompiledRule],
+        timeout: Optional[float] = None,
+    ) -> dict:
+        """
+        Computes every database-backed transform used by the given rules.
+
+        Transforms reading different databases run concurrently, so the wait is
+        about the slowest lookup instead of their sum. The velocity transforms
+        run one after the other in a single task: the first one reads the pair
+        history and the others count from it.
+
+        Args:
+            transaction (Transaction): The transaction being evaluated.
+            rules (Iterable[CompiledRule]): The compiled rules.
+            timeout (Optional[float]): Seconds to wait for the transforms;
+                the ones not computed by then are approximated or skipped and
+                listed in the ``degraded`` attribute of the result.
+
+        Returns:
+            dict: The transform results, keyed by ``transform_key``.
+        """
+        rules = tuple(rules)
+        prefetched = EvaluationContext.for_rules(rules)
+        groups = {}
+        for rule in rules:
+            for transform, params in rule.transforms:
+                key = self.transform_key(transform, params)
+                if key is not None:
+                    groups.setdefault(transform, {}).setdefault(key, params)
+
+        async def fetch(transform: str, keys: dict):
+            observe = TRANSFORM_TIMERS[transform].observe
+            for key, params in keys.items():
+                started = time.perf_counter()
+                prefetched[key] = await self.async_process_transform(
+                    transform, transaction, params, prefetched
+                )
+                observe(time.perf_counter() - started)
+
+        tasks = [
+            asyncio.ensure_future(fetch(transform, keys))
+            for transform, keys in groups.items()
+        ]
+        if not tasks:
+            return prefetched
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.result()
+
+        for transform, keys in groups.items():
+            for key, params in keys.items():
+                if key in prefetched:
+                    continue
+                value = self.approximate_transform(transform, transaction, params)
+                if value is None:
+                    prefetched[key] = UNKNOWN
+                    prefetched.degraded[key] = "skipped"
+                else:
+                    prefetched[key] = value
+                    prefetched.degraded[key] = "approximated"
+        return prefetched
+
+    def approximate_transform(
+        self, transform: str, transaction_field, params: dict
+    ) -> Optional[int]:
+        """
+        Answers a database-backed transform from the sliding-window history only.
+
+        The destination frequency is approximated by the number of transactions
+        of the pair in the last ``KNOWN_DESTINATION_TTL_DAYS`` days, instead of
+        the day buckets of its counter.
+
+        Args:
+            transform (str): The transform to apply.
+            transaction_field (Any): The transaction being evaluated.
+            params (Dict[str, Any]): Additional parameters for the transform.
+
+        Returns:
+            Optional[int]: The approximated value, or None if the history does
+            not hold the pair or the window.
+        """
+        origin_account_id = transaction_field.origin_account_rel.id
+        destination_account_id = transaction_field.destination_account_rel.id
+        if transform == COUNT_SAME_TRX_TRANSFORM:
+            return count_similar_in_history(
+                origin_account_id, destination_account_id, params
+            )
+        return history_store.count(
+            (origin_account_id, destination_account_id),
+            {member.value for member in ChannelEnum},
+            KNOWN_DESTINATION_TTL_DAYS * 24 * 60,
+        )
+
+    async def async_process_transform(
+        self,
+        transform: str,
+        transaction_field,
+        params: dict,
+        context: EvaluationContext = None,
+    ) -> Any:
+        """
+        Computes a database-backed transform with the asyncio helpers.
+
+        Args:
+            transform (str): The transform to apply.
+            transaction_field (Any): The transaction being evaluated.
+            params (Dict[str, Any]): Additional parameters for the transform.
+            context (EvaluationContext, optional): The evaluation context; the
+                velocity transforms the sliding-window history cannot answer
+                share the rows it reads.
+
+        Returns:
+            Any: The same value ``process_transform`` would return.
+        """
+        origin_account_id = transaction_field.origin_account_rel.id
+        destination_account_id = transaction_field.destination_account_rel.id
+
+        if transform == COUNT_SAME_TRX_TRANSFORM:
+            window = params["interval_minutes"]
+            if context is not None:
+                window = max(window, context.history_minutes)
+            if history_store.covers(window):
+                pair = (origin_account_id, destination_account_id)
+                if not history_store.is_warm(pair):
+                    helper = self.async_transaction_helper
+                    with history_store.loading(pair):
+                        rows = await helper.get_recent_transactions(
+                            [pair], history_store.lookback(), with_ids=True
+                        )
+                        load_pair(origin_account_id, destination_account_id, rows)
+                count = count_similar_in_history(
+                    origin_account_id, destination_account_id, params
+                )
+                if count is not None:
+                    return count
+
+            channels = [ChannelEnum[channel].value for channel in params["channel"]]
+            if context is not None:
+                scope = context.history_scope(params["interval_minutes"], channels)
+                if scope is not None:
+                    minutes, scope_channels = scope
+                    context.set_history(
+                        await self.async_transaction_helper.get_recent_transactions(
+                            [(origin_account_id, destination_account_id)],
+                            datetime.now() - timedelta(minutes=minutes),
+                            scope_channels,
+                        ),
+                        minutes,
+                        scope_channels,
+                    )
+                return self.count_in_history(context.history_rows, params)
+
+            result = await self.async_transaction_helper.count_transaction_by_user_channel(
+                channel=channels,
+                lookback=datetime.now() - timedelta(minutes=params["interval_minutes"]),
+                origin_account_id=origin_account_id,
+                destination_account_id=destination_account_id,
+            )
+            return self.count_similar_transactions(result, params)
+
+        frequency = await self.async_frequency_helper.get_frequency(
+            origin_account_id, destination_account_id
+        )
+        # Transactions recorded but still in the write-behind buffer
+        return frequency + frequency_buffer.pending(
+            (origin_account_id, destination_account_id)
+        )
+
+    async def decide_async(self, transaction: Transaction) -> RiskDecision:
+        """
+        Evaluates the transaction risk, waiting for the database reads at most
+        ``latency_budget`` seconds.
+
+        Args:
+            transaction (Transaction): The transaction to evaluate.
+
+        Returns:
+            RiskDecision: The suspect flag and the rules evaluated in degraded mode.
+        """
+        # One read of the rule set, which a refresh may swap during the awaits
+        rules = await rule_cache.get_rules_async()
+        prefetched = await self.prefetch(transaction, rules, self.latency_budget)
+        suspect = self.calculate_risk(transaction, prefetched=prefetched, rules=rules)
+        degraded_metrics.record(prefetched.degraded)
+        degraded_rules = tuple(
+            rule.name
+            for rule in rules
+            if any(
+                self.transform_key(transform, params) in prefetched.degraded
+                for transform, params in rule.transforms
+            )
+        )
+        if degraded_rules:
+            logger.warning(
+                "Transaction %s evaluated in degraded mode, rules: %s (%s)",
+                transaction.id,
+                ", ".join(degraded_rules),
+                prefetched.degraded,
+            )
+        return RiskDecision(suspect, degraded_rules)
+
+    async def calculate_risk_async(self, transaction: Transaction) -> bool:
+        """
+        Evaluates the transaction risk, awaiting the database reads; see
+        ``decide_async``.
+
+        Args:
+            transaction (Transaction): The transaction to evaluate.
+
+        Returns:
+            bool: True if the transaction matched any rule.
+        """
+        return (await self.decide_async(transaction)).suspect
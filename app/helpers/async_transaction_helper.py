@@ -0,0 +1,218 @@
+"""Asyncio helper class for transaction-related database operations."""
+
+from datetime import datetime
+from typing import Iterable, List, Set, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.logger import logger
+from app.core.metrics import timed_query
+from app.core.postgres_database import get_async_db
+from app.helpers.balance_helper import balance_deltas, balance_upsert
+from app.helpers.history_store_helper import record_rows, record_transaction
+from app.models.tables.transaction_model import Transaction
+
+# Maximum number of keys sent in a single IN clause.
+QUERY_CHUNK_SIZE = 1000
+
+
+class AsyncTransactionHelper:
+    """
+    Asyncio variant of ``TransactionHelper`` for the async request path.
+    """
+
+    async def insert(self, transaction: Transaction) -> Transaction:
+        """
+        Saves a transaction into the database.
+
+        The balances of both accounts are updated in the same database transaction.
+
+        Args:
+            transaction (Transaction): The transaction to be saved.
+
+        Returns:
+            Transaction: The saved transaction object.
+        """
+        async with get_async_db() as db:
+            try:
+                db.add(transaction)
+                await db.execute(balance_upsert(balance_deltas([transaction])))
+                await db.commit()
+                await db.refresh(transaction)
+                record_transaction(transaction)
+                return transaction
+            except SQLAlchemyError as e:
+                await db.rollback()
+                raise e
+
+    @timed_query
+    async def count_transaction_by_user_channel(
+        self,
+        channel: tuple,
+        lookback: datetime,
+        origin_account_id: int,
+        destination_account_id: int,
+    ) -> list:
+        """
+        Counts how many transactions a given user has done in the last lookback time period
+        in the given channels.
+
+        Args:
+            channel (tuple): The list of channels to filter the query.
+            lookback (datetime): Timestamp from which to start counting transactions.
+            origin_account_id (int): The user that did the transactions.
+            destination_account_id (int): The destination of the transactions.
+
+        Returns:
+            list: A list of tuples with the channel, amount, destination_account_id and count of transactions.
+        """
+        async with get_async_db() as db:
+            try:
+                result = await db.execute(
+                    select(
+                        Transaction.channel,
+                        Transaction.amount,
+                        Transaction.destination_account_id,
+                        Transaction.origin_account_id,
+                        # pylint: disable=not-callable
+                        func.count(Transaction.id).label("count"),
+                    )
+                    .join(Transaction.destination_account_rel)
+                    .where(
+                        Transaction.channel.in_(channel),
+                        Transaction.created_at > lookback,
+                        Transaction.origin_account_id == origin_account_id,
+                        Transaction.destination_account_id == destination_account_id,
+                    )
+                    .group_by(
+                        Transaction.channel,
+                        Transaction.amount,
+                        Transaction.destination_account_id,
+                        Transaction.origin_account_id,
+                    )
+                )
+                return result.all()
+            except SQLAlchemyError as e:
+                logger.error("Error counting transactions", exc_info=True)
+                await db.rollback()
+                raise e
+
+    async def insert_many(self, rows: List[dict]) -> Set[str]:
+        """
+        Saves many transactions with a single multi-row insert.
+
+        Transactions whose id already exists are skipped instead of failing the
+        whole batch. The balances of the accounts involved are updated in the
+        same database transaction, for the inserted transactions only.
+
+        Args:
+            rows (List[dict]): The transaction column values.
+
+        Returns:
+            Set[str]: The ids of the transactions actually inserted.
+        """
+        if not rows:
+            return set()
+        async with get_async_db() as db:
+            try:
+                result = await db.execute(
+                    insert(Transaction)
+                    .on_conflict_do_nothing(index_elements=[Transaction.id])
+                    .returning(Transaction.id),
+                    rows,
+                )
+                inserted = set(result.scalars().all())
+                if inserted:
+                    await db.execute(
+                        balance_upsert(
+                            balance_deltas(row for row in rows if row["id"] in inserted)
+                        )
+                    )
+                await db.commit()
+                record_rows(row for row in rows if row["id"] in inserted)
+                return inserted
+            except SQLAlchemyError as e:
+                await db.rollback()
+                raise e
+
+    async def get_existing_ids(self, ids: Iterable[str]) -> Set[str]:
+        """
+        Returns which of the given transaction ids are already stored.
+
+        Args:
+            ids (Iterable[str]): The transaction ids.
+
+        Returns:
+            Set[str]: The ids that already exist.
+        """
+        ids = list(set(ids))
+        existing = set()
+        async with get_async_db() as db:
+            try:
+                for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+                    result = await db.execute(
+                        select(Transaction.id).where(
+                            Transaction.id.in_(ids[start : start + QUERY_CHUNK_SIZE])
+                        )
+                    )
+                    existing.update(result.scalars().all())
+            except SQLAlchemyError as e:
+                raise e
+        return existing
+
+    @timed_query
+    async def get_recent_transactions(
+        self,
+        pairs: Iterable[Tuple[int, int]],
+        lookback: datetime,
+        channels: Iterable[int] = None,
+        with_ids: bool = False,
+    ) -> list:
+        """
+        Retrieves the transactions made after ``lookback`` between many
+        origin/destination pairs.
+
+        Args:
+            pairs (Iterable[Tuple[int, int]]): The (origin, destination) account ids.
+            lookback (datetime): Timestamp from which to retrieve transactions.
+            channels (Iterable[int], optional): The channel codes to retrieve;
+                every channel when not given.
+            with_ids (bool): Whether to add the transaction id to the rows.
+
+        Returns:
+            list: Rows of origin_account_id, destination_account_id, channel,
+            amount and created_at (and id, with ``with_ids``).
+        """
+        pairs = list(set(pairs))
+        filters = [Transaction.created_at > lookback]
+        if channels is not None:
+            filters.append(Transaction.channel.in_(list(channels)))
+        columns = [
+            Transaction.origin_account_id,
+            Transaction.destination_account_id,
+            Transaction.channel,
+            Transaction.amount,
+            Transaction.created_at,
+        ]
+        if with_ids:
+            columns.append(Transaction.id)
+        rows = []
+        async with get_async_db() as db:
+            try:
+                for start in range(0, len(pairs), QUERY_CHUNK_SIZE):
+                    result = await db.execute(
+                        select(*columns).where(
+                            tuple_(
+                                Transaction.origin_account_id,
+                                Transaction.destination_account_id,
+                            ).in_(pairs[start : start + QUERY_CHUNK_SIZE]),
+                            *filters,
+                        )
+                    )
+                    rows.extend(result.all())
+            except SQLAlchemyError as e:
+                logger.error("Error retrieving transactions", exc_info=True)
+                raise e
+        return rows
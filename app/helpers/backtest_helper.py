@@ -0,0 +1,252 @@
+"""Helper class for replaying stored transactions through a rule set."""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+
+from app.core.config import BACKTEST_FETCH_SIZE
+from app.core.constants import ChannelEnum
+from app.core.logger import logger
+from app.core.postgres_database import engine, get_db
+from app.core.rules import compile_rule
+from app.helpers.offline_scoring_helper import PointInTimeScorer
+from app.models.tables.account_model import Account
+from app.models.tables.transaction_model import Transaction
+
+
+@dataclass
+class BacktestResult:
+    """
+    Outcome of replaying transactions through a rule set.
+
+    Attributes:
+        evaluated (int): Transactions replayed.
+        flagged (int): Transactions matching at least one rule.
+        stored_suspect (int): Transactions stored as suspect.
+        rule_hits (Counter): Transactions matched, per rule name.
+        newly_flagged (int): Flagged now but stored as not suspect.
+        cleared (int): Stored as suspect but not flagged now.
+        newly_flagged_ids (List[str]): Sample of newly flagged transaction ids.
+        cleared_ids (List[str]): Sample of cleared transaction ids.
+    """
+
+    evaluated: int = 0
+    flagged: int = 0
+    stored_suspect: int = 0
+    rule_hits: Counter = field(default_factory=Counter)
+    newly_flagged: int = 0
+    cleared: int = 0
+    newly_flagged_ids: List[str] = field(default_factory=list)
+    cleared_ids: List[str] = field(default_factory=list)
+
+    def merge(self, other: "BacktestResult", sample_size: int):
+        """Adds the counters of another partition to this result."""
+        self.evaluated += other.evaluated
+        self.flagged += other.flagged
+        self.stored_suspect += other.stored_suspect
+        self.rule_hits.update(other.rule_hits)
+        self.newly_flagged += other.newly_flagged
+        self.cleared += other.cleared
+        self.newly_flagged_ids = (self.newly_flagged_ids + other.newly_flagged_ids)[
+            :sample_size
+        ]
+        self.cleared_ids = (self.cleared_ids + other.cleared_ids)[:sample_size]
+
+    def add_chunk(
+        self,
+        transactions: Sequence[Transaction],
+        masks: Dict[str, np.ndarray],
+        sample_size: int,
+    ):
+        """Counts a chunk of replayed transactions, given the rows each rule matched."""
+        flagged = np.zeros(len(transactions), dtype=bool)
+        for name, mask in masks.items():
+            flagged |= mask
+            if mask.any():
+                self.rule_hits[name] += int(mask.sum())
+        stored = np.array([bool(t.suspect) for t in transactions], dtype=bool)
+        newly_flagged = np.flatnonzero(flagged & ~stored)
+        cleared = np.flatnonzero(stored & ~flagged)
+
+        self.evaluated += len(transactions)
+        self.flagged += int(flagged.sum())
+        self.stored_suspect += int(stored.sum())
+        self.newly_flagged += len(newly_flagged)
+        self.cleared += len(cleared)
+        self.newly_flagged_ids += [
+            transactions[index].id
+            for index in newly_flagged[: sample_size - len(self.newly_flagged_ids)]
+        ]
+        self.cleared_ids += [
+            transactions[index].id
+            for index in cleared[: sample_size - len(self.cleared_ids)]
+        ]
+
+
+def replay_partition(
+    rule_documents: Dict[str, list],
+    start: datetime,
+    end: datetime,
+    origin_range: Tuple[int, int],
+    sample_size: int = 20,
+) -> BacktestResult:
+    """
+    Replays the transactions of a range of origin accounts.
+
+    The transactions made up to the widest rule window before ``start`` are read
+    first, only to build the history; the ones in ``[start, end)`` are then
+    evaluated in chronological order, each one against the transactions made
+    before it, in chunks of ``BACKTEST_FETCH_SIZE`` evaluated at once by
+    ``PointInTimeScorer.rule_masks``. Every transform reads the history of a
+    single origin, so ranges of origins are replayed independently.
+
+    Args:
+        rule_documents (Dict[str, list]): The rule conditions per rule name.
+        start (datetime): The start of the replayed range.
+        end (datetime): The end of the replayed range, excluded.
+        origin_range (Tuple[int, int]): The first and last origin account ids.
+        sample_size (int): How many differing ids to keep, per direction.
+
+    Returns:
+        BacktestResult: The counters of the partition.
+
+    Raises:
+        SQLAlchemyError: If an error occurs during the database operation.
+    """
+    scorer = PointInTimeScorer(
+        tuple(
+            compile_rule(name, conditions)
+            for name, conditions in rule_documents.items()
+        )
+    )
+    statement = (
+        select(Transaction)
+        .options(
+            joinedload(Transaction.origin_account_rel).joinedload(Account.customer_rel),
+            joinedload(Transaction.destination_account_rel).joinedload(
+                Account.customer_rel
+            ),
+        )
+        .where(
+            Transaction.origin_account_id.between(*origin_range),
+            Transaction.created_at >= start - scorer.retention,
+            Transaction.created_at < end,
+        )
+        .order_by(Transaction.created_at, Transaction.id)
+        .execution_options(yield_per=BACKTEST_FETCH_SIZE)
+    )
+
+    result = BacktestResult()
+    chunk = []
+    with get_db() as db:
+        try:
+            for transaction in db.scalars(statement):
+                if transaction.created_at < start:
+                    scorer.add(transaction)
+                    continue
+                # Channel rules compare names, as for the transactions being stored.
+                transaction.channel = ChannelEnum(transaction.channel)
+                chunk.append(transaction)
+                if len(chunk) >= BACKTEST_FETCH_SIZE:
+                    result.add_chunk(chunk, scorer.rule_masks(chunk), sample_size)
+                    chunk = []
+            if chunk:
+                result.add_chunk(chunk, scorer.rule_masks(chunk), sample_size)
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise e
+    logger.info(
+        "Backtest of origins %s-%s: %s transactions replayed",
+        origin_range[0],
+        origin_range[1],
+        result.evaluated,
+    )
+    return result
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be reused.
+    engine.dispose(close=False)
+
+
+class BacktestHelper:
+    """
+    Replays a time range of stored transactions through a rule set, in parallel
+    processes, to measure what the rules would flag.
+    """
+
+    def partitions(self, count: int) -> List[Tuple[int, int]]:
+        """
+        Splits the accounts into ranges of ids of about the same size.
+
+        Args:
+            count (int): The number of ranges.
+
+        Returns:
+            List[Tuple[int, int]]: The first and last account id of each range.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation.
+        """
+        bucket = func.ntile(count).over(order_by=Account.id).label("bucket")
+        accounts = select(Account.id, bucket).subquery()
+        statement = (
+            select(func.min(accounts.c.id), func.max(accounts.c.id))
+            .group_by(accounts.c.bucket)
+            .order_by(accounts.c.bucket)
+        )
+        with get_db() as db:
+            try:
+                return [tuple(row) for row in db.execute(statement)]
+            except SQLAlchemyError as e:
+                db.rollback()
+                raise e
+
+    def run(
+        self,
+        rule_documents: Dict[str, list],
+        start: datetime,
+        end: datetime,
+        workers: int = 1,
+        sample_size: int = 20,
+    ) -> BacktestResult:
+        """
+        Replays the transactions made in ``[start, end)``.
+
+        Args:
+            rule_documents (Dict[str, list]): The rule conditions per rule name.
+            start (datetime): The start of the range.
+            end (datetime): The end of the range, excluded.
+            workers (int): The number of processes; the accounts are split in
+                as many ranges of origin accounts.
+            sample_size (int): How many differing ids to keep, per direction.
+
+        Returns:
+            BacktestResult: The counters of the whole range.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during a database operation.
+        """
+        replay = partial(
+            replay_partition, rule_documents, start, end, sample_size=sample_size
+        )
+        ranges = self.partitions(max(workers, 1))
+        result = BacktestResult()
+        if workers <= 1 or len(ranges) <= 1:
+            for origin_range in ranges:
+                result.merge(replay(origin_range), sample_size)
+            return result
+        with ProcessPoolExecutor(
+            max_workers=len(ranges), initializer=_init_worker
+        ) as executor:
+            for partition in executor.map(replay, ranges):
+                result.merge(partition, sample_size)
+        return result
@@ -0,0 +1,234 @@
+"""Helper class for the maintained account balances."""
+
+import threading
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+from sqlalchemy import func, literal_column, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.dml import Insert
+
+from app.core.config import BALANCE_RECONCILE_FIX, BALANCE_RECONCILE_INTERVAL_SECONDS
+from app.core.logger import logger
+from app.core.postgres_database import get_db
+from app.models.tables.account_balance_model import AccountBalance
+from app.models.tables.transaction_model import Transaction
+
+
+def balance_deltas(transactions: Iterable) -> Dict[int, Decimal]:
+    """
+    Computes how a set of transactions changes the balance of each account.
+
+    Args:
+        transactions (Iterable): Transactions, or dicts of transaction column
+            values, with origin_account_id, destination_account_id and amount.
+
+    Returns:
+        Dict[int, Decimal]: The balance change per account id.
+    """
+    deltas: Dict[int, Decimal] = defaultdict(Decimal)
+    for item in transactions:
+        if isinstance(item, dict):
+            origin, destination, amount = (
+                item["origin_account_id"],
+                item["destination_account_id"],
+                item["amount"],
+            )
+        else:
+            origin, destination, amount = (
+                item.origin_account_id,
+                item.destination_account_id,
+                item.amount,
+            )
+        amount = Decimal(amount)
+        deltas[origin] -= amount
+        deltas[destination] += amount
+    return deltas
+
+
+def balance_upsert(deltas: Dict[int, Decimal]) -> Insert:
+    """
+    Builds the statement adding balance changes to the account balances.
+
+    Rows are sorted by account id, so concurrent transactions touching the same
+    accounts lock them in the same order and do not deadlock.
+
+    Args:
+        deltas (Dict[int, Decimal]): The balance change per account id.
+
+    Returns:
+        Insert: An ``INSERT ... ON CONFLICT DO UPDATE`` adding each change to
+        the stored balance, creating the balance rows that do not exist yet.
+    """
+    now = datetime.now()
+    statement = insert(AccountBalance).values(
+        [
+            {"account_id": account_id, "balance": delta, "updated_at": now}
+            for account_id, delta in sorted(deltas.items())
+        ]
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[AccountBalance.account_id],
+        set_={
+            "balance": AccountBalance.balance + statement.excluded.balance,
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+
+
+def ledger_balances():
+    """
+    Builds the subquery computing every account balance from the ledger.
+
+    Returns:
+        Subquery: account_id and balance, for the accounts with transactions.
+    """
+    movements = union_all(
+        select(
+            Transaction.destination_account_id.label("account_id"),
+            Transaction.amount.label("delta"),
+        ),
+        select(
+            Transaction.origin_account_id.label("account_id"),
+            (-Transaction.amount).label("delta"),
+        ),
+    ).subquery()
+    return (
+        select(
+            movements.c.account_id,
+            func.sum(movements.c.delta).label("balance"),
+        )
+        .group_by(movements.c.account_id)
+        .subquery()
+    )
+
+
+class BalanceHelper:
+    """
+    Helper class for the ``account_balance`` table.
+    """
+
+    def reconcile(self, fix: bool = False) -> List[dict]:
+        """
+        Recomputes every balance from the ledger and reports the drift.
+
+        The ledger and the stored balances are read from the same snapshot
+        (REPEATABLE READ), so transactions committed meanwhile never show as
+        drift. Fixes add the drift to the stored balance instead of overwriting
+        it, so balance updates committed after the snapshot are kept.
+
+        Args:
+            fix (bool): Whether to correct the drifted balances.
+
+        Returns:
+            List[dict]: account_id, stored, ledger and drift of every account whose
+            stored balance differs from the ledger.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation.
+        """
+        ledger = ledger_balances()
+        stored = func.coalesce(AccountBalance.balance, 0)
+        computed = func.coalesce(ledger.c.balance, 0)
+        query = (
+            select(
+                func.coalesce(ledger.c.account_id, AccountBalance.account_id).label(
+                    "account_id"
+                ),
+                stored.label("stored"),
+                computed.label("ledger"),
+            )
+            .select_from(ledger)
+            .join(
+                AccountBalance,
+                AccountBalance.account_id == ledger.c.account_id,
+                full=True,
+            )
+            .where(stored != computed)
+            .order_by(literal_column("account_id"))
+        )
+
+        with get_db() as db:
+            try:
+                db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+                drift = [
+                    {
+                        "account_id": row.account_id,
+                        "stored": row.stored,
+                        "ledger": row.ledger,
+                        "drift": row.ledger - row.stored,
+                    }
+                    for row in db.execute(query)
+                ]
+                db.commit()
+            except SQLAlchemyError as e:
+                db.rollback()
+                raise e
+
+            for item in drift:
+                logger.warning(
+                    "Balance drift on account %s: stored %s, ledger %s",
+                    item["account_id"],
+                    item["stored"],
+                    item["ledger"],
+                )
+            if fix and drift:
+                try:
+                    db.execute(
+                        balance_upsert(
+                            {item["account_id"]: item["drift"] for item in drift}
+                        )
+                    )
+                    db.commit()
+                    logger.info("Fixed the balance of %s accounts", len(drift))
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    raise e
+        return drift
+
+
+class BalanceReconciler:
+    """
+    Runs ``BalanceHelper.reconcile`` every ``interval`` seconds in a background
+    thread. An ``interval`` of zero disables it.
+    """
+
+    def __init__(self, interval: int, fix: bool = False):
+        self.interval = interval
+        self.fix = fix
+        self.balance_helper = BalanceHelper()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the background reconciliation thread, if enabled."""
+        if self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="balance-reconciler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background reconciliation thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                drift = self.balance_helper.reconcile(fix=self.fix)
+                logger.info("Balance reconciliation: %s accounts drifted", len(drift))
+            except SQLAlchemyError:
+                logger.error("Error reconciling balances", exc_info=True)
+
+
+balance_reconciler = BalanceReconciler(
+    BALANCE_RECONCILE_INTERVAL_SECONDS, BALANCE_RECONCILE_FIX
+)
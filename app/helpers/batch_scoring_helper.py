@@ -0,0 +1,283 @@
+"""Helper class for scoring many transactions in a single pass."""
+
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.core.constants import ChannelEnum
+from app.core.logger import logger
+from app.core.rules import (
+    COUNT_SAME_TRX_TRANSFORM,
+    DESTINATION_FREQUENCY_TRANSFORM,
+    CompiledRule,
+)
+from app.helpers.async_account_helper import AsyncAccountHelper
+from app.helpers.async_destination_frequency_helper import (
+    AsyncDestinationFrequencyHelper,
+)
+from app.helpers.async_frequency_buffer_helper import frequency_buffer
+from app.helpers.async_transaction_helper import AsyncTransactionHelper
+from app.helpers.risk_engine_helper import RiskEvaluator
+from app.helpers.rule_cache_helper import rule_cache
+from app.helpers.vectorized_risk_helper import (
+    TransactionFrame,
+    VectorizedRiskEvaluator,
+    stack_context,
+)
+from app.models.tables.transaction_model import Transaction
+from app.schemas.transaction_schemas import (
+    BatchTransactionResult,
+    PutTransactionRequest,
+)
+
+
+class BatchScoringHelper:
+    """
+    Scores and stores a batch of transactions with a fixed number of queries.
+
+    Accounts, existing ids and the history used by the rules are read once for
+    the whole batch. The rule transforms are then computed in memory, item by
+    item and in request order, with every item added to the shared history so
+    later items see it exactly as if they had been sent one at a time, and the
+    rules are evaluated over the whole batch at once by
+    ``VectorizedRiskEvaluator``. Accepted transactions are stored with a single
+    bulk insert per database.
+    """
+
+    def __init__(self):
+        self.account_helper = AsyncAccountHelper()
+        self.transaction_helper = AsyncTransactionHelper()
+        self.frequency_helper = AsyncDestinationFrequencyHelper()
+        self.risk_evaluator = RiskEvaluator()
+        self.vectorized_evaluator = VectorizedRiskEvaluator()
+
+    @staticmethod
+    def _validate(item: PutTransactionRequest) -> Tuple[Optional[ChannelEnum], str]:
+        """Returns the item channel, or the reason the item is rejected."""
+        if (
+            item.agencia_de_origem == item.agencia_de_destino
+            and item.conta_de_origem == item.conta_de_destino
+        ):
+            return None, "Origin and destination accounts cannot be the same"
+        if item.valor_da_transacao <= 0:
+            return None, "Transaction amount must be greater than zero"
+        try:
+            return ChannelEnum.from_code(item.canal), ""
+        except ValueError:
+            return None, "Invalid channel code"
+
+    async def score(
+        self, items: List[PutTransactionRequest]
+    ) -> List[BatchTransactionResult]:
+        """
+        Scores and stores a batch of transactions.
+
+        Invalid items are rejected individually and never stop the rest of the batch.
+
+        Args:
+            items (List[PutTransactionRequest]): The transactions, in evaluation order.
+
+        Returns:
+            List[BatchTransactionResult]: One result per item, in the same order.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during a PostgreSQL operation.
+            PyMongoError: If an error occurs during a MongoDB operation.
+        """
+        results = [
+            BatchTransactionResult(id_da_transacao=item.id_da_transacao)
+            for item in items
+        ]
+        valid = []
+        seen_ids = set()
+        for index, item in enumerate(items):
+            channel, error = self._validate(item)
+            if not error and item.id_da_transacao in seen_ids:
+                error = "Duplicate transaction id in batch"
+            if error:
+                results[index].error = error
+                continue
+            seen_ids.add(item.id_da_transacao)
+            valid.append((index, item, channel))
+
+        accounts = await self.account_helper.get_accounts_by_numbers(
+            number
+            for _, item, _ in valid
+            for number in (
+                (item.agencia_de_origem, item.conta_de_origem),
+                (item.agencia_de_destino, item.conta_de_destino),
+            )
+        )
+        existing_ids = await self.transaction_helper.get_existing_ids(seen_ids)
+
+        transactions = []
+        for index, item, channel in valid:
+            origin = accounts.get((item.agencia_de_origem, item.conta_de_origem))
+            destination = accounts.get((item.agencia_de_destino, item.conta_de_destino))
+            if origin is None:
+                results[index].error = "Origin account not found"
+            elif destination is None:
+                results[index].error = "Destination account not found"
+            elif item.id_da_transacao in existing_ids:
+                results[index].error = "Transaction already exists"
+            else:
+                transactions.append(
+                    (
+                        index,
+                        Transaction(
+                            id=item.id_da_transacao,
+                            origin_account_id=origin.id,
+                            destination_account_id=destination.id,
+                            amount=item.valor_da_transacao,
+                            channel=channel,
+                            created_at=item.data_e_hora_da_transacao.replace(
+                                tzinfo=None
+                            ),
+                            origin_account_rel=origin,
+                            destination_account_rel=destination,
+                        ),
+                    )
+                )
+
+        rules = await rule_cache.get_rules_async()
+        history, frequencies = await self._load_history(
+            [transaction for _, transaction in transactions], rules
+        )
+        contexts = []
+        for _, transaction in transactions:
+            contexts.append(self._prefetch(transaction, rules, history, frequencies))
+            pair = (transaction.origin_account_id, transaction.destination_account_id)
+            history[pair].append(
+                (int(transaction.channel), transaction.amount, transaction.created_at)
+            )
+            frequencies[pair] += 1
+        if transactions:
+            scored = [transaction for _, transaction in transactions]
+            frame = TransactionFrame.from_transactions(
+                scored, self.vectorized_evaluator.fields(rules)
+            )
+            flags = self.vectorized_evaluator.calculate_risk(
+                rules, frame, stack_context(contexts, len(scored))
+            )
+            for transaction, suspect in zip(scored, flags):
+                transaction.suspect = bool(suspect)
+
+        inserted = await self.transaction_helper.insert_many(
+            [
+                {
+                    "id": transaction.id,
+                    "created_at": transaction.created_at,
+                    "amount": transaction.amount,
+                    "channel": int(transaction.channel),
+                    "suspect": transaction.suspect,
+                    "origin_account_id": transaction.origin_account_id,
+                    "destination_account_id": transaction.destination_account_id,
+                }
+                for _, transaction in transactions
+            ]
+        )
+        for index, transaction in transactions:
+            if transaction.id in inserted:
+                results[index].suspect = transaction.suspect
+            else:
+                # Stored by a concurrent request after the existing ids were read.
+                results[index].error = "Transaction already exists"
+        logger.info("Batch processed: %s created of %s", len(inserted), len(items))
+
+        await self.frequency_helper.increment_many(
+            Counter(
+                (transaction.origin_account_id, transaction.destination_account_id)
+                for _, transaction in transactions
+                if transaction.id in inserted
+            )
+        )
+        return results
+
+    async def _load_history(
+        self, transactions: List[Transaction], rules: Tuple[CompiledRule, ...]
+    ) -> Tuple[Dict[tuple, list], Counter]:
+        """
+        Reads, once for the whole batch, the history the rule transforms need.
+
+        Args:
+            transactions (List[Transaction]): The transactions to be scored.
+            rules (Tuple[CompiledRule, ...]): The compiled rules.
+
+        Returns:
+            Tuple[Dict[tuple, list], Counter]: The recent transactions as
+            (channel, amount, created_at) per (origin, destination) pair, and how
+            many times each pair is a known destination.
+        """
+        history = defaultdict(list)
+        frequencies = Counter()
+        if not transactions:
+            return history, frequencies
+
+        transforms = [item for rule in rules for item in rule.transforms]
+        intervals = [
+            params["interval_minutes"]
+            for transform, params in transforms
+            if self.risk_evaluator.transform_key(transform, params) is not None
+            and transform == COUNT_SAME_TRX_TRANSFORM
+        ]
+        if intervals:
+            rows = await self.transaction_helper.get_recent_transactions(
+                {
+                    (t.origin_account_id, t.destination_account_id)
+                    for t in transactions
+                },
+                datetime.now() - timedelta(minutes=max(intervals)),
+            )
+            for origin, destination, channel, amount, created_at in rows:
+                history[(origin, destination)].append((channel, amount, created_at))
+
+        if any(
+            transform == DESTINATION_FREQUENCY_TRANSFORM for transform, _ in transforms
+        ):
+            pairs = {
+                (t.origin_account_id, t.destination_account_id) for t in transactions
+            }
+            frequencies = await self.frequency_helper.get_frequencies(pairs)
+            # Transactions recorded but still in the write-behind buffer
+            for pair in pairs:
+                frequencies[pair] += frequency_buffer.pending(pair)
+        return history, frequencies
+
+    def _prefetch(
+        self,
+        transaction: Transaction,
+        rules: Tuple[CompiledRule, ...],
+        history: Dict[tuple, list],
+        frequencies: Counter,
+    ) -> dict:
+        """
+        Computes the database-backed transforms of a transaction from the batch history.
+
+        Returns:
+            dict: The transform results, keyed by ``transform_key``.
+        """
+        pair = (transaction.origin_account_id, transaction.destination_account_id)
+        prefetched = {}
+        for rule in rules:
+            for transform, params in rule.transforms:
+                key = self.risk_evaluator.transform_key(transform, params)
+                if key is None or key in prefetched:
+                    continue
+                if transform == DESTINATION_FREQUENCY_TRANSFORM:
+                    prefetched[key] = frequencies[pair]
+                    continue
+                channels = [ChannelEnum[channel].value for channel in params["channel"]]
+                lookback = datetime.now() - timedelta(minutes=params["interval_minutes"])
+                counts = Counter(
+                    (channel, amount)
+                    for channel, amount, created_at in history.get(pair, ())
+                    if channel in channels and created_at > lookback
+                )
+                prefetched[key] = self.risk_evaluator.count_similar_transactions(
+                    [
+                        (channel, amount, pair[1], pair[0], count)
+                        for (channel, amount), count in counts.items()
+                    ],
+                    params,
+                )
+        return prefetched
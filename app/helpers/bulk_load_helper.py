@@ -0,0 +1,346 @@
+"""Helper class for loading historical transactions with PostgreSQL COPY."""
+
+import csv
+import io
+import json
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+
+from app.core.config import BULK_LOAD_BATCH_SIZE
+from app.core.constants import ChannelEnum
+from app.core.logger import logger
+from app.core.postgres_database import engine
+from app.helpers.account_helper import AccountHelper
+from app.helpers.destination_frequency_helper import DestinationFrequencyHelper
+from app.helpers.offline_scoring_helper import PointInTimeScorer
+from app.helpers.rule_cache_helper import rule_cache
+from app.models.collections.user_cache_model import KNOWN_DESTINATION_TTL_DAYS
+from app.models.tables.account_model import Account
+from app.models.tables.customer_model import Customer
+from app.models.tables.transaction_model import Transaction
+from app.schemas.transaction_schemas import PutTransactionRequest
+
+# A record read from an input file: the raw fields, or None and the parse error.
+Record = Tuple[Optional[dict], str]
+
+COLUMNS = (
+    "id",
+    "created_at",
+    "amount",
+    "channel",
+    "suspect",
+    "origin_account_id",
+    "destination_account_id",
+)
+STAGE_TABLE = "bulk_load_transaction"
+
+CREATE_STAGE = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE}
+(LIKE transaction INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+"""
+COPY_STAGE = f"COPY {STAGE_TABLE} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+# Moves the staged rows into ``transaction``, skipping the ids already stored,
+# and adds the inserted amounts to ``account_balance`` in the same statement.
+# Returns the inserted transactions counted per (origin, destination, day).
+MERGE_STAGE = f"""
+WITH inserted AS (
+    INSERT INTO transaction ({', '.join(COLUMNS)})
+    SELECT {', '.join(COLUMNS)} FROM {STAGE_TABLE}
+    ON CONFLICT (id) DO NOTHING
+    RETURNING origin_account_id, destination_account_id, amount, created_at
+),
+movements AS (
+    SELECT destination_account_id AS account_id, amount AS delta FROM inserted
+    UNION ALL
+    SELECT origin_account_id AS account_id, -amount AS delta FROM inserted
+),
+balances AS (
+    INSERT INTO account_balance (account_id, balance, updated_at)
+    SELECT account_id, sum(delta), localtimestamp
+    FROM movements
+    GROUP BY account_id
+    ORDER BY account_id
+    ON CONFLICT (account_id) DO UPDATE
+    SET balance = account_balance.balance + excluded.balance,
+        updated_at = excluded.updated_at
+)
+SELECT origin_account_id, destination_account_id, created_at::date, count(*)
+FROM inserted
+GROUP BY 1, 2, 3
+"""
+
+
+def read_ndjson(stream: TextIO) -> Iterator[Record]:
+    """
+    Reads NDJSON transactions, one ``PutTransactionRequest`` object per line.
+
+    Args:
+        stream (TextIO): The input.
+
+    Yields:
+        Record: The fields of each non-blank line, or the reason it is invalid.
+    """
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            yield None, "Invalid JSON"
+            continue
+        if isinstance(data, dict):
+            yield data, ""
+        else:
+            yield None, "Invalid JSON"
+
+
+def read_csv(stream: TextIO) -> Iterator[Record]:
+    """
+    Reads CSV transactions, with a header naming the ``PutTransactionRequest`` fields.
+
+    Args:
+        stream (TextIO): The input.
+
+    Yields:
+        Record: The fields of each row; empty cells are left out.
+    """
+    for row in csv.DictReader(stream):
+        yield {key: value for key, value in row.items() if key and value != ""}, ""
+
+
+@dataclass
+class BulkLoadStats:
+    """
+    Counters of a bulk load.
+
+    Attributes:
+        read (int): Records read from the input.
+        loaded (int): Transactions inserted.
+        duplicates (int): Valid transactions skipped because their id was stored.
+        suspect (int): Transactions flagged by the rules, when scoring.
+        rejected (Counter): Invalid records, per reason.
+        started_at (float): ``time.monotonic()`` when the load started.
+    """
+
+    read: int = 0
+    loaded: int = 0
+    duplicates: int = 0
+    suspect: int = 0
+    rejected: Counter = field(default_factory=Counter)
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the load started."""
+        return time.monotonic() - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        """Records processed per second."""
+        elapsed = self.elapsed
+        return self.read / elapsed if elapsed else 0.0
+
+
+class BulkLoadHelper:
+    """
+    Loads historical transactions into the ``transaction`` table.
+
+    Accounts are resolved with an in-memory map of every account, read once.
+    Valid transactions are written in batches of ``batch_size`` with COPY into a
+    temporary staging table, then moved into ``transaction`` by a single
+    statement that skips the ids already stored and updates ``account_balance``
+    in the same database transaction. The destination frequency counters are
+    incremented for the days still inside their window. The sliding-window
+    history of running API processes picks the loaded transactions up when
+    their pairs expire (``HISTORY_STORE_TTL_SECONDS``).
+
+    With ``score`` set, transactions are evaluated with a ``PointInTimeScorer``:
+    each one is judged as of its own ``created_at``, against the transactions
+    loaded before it, and no database is read per transaction. Inputs must then
+    be in chronological order (each batch is sorted, but batches are not compared).
+    """
+
+    def __init__(self, batch_size: int = BULK_LOAD_BATCH_SIZE, score: bool = False):
+        self.batch_size = batch_size
+        self.score = score
+        self.account_helper = AccountHelper()
+        self.frequency_helper = DestinationFrequencyHelper()
+        self.stats = BulkLoadStats()
+        self.accounts: Dict[Tuple[int, int], int] = {}
+        self.accounts_by_id: Dict[int, Account] = {}
+        self.scorer: Optional[PointInTimeScorer] = None
+
+    def load_accounts(self):
+        """
+        Reads every account into the in-memory map.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during the database operation.
+        """
+        for row in self.account_helper.iter_account_keys():
+            self.accounts[(row.agency, row.account)] = row.id
+            if self.score:
+                self.accounts_by_id[row.id] = Account(
+                    id=row.id,
+                    agency=row.agency,
+                    account=row.account,
+                    customer_id=row.customer_id,
+                    customer_rel=Customer(
+                        id=row.customer_id, name=row.name, age=row.age
+                    ),
+                )
+        logger.info("Bulk load: %s accounts mapped", len(self.accounts))
+
+    def load(self, records: Iterable[Record]) -> BulkLoadStats:
+        """
+        Loads transactions.
+
+        Args:
+            records (Iterable[Record]): The transactions read from the inputs.
+
+        Returns:
+            BulkLoadStats: The counters of the load.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during a PostgreSQL operation.
+            PyMongoError: If an error occurs while updating the counters.
+        """
+        if not self.accounts:
+            self.load_accounts()
+        if self.score and self.scorer is None:
+            self.scorer = PointInTimeScorer(rule_cache.get_rules())
+
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(CREATE_STAGE)
+            connection.commit()
+            batch = []
+            for record, error in records:
+                self.stats.read += 1
+                row, error = self._to_row(record, error)
+                if error:
+                    self.stats.rejected[error] += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self._flush(connection, batch)
+                    batch = []
+            if batch:
+                self._flush(connection, batch)
+        finally:
+            # Returned to the pool, which rolls back whatever was not committed.
+            connection.close()
+        return self.stats
+
+    def _to_row(self, record: Optional[dict], error: str) -> Tuple[Optional[dict], str]:
+        """Validates a record and maps it to ``transaction`` column values."""
+        if record is None:
+            return None, error
+        try:
+            item = PutTransactionRequest.model_validate(record)
+        except ValidationError as e:
+            fields = sorted(
+                {str(error["loc"][0]) for error in e.errors() if error["loc"]}
+            )
+            return None, f"Invalid fields: {', '.join(fields)}"
+        if item.valor_da_transacao <= 0:
+            return None, "Transaction amount must be greater than zero"
+        try:
+            channel = ChannelEnum.from_code(item.canal)
+        except ValueError:
+            return None, "Invalid channel code"
+        origin = self.accounts.get((item.agencia_de_origem, item.conta_de_origem))
+        destination = self.accounts.get(
+            (item.agencia_de_destino, item.conta_de_destino)
+        )
+        if origin is None:
+            return None, "Origin account not found"
+        if destination is None:
+            return None, "Destination account not found"
+        if origin == destination:
+            return None, "Origin and destination accounts cannot be the same"
+        return {
+            "id": item.id_da_transacao,
+            "created_at": item.data_e_hora_da_transacao.replace(tzinfo=None),
+            "amount": item.valor_da_transacao,
+            "channel": channel,
+            "suspect": False,
+            "origin_account_id": origin,
+            "destination_account_id": destination,
+        }, ""
+
+    def _flush(self, connection, batch: List[dict]):
+        """Scores (if enabled), copies and merges a batch, then updates the counters."""
+        if self.score:
+            batch.sort(key=lambda row: row["created_at"])
+            flags = self.scorer.score_many([self._transaction(row) for row in batch])
+            for row, suspect in zip(batch, flags):
+                row["suspect"] = suspect
+                self.stats.suspect += suspect
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow(
+                [
+                    row["id"],
+                    row["created_at"].isoformat(sep=" "),
+                    row["amount"],
+                    int(row["channel"]),
+                    "t" if row["suspect"] else "f",
+                    row["origin_account_id"],
+                    row["destination_account_id"],
+                ]
+            )
+        buffer.seek(0)
+
+        cursor = connection.cursor()
+        cursor.copy_expert(COPY_STAGE, buffer)
+        cursor.execute(MERGE_STAGE)
+        inserted = cursor.fetchall()
+        connection.commit()
+
+        loaded = sum(count for _, _, _, count in inserted)
+        self.stats.loaded += loaded
+        self.stats.duplicates += len(batch) - loaded
+        self._increment_frequencies(inserted)
+        logger.info(
+            "Bulk load: %s read, %s loaded (%.0f rows/s)",
+            self.stats.read,
+            self.stats.loaded,
+            self.stats.rows_per_second,
+        )
+
+    def _increment_frequencies(self, inserted: List[tuple]):
+        """Adds the inserted transactions of the days still counted to the counters."""
+        # The days counted by ``count_recent``, today included
+        oldest = (
+            datetime.now() - timedelta(days=KNOWN_DESTINATION_TTL_DAYS - 1)
+        ).date()
+        per_day = defaultdict(Counter)
+        for origin, destination, day, count in inserted:
+            if day >= oldest:
+                per_day[day][(origin, destination)] += count
+        for day, counts in sorted(per_day.items()):
+            self.frequency_helper.increment_many(
+                counts, datetime.combine(day, datetime.max.time())
+            )
+
+    def _transaction(self, row: dict) -> Transaction:
+        """Builds the transaction evaluated by the rules from its column values."""
+        return Transaction(
+            id=row["id"],
+            created_at=row["created_at"],
+            amount=row["amount"],
+            channel=row["channel"],
+            origin_account_id=row["origin_account_id"],
+            destination_account_id=row["destination_account_id"],
+            origin_account_rel=self.accounts_by_id[row["origin_account_id"]],
+            destination_account_rel=self.accounts_by_id[row["destination_account_id"]],
+        )
@@ -5,6 +5,11 @@ from sqlalchemy.orm import Session
 
 from app.core.postgres_database import get_db
 from app.helpers.account_helper import AccountHelper
+from app.helpers.lookup_cache_helper import (
+    cache_customer,
+    get_cached_customer,
+    invalidate_customer,
+)
 from app.helpers.transaction_helper import TransactionHelper
 from app.interfaces.customer_interface import CustomerInterface
 from app.models.tables.customer_model import Customer
@@ -32,13 +37,20 @@ class CustomerHelper(CustomerInterface):
         Raises:
             SQLAlchemyError: If an error occurs during the database query.
         """
+        cached = get_cached_customer(customer.customer_id)
+        if cached is not None:
+            return cached
+
         with get_db() as db:
             try:
-                return (
+                result = (
                     db.query(Customer)
                     .filter(Customer.id == customer.customer_id)
                     .first()
                 )
+                if result is not None:
+                    cache_customer(result)
+                return result
             except SQLAlchemyError as e:
                 raise e
 
@@ -57,6 +69,7 @@ class CustomerHelper(CustomerInterface):
                 db.add(customer)
                 db.commit()
                 db.refresh(customer)
+                invalidate_customer(customer.id)
                 return customer
 
             except IntegrityError as e:
@@ -71,5 +84,6 @@ class CustomerHelper(CustomerInterface):
             with get_db() as db:
                 db.delete(customer)
                 db.commit()
+            invalidate_customer(customer.id)
         except SQLAlchemyError as e:
             raise e
@@ -0,0 +1,179 @@
+"""Helper class for the origin/destination transaction counters."""
+
+from datetime import datetime, timedelta
+from typing import Mapping, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.core.logger import logger
+from app.core.metrics import timed_query
+from app.core.mongo_database import mongo_connection
+from app.models.collections.user_cache_model import (
+    KNOWN_DESTINATION_TTL_DAYS,
+    DestinationFrequency,
+)
+
+
+def day_key(moment: datetime) -> str:
+    """Returns the key of the daily bucket ``moment`` falls in."""
+    return moment.strftime("%Y%m%d")
+
+
+def increment_update(count: int = 1, now: Optional[datetime] = None) -> dict:
+    """
+    Builds the upsert that adds ``count`` transactions to a pair counter.
+
+    Args:
+        count (int): The number of transactions to add.
+        now (Optional[datetime]): The current time.
+
+    Returns:
+        dict: The update document, incrementing today's bucket and pushing the
+        expiration of the pair ``KNOWN_DESTINATION_TTL_DAYS`` ahead (never back,
+        so past days can be counted too).
+    """
+    now = now or datetime.now()
+    return {
+        "$inc": {f"days.{day_key(now)}": count},
+        "$max": {"expires_at": now + timedelta(days=KNOWN_DESTINATION_TTL_DAYS)},
+    }
+
+
+def count_recent(
+    days: Optional[dict], now: Optional[datetime] = None
+) -> Tuple[int, list]:
+    """
+    Sums the daily buckets of a pair counter that are still in the window.
+
+    Args:
+        days (Optional[dict]): The buckets of the counter document.
+        now (Optional[datetime]): The current time.
+
+    Returns:
+        Tuple[int, list]: The number of transactions in the last
+        ``KNOWN_DESTINATION_TTL_DAYS`` days, and the keys of the expired buckets.
+    """
+    now = now or datetime.now()
+    # Today's bucket is the last of the window.
+    oldest = day_key(now - timedelta(days=KNOWN_DESTINATION_TTL_DAYS - 1))
+    total = 0
+    stale = []
+    for key, count in (days or {}).items():
+        if key >= oldest:
+            total += count
+        else:
+            stale.append(key)
+    return total, stale
+
+
+def prune_update(stale: list) -> dict:
+    """Builds the update removing expired buckets from a pair counter."""
+    return {"$unset": {f"days.{key}": "" for key in stale}}
+
+
+class DestinationFrequencyHelper:
+    """
+    Helper class for the ``destination_frequency`` counters.
+
+    Each lookup is a point read on the unique (origin_user, destination_user)
+    index, whatever the number of transactions between the pair.
+    """
+
+    def increment(self, origin_account_id: int, destination_account_id: int):
+        """
+        Records a transaction from an origin to a destination.
+
+        Args:
+            origin_account_id (int): The origin account id.
+            destination_account_id (int): The destination account id.
+
+        Raises:
+            PyMongoError: If an error occurs during the update.
+        """
+        with mongo_connection():
+            try:
+                # pylint: disable=protected-access
+                DestinationFrequency._get_collection().update_one(
+                    {
+                        "origin_user": origin_account_id,
+                        "destination_user": destination_account_id,
+                    },
+                    increment_update(),
+                    upsert=True,
+                )
+            except PyMongoError as e:
+                logger.error("Error updating destination frequency", exc_info=True)
+                raise e
+
+    def increment_many(
+        self, counts: Mapping[Tuple[int, int], int], now: Optional[datetime] = None
+    ):
+        """
+        Records many transactions with a single unordered bulk write.
+
+        Args:
+            counts (Mapping[Tuple[int, int], int]): Transactions to add per
+                (origin, destination) pair.
+            now (Optional[datetime]): The day the transactions were made;
+                defaults to today.
+
+        Raises:
+            PyMongoError: If an error occurs during the update.
+        """
+        if not counts:
+            return
+        with mongo_connection():
+            try:
+                # pylint: disable=protected-access
+                DestinationFrequency._get_collection().bulk_write(
+                    [
+                        UpdateOne(
+                            {"origin_user": origin, "destination_user": destination},
+                            increment_update(count, now),
+                            upsert=True,
+                        )
+                        for (origin, destination), count in counts.items()
+                    ],
+                    ordered=False,
+                )
+            except PyMongoError as e:
+                logger.error("Error updating destination frequencies", exc_info=True)
+                raise e
+
+    @timed_query
+    def get_frequency(self, origin_account_id: int, destination_account_id: int) -> int:
+        """
+        Counts the transactions from an origin to a destination in the last
+        ``KNOWN_DESTINATION_TTL_DAYS`` days.
+
+        Args:
+            origin_account_id (int): The origin account id.
+            destination_account_id (int): The destination account id.
+
+        Returns:
+            int: The number of transactions.
+
+        Raises:
+            PyMongoError: If an error occurs during the query.
+        """
+        with mongo_connection():
+            try:
+                # pylint: disable=protected-access
+                collection = DestinationFrequency._get_collection()
+                document = collection.find_one(
+                    {
+                        "origin_user": origin_account_id,
+                        "destination_user": destination_account_id,
+                    },
+                    {"days": 1},
+                )
+                if document is None:
+                    return 0
+                total, stale = count_recent(document.get("days"))
+                if stale:
+                    collection.update_one({"_id": document["_id"]}, prune_update(stale))
+                return total
+            except PyMongoError as e:
+                logger.error("Error reading destination frequency", exc_info=True)
+                raise e
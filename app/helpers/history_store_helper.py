@@ -0,0 +1,92 @@
+"""Sliding-window history of the transactions read by the velocity rules."""
+
+from typing import Iterable, Optional
+
+from app.core.config import (
+    HISTORY_STORE_MAX_PAIRS,
+    HISTORY_STORE_TTL_SECONDS,
+    HISTORY_WINDOW_MAX_MINUTES,
+)
+from app.core.constants import ChannelEnum
+from app.core.history_store import TransactionHistoryStore
+from app.models.tables.transaction_model import Transaction
+
+# Recent transactions keyed by (origin_account_id, destination_account_id).
+history_store = TransactionHistoryStore(
+    HISTORY_WINDOW_MAX_MINUTES, HISTORY_STORE_MAX_PAIRS, HISTORY_STORE_TTL_SECONDS
+)
+
+
+def record_transaction(transaction: Transaction):
+    """
+    Adds a stored transaction to the history.
+
+    Args:
+        transaction (Transaction): The transaction, already committed.
+    """
+    history_store.record(
+        (transaction.origin_account_id, transaction.destination_account_id),
+        transaction.channel,
+        transaction.amount,
+        transaction.created_at,
+        transaction.id,
+    )
+
+
+def record_rows(rows: Iterable[dict]):
+    """
+    Adds stored transactions, given as column values, to the history.
+
+    Args:
+        rows (Iterable[dict]): The transaction column values, already committed.
+    """
+    for row in rows:
+        history_store.record(
+            (row["origin_account_id"], row["destination_account_id"]),
+            row["channel"],
+            row["amount"],
+            row["created_at"],
+            row["id"],
+        )
+
+
+def load_pair(origin_account_id: int, destination_account_id: int, rows: list):
+    """
+    Warms the history of a pair with the rows of ``get_recent_transactions``.
+
+    The rows are read inside ``history_store.loading`` of the pair, so the
+    transactions stored meanwhile are not lost.
+
+    Args:
+        origin_account_id (int): The origin account id.
+        destination_account_id (int): The destination account id.
+        rows (list): Rows of origin, destination, channel, amount, created_at
+            and (optionally) id.
+    """
+    history_store.load(
+        (origin_account_id, destination_account_id), [tuple(row[2:]) for row in rows]
+    )
+
+
+def count_similar_in_history(
+    origin_account_id: int, destination_account_id: int, params: dict
+) -> Optional[int]:
+    """
+    Answers ``!count_same_trx_by_channel_user_in_last_in_period`` from the history.
+
+    Args:
+        origin_account_id (int): The origin account id.
+        destination_account_id (int): The destination account id.
+        params (dict): The transform params.
+
+    Returns:
+        Optional[int]: The same count as ``RiskEvaluator.count_similar_transactions``
+        over the database rows, or None if the pair is not warm or the window
+        is wider than the history.
+    """
+    return history_store.count_similar(
+        (origin_account_id, destination_account_id),
+        [ChannelEnum[channel].value for channel in params["channel"]],
+        params["interval_minutes"],
+        params.get("sensibility_variation_percentage"),
+    )
@@ -0,0 +1,178 @@
+"""Cache of the account and customer rows read on the transaction path."""
+
+from typing import Dict, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.cache import TTLCache
+from app.core.config import LOOKUP_CACHE_MAXSIZE, LOOKUP_CACHE_TTL_SECONDS
+from app.models.tables.account_model import Account
+from app.models.tables.customer_model import Customer
+from app.schemas.account_schemas import AccountResolution
+
+# Accounts keyed by (agency, account), customers keyed by id. Both hold column
+# snapshots rather than ORM instances, so every hit builds its own detached
+# instance and concurrent requests never share (or attach) the same object.
+account_cache = TTLCache(LOOKUP_CACHE_MAXSIZE, LOOKUP_CACHE_TTL_SECONDS)
+customer_cache = TTLCache(LOOKUP_CACHE_MAXSIZE, LOOKUP_CACHE_TTL_SECONDS)
+
+
+def _snapshot(instance) -> dict:
+    return {
+        attr.key: getattr(instance, attr.key)
+        for attr in inspect(type(instance)).column_attrs
+    }
+
+
+def _restore(model, snapshot: dict):
+    instance = model(**snapshot)
+    make_transient_to_detached(instance)
+    return instance
+
+
+def cache_customer(customer: Customer):
+    """
+    Caches a customer read from the database.
+
+    Args:
+        customer (Customer): The customer to cache.
+    """
+    customer_cache.set(customer.id, _snapshot(customer))
+
+
+def get_cached_customer(
+    customer_id: int, customers: Optional[Dict[int, Customer]] = None
+) -> Optional[Customer]:
+    """
+    Returns a detached customer built from the cache.
+
+    Args:
+        customer_id (int): The customer id.
+        customers (Optional[Dict[int, Customer]]): Customers already built for the
+            same unit of work, reused so a customer has a single instance in it.
+
+    Returns:
+        Optional[Customer]: The customer, or None on a cache miss.
+    """
+    if customers is not None and customer_id in customers:
+        return customers[customer_id]
+    snapshot = customer_cache.get(customer_id)
+    if snapshot is None:
+        return None
+    customer = _restore(Customer, snapshot)
+    if customers is not None:
+        customers[customer_id] = customer
+    return customer
+
+
+def cache_account(account: Account):
+    """
+    Caches an account read from the database, and its customer if it was loaded.
+
+    Args:
+        account (Account): The account to cache.
+    """
+    account_cache.set((account.agency, account.account), _snapshot(account))
+    customer = account.__dict__.get("customer_rel")
+    if customer is not None:
+        cache_customer(customer)
+
+
+def get_cached_account(
+    agency: int,
+    account: int,
+    with_customer: bool = False,
+    customers: Optional[Dict[int, Customer]] = None,
+) -> Optional[Account]:
+    """
+    Returns a detached account built from the cache.
+
+    Args:
+        agency (int): The agency number.
+        account (int): The account number.
+        with_customer (bool): Whether the account's customer must be loaded too;
+            if it is not cached, the lookup is a miss.
+        customers (Optional[Dict[int, Customer]]): Customers already built for the
+            same unit of work.
+
+    Returns:
+        Optional[Account]: The account, or None on a cache miss.
+    """
+    snapshot = account_cache.get((agency, account))
+    if snapshot is None:
+        return None
+    customer = None
+    if with_customer:
+        customer = get_cached_customer(snapshot["customer_id"], customers)
+        if customer is None:
+            return None
+    cached = _restore(Account, snapshot)
+    if customer is not None:
+        set_committed_value(cached, "customer_rel", customer)
+    return cached
+
+
+def get_cached_resolution(
+    origin: Account, destination: Account
+) -> Optional[AccountResolution]:
+    """
+    Resolves a transfer from the cache, with the customers loaded.
+
+    Args:
+        origin (Account): The agency and account numbers of the origin.
+        destination (Account): The agency and account numbers of the destination.
+
+    Returns:
+        Optional[AccountResolution]: The resolution, or None unless both accounts
+        (and their customers) are cached.
+    """
+    customers: Dict[int, Customer] = {}
+    cached_origin = get_cached_account(
+        origin.agency, origin.account, with_customer=True, customers=customers
+    )
+    if cached_origin is None:
+        return None
+    cached_destination = get_cached_account(
+        destination.agency, destination.account, with_customer=True, customers=customers
+    )
+    if cached_destination is None:
+        return None
+    return AccountResolution(origin=cached_origin, destination=cached_destination)
+
+
+def cache_resolution(resolution: AccountResolution):
+    """
+    Caches the accounts found by a transfer resolution.
+
+    Args:
+        resolution (AccountResolution): The resolution read from the database.
+    """
+    for account in (resolution.origin, resolution.destination):
+        if account is not None:
+            cache_account(account)
+
+
+def invalidate_account(agency: int, account: int):
+    """
+    Drops an account from the cache.
+
+    Args:
+        agency (int): The agency number.
+        account (int): The account number.
+    """
+    account_cache.invalidate((agency, account))
+
+
+def invalidate_customer(customer_id: int):
+    """
+    Drops a customer, and every account that belongs to it, from the cache.
+
+    Args:
+        customer_id (int): The customer id.
+    """
+    customer_cache.invalidate(customer_id)
+    account_cache.invalidate_where(
+        lambda _, snapshot: snapshot["customer_id"] == customer_id
+    )
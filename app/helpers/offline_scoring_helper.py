@@ -0,0 +1,220 @@
+"""Helpers for evaluating transactions against a point-in-time history."""
+
+from collections import Counter, defaultdict, deque
+from datetime import timedelta
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.core.constants import ChannelEnum
+from app.core.rules import (
+    COUNT_SAME_TRX_TRANSFORM,
+    DESTINATION_FREQUENCY_TRANSFORM,
+    TIME_TRANSFORM,
+    CompiledRule,
+)
+from app.helpers.risk_engine_helper import RiskEvaluator
+from app.helpers.vectorized_risk_helper import (
+    TransactionFrame,
+    VectorizedRiskEvaluator,
+    stack_context,
+)
+from app.models.collections.user_cache_model import KNOWN_DESTINATION_TTL_DAYS
+from app.models.tables.transaction_model import Transaction
+
+
+class OfflineRiskEvaluator(RiskEvaluator):
+    """
+    ``RiskEvaluator`` judging a transaction as of its own ``created_at``.
+
+    ``!time`` conditions are anchored on the transaction day instead of today;
+    the database-backed transforms must be given in the evaluation context.
+    """
+
+    def process_transform(
+        self,
+        transform: str,
+        transaction_field,
+        transform_field,
+        params,
+        context: dict = None,
+    ):
+        if transform == TIME_TRANSFORM:
+            return transaction_field.created_at.replace(**transform_field)
+        return super().process_transform(
+            transform, transaction_field, transform_field, params, context
+        )
+
+
+class PointInTimeScorer:
+    """
+    Evaluates transactions given in chronological order, each one as of its own
+    ``created_at``.
+
+    The velocity and destination frequency transforms are computed from the
+    transactions given before, kept in memory per (origin, destination) pair
+    for the widest window the rules read, so no database is read per
+    transaction and no transform ever sees a later transaction. Transactions
+    that only make up the history (e.g. the days before a replayed range) are
+    given with ``add``.
+
+    ``score`` and ``matched_rules`` evaluate one transaction at a time with
+    ``OfflineRiskEvaluator``; ``score_many`` and ``rule_masks`` give the same
+    results for a whole chunk with ``VectorizedRiskEvaluator``.
+    """
+
+    def __init__(self, rules: Tuple[CompiledRule, ...]):
+        self.rules = rules
+        self.risk_evaluator = OfflineRiskEvaluator()
+        self.vectorized_evaluator = VectorizedRiskEvaluator(offline=True)
+        self.frequency_window = timedelta(days=KNOWN_DESTINATION_TTL_DAYS)
+        self.retention = max(
+            [self.frequency_window]
+            + [
+                timedelta(minutes=params["interval_minutes"])
+                for rule in rules
+                for transform, params in rule.transforms
+                if transform == COUNT_SAME_TRX_TRANSFORM
+                and params.get("interval_minutes")
+            ]
+        )
+        self._history: Dict[Tuple[int, int], deque] = defaultdict(deque)
+
+    def add(self, transaction: Transaction):
+        """
+        Adds a transaction to the history seen by the later ones.
+
+        Args:
+            transaction (Transaction): The transaction, not older than the
+                transactions already added.
+        """
+        self._history[
+            (transaction.origin_account_id, transaction.destination_account_id)
+        ].append(
+            (transaction.created_at, int(transaction.channel), transaction.amount)
+        )
+
+    def prefetch(self, transaction: Transaction) -> dict:
+        """
+        Computes the database-backed transforms of a transaction from the history.
+
+        Args:
+            transaction (Transaction): The transaction to be evaluated.
+
+        Returns:
+            dict: The transform results, keyed by ``RiskEvaluator.transform_key``.
+        """
+        pair = (transaction.origin_account_id, transaction.destination_account_id)
+        now = transaction.created_at
+        history = self._history[pair]
+        while history and history[0][0] <= now - self.retention:
+            history.popleft()
+
+        prefetched = {}
+        for rule in self.rules:
+            for transform, params in rule.transforms:
+                key = self.risk_evaluator.transform_key(transform, params)
+                if key is None or key in prefetched:
+                    continue
+                if transform == DESTINATION_FREQUENCY_TRANSFORM:
+                    known_since = now - self.frequency_window
+                    prefetched[key] = sum(
+                        1 for created_at, _, _ in history if created_at > known_since
+                    )
+                    continue
+                channels = [ChannelEnum[channel].value for channel in params["channel"]]
+                lookback = now - timedelta(minutes=params["interval_minutes"])
+                counts = Counter(
+                    (channel, amount)
+                    for created_at, channel, amount in history
+                    if channel in channels and created_at > lookback
+                )
+                prefetched[key] = self.risk_evaluator.count_similar_transactions(
+                    [
+                        (channel, amount, pair[1], pair[0], count)
+                        for (channel, amount), count in counts.items()
+                    ],
+                    params,
+                )
+        return prefetched
+
+    def score(self, transaction: Transaction) -> bool:
+        """
+        Evaluates a transaction like ``RiskEvaluator.calculate_risk``, then adds it
+        to the history.
+
+        Args:
+            transaction (Transaction): The transaction, with its account relationships.
+
+        Returns:
+            bool: True if the transaction matched any rule.
+        """
+        context = self.prefetch(transaction)
+        suspect = any(
+            block.predicate(self.risk_evaluator, transaction, context)
+            for rule in self.rules
+            for block in rule.blocks
+        )
+        self.add(transaction)
+        return suspect
+
+    def matched_rules(self, transaction: Transaction) -> List[str]:
+        """
+        Evaluates a transaction against every rule, then adds it to the history.
+
+        Args:
+            transaction (Transaction): The transaction, with its account relationships.
+
+        Returns:
+            List[str]: The names of the rules the transaction matched.
+        """
+        context = self.prefetch(transaction)
+        matched = [
+            rule.name
+            for rule in self.rules
+            if any(
+                block.predicate(self.risk_evaluator, transaction, context)
+                for block in rule.blocks
+            )
+        ]
+        self.add(transaction)
+        return matched
+
+    def rule_masks(self, transactions: Sequence[Transaction]) -> Dict[str, np.ndarray]:
+        """
+        Evaluates a chronological chunk of transactions against every rule, then
+        adds them to the history.
+
+        The transforms are computed row by row, each transaction seeing the ones
+        before it; the rules are then evaluated over the whole chunk at once.
+
+        Args:
+            transactions (Sequence[Transaction]): The transactions, with their
+                account relationships.
+
+        Returns:
+            Dict[str, np.ndarray]: The transactions matching each rule, by rule name.
+        """
+        contexts = []
+        for transaction in transactions:
+            contexts.append(self.prefetch(transaction))
+            self.add(transaction)
+        frame = TransactionFrame.from_transactions(
+            transactions, self.vectorized_evaluator.fields(self.rules)
+        )
+        return self.vectorized_evaluator.rule_masks(
+            self.rules, frame, stack_context(contexts, len(transactions))
+        )
+
+    def score_many(self, transactions: Sequence[Transaction]) -> List[bool]:
+        """
+        Flags the transactions of a chronological chunk matching any rule; see
+        ``rule_masks``.
+
+        Returns:
+            List[bool]: The suspect flag of each transaction.
+        """
+        suspect = np.zeros(len(transactions), dtype=bool)
+        for mask in self.rule_masks(transactions).values():
+            suspect |= mask
+        return suspect.tolist()
@@ -1,20 +1,173 @@
 """Helper class for evaluating behavioral transaction risk."""
 
 import statistics
-from datetime import datetime, time, timedelta
-from typing import Any, Callable, Dict, List, Union
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from app.core.constants import ChannelEnum
 from app.core.logger import logger
-from app.helpers.mongo_helper import MongoHelper
+from app.core.metrics import TRANSFORM_CONTEXT_HITS, TRANSFORM_SECONDS
+from app.core.rules import (
+    COUNT_SAME_TRX_TRANSFORM,
+    DESTINATION_FREQUENCY_TRANSFORM,
+    TIME_TRANSFORM,
+    CompiledRule,
+    compile_condition,
+    get_rule_set_order,
+)
+from app.helpers.destination_frequency_helper import DestinationFrequencyHelper
+from app.helpers.history_store_helper import (
+    count_similar_in_history,
+    history_store,
+    load_pair,
+)
+from app.helpers.rule_cache_helper import rule_cache
 from app.helpers.transaction_helper import TransactionHelper
-from app.models.collections.rules_model import Rule
-from app.models.collections.user_cache_model import KnowlegedDestinations
 from app.models.tables.transaction_model import Transaction
 from app.schemas.rules_schemas import FilterCondition, SimpleCondition
 
 FilterCondition.model_rebuild()
 
+# Metric children, bound once per transform.
+TRANSFORM_TIMERS = {
+    transform: TRANSFORM_SECONDS.labels(transform)
+    for transform in (
+        TIME_TRANSFORM,
+        COUNT_SAME_TRX_TRANSFORM,
+        DESTINATION_FREQUENCY_TRANSFORM,
+    )
+}
+TRANSFORM_HITS = {
+    transform: TRANSFORM_CONTEXT_HITS.labels(transform)
+    for transform in TRANSFORM_TIMERS
+}
+
+
+class _Unknown:
+    """A transform result that was not computed; no comparison with it holds."""
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return False
+
+    def __lt__(self, other):
+        return False
+
+    __le__ = __gt__ = __ge__ = __lt__
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return "UNKNOWN"
+
+
+# Stands for the transforms skipped to stay within the latency budget: the
+# conditions reading them do not match, so the rules using them fail open.
+UNKNOWN = _Unknown()
+
+
+class EvaluationContext(dict):
+    """
+    The transform results of one transaction evaluation, keyed by
+    ``RiskEvaluator.transform_key``.
+
+    It also keeps the pair transactions read for the velocity transforms the
+    sliding-window history cannot answer: the widest window and every channel
+    used by the rule set are read once, and each transform counts its own
+    window and channels from those rows.
+
+    Attributes:
+        history_minutes (int): The window the rows cover, or must cover.
+        history_channels (FrozenSet[int]): The channel codes of the rows.
+        history_rows (Optional[list]): The rows of ``get_recent_transactions``,
+            or None before they are read.
+        degraded (Dict[tuple, str]): The transform results that were
+            ``"approximated"`` or ``"skipped"`` to stay within the latency budget.
+    """
+
+    def __init__(
+        self,
+        prefetched: dict = None,
+        history_minutes: int = 0,
+        history_channels: Iterable[int] = (),
+    ):
+        super().__init__(prefetched or {})
+        self.history_minutes = history_minutes
+        self.history_channels: FrozenSet[int] = frozenset(history_channels)
+        self.history_rows: Optional[list] = None
+        self.degraded: Dict[tuple, str] = {}
+
+    @classmethod
+    def for_rules(
+        cls, rules: Iterable[CompiledRule], prefetched: dict = None
+    ) -> "EvaluationContext":
+        """
+        Creates the context of an evaluation against the given rules.
+
+        Args:
+            rules (Iterable[CompiledRule]): The compiled rules.
+            prefetched (dict, optional): Transform results already computed.
+
+        Returns:
+            EvaluationContext: A context whose history covers every velocity
+            transform of the rules.
+        """
+        minutes = 0
+        channels = set()
+        for rule in rules:
+            for transform, params in rule.transforms:
+                if RiskEvaluator.transform_key(transform, params) is None:
+                    continue
+                if transform == COUNT_SAME_TRX_TRANSFORM:
+                    minutes = max(minutes, params["interval_minutes"])
+                    channels.update(
+                        ChannelEnum[name].value for name in params["channel"]
+                    )
+        return cls(prefetched, minutes, channels)
+
+    def history_scope(
+        self, interval_minutes: int, channels: Iterable[int]
+    ) -> Optional[Tuple[int, FrozenSet[int]]]:
+        """
+        Returns the window and channels to read for a velocity transform.
+
+        Args:
+            interval_minutes (int): The transform window.
+            channels (Iterable[int]): The transform channel codes.
+
+        Returns:
+            Optional[Tuple[int, FrozenSet[int]]]: The widest window and channels
+            to read, or None if the rows already read cover the transform.
+        """
+        channels = frozenset(channels)
+        if (
+            self.history_rows is not None
+            and interval_minutes <= self.history_minutes
+            and channels <= self.history_channels
+        ):
+            return None
+        return (
+            max(interval_minutes, self.history_minutes),
+            self.history_channels | channels,
+        )
+
+    def set_history(self, rows: list, minutes: int, channels: FrozenSet[int]):
+        """Keeps the rows read for the window and channels of ``history_scope``."""
+        self.history_rows = rows
+        self.history_minutes = minutes
+        self.history_channels = channels
+
 
 class RiskEvaluator:
     """
@@ -26,7 +179,7 @@ class RiskEvaluator:
             "!count": self.count_transactions,
             "!same_transaction": self.same_transaction,
         }
-        self.mongo_helper = MongoHelper()
+        self.frequency_helper = DestinationFrequencyHelper()
         self.transaction_helper = TransactionHelper()
 
     def count_transactions(
@@ -68,27 +221,87 @@ class RiskEvaluator:
         origin_account_id: int,
         destination_account_id: int,
         params: dict,
+        context: dict = None,
     ) -> int:
         """
         Counts transactions that match given parameters and sums their amounts.
 
+        Windows covered by the sliding-window history are answered from it; the
+        pair history is read from the database the first time it is needed.
+        Otherwise, with an ``EvaluationContext``, the rows of every velocity
+        transform are read once for the evaluation.
+
         Args:
             interval_minutes (int): The number of minutes to look back.
             origin_account_id (int): The originating account of the transactions.
             destination_account_id (int): The destination account of the transactions.
             params (Dict[str, Any]): Additional parameters for the transform.
+            context (dict, optional): The evaluation context.
 
         Returns:
-            int: The sum of the amounts of the transactions.
+            int: The number of matching transactions.
         """
-        variation = params.get("sensibility_variation_percentage")
+        window = interval_minutes
+        if isinstance(context, EvaluationContext):
+            window = max(window, context.history_minutes)
+        if history_store.covers(window):
+            pair = (origin_account_id, destination_account_id)
+            if not history_store.is_warm(pair):
+                with history_store.loading(pair):
+                    load_pair(
+                        origin_account_id,
+                        destination_account_id,
+                        self.transaction_helper.get_recent_transactions(
+                            [pair], history_store.lookback(), with_ids=True
+                        ),
+                    )
+            count = count_similar_in_history(
+                origin_account_id, destination_account_id, params
+            )
+            if count is not None:
+                return count
+
         channels = [ChannelEnum[channel].value for channel in params["channel"]]
+        if isinstance(context, EvaluationContext):
+            scope = context.history_scope(interval_minutes, channels)
+            if scope is not None:
+                minutes, scope_channels = scope
+                context.set_history(
+                    self.transaction_helper.get_recent_transactions(
+                        [(origin_account_id, destination_account_id)],
+                        datetime.now() - timedelta(minutes=minutes),
+                        scope_channels,
+                    ),
+                    minutes,
+                    scope_channels,
+                )
+            return self.count_in_history(context.history_rows, params)
+
         result = self.transaction_helper.count_transaction_by_user_channel(
             channel=channels,
             lookback=datetime.now() - timedelta(minutes=interval_minutes),
             origin_account_id=origin_account_id,
             destination_account_id=destination_account_id,
         )
+        return self.count_similar_transactions(result, params)
+
+    @staticmethod
+    def count_similar_transactions(result: list, params: dict) -> int:
+        """
+        Counts the transactions returned by ``count_transaction_by_user_channel``.
+
+        When ``sensibility_variation_percentage`` is set, only the transactions whose
+        amount is within that variation of the median amount are counted.
+
+        Args:
+            result (list): Rows of channel, amount, destination, origin and count.
+            params (Dict[str, Any]): The transform params.
+
+        Returns:
+            int: The number of matching transactions.
+        """
+        variation = params.get("sensibility_variation_percentage")
+        channels = [ChannelEnum[channel].value for channel in params["channel"]]
         transaction_values = [
             [float(item[1]), item[4]] for item in result if item[0] in channels
         ] or []
@@ -107,12 +320,40 @@ class RiskEvaluator:
 
         return len(transaction_values)
 
+    @classmethod
+    def count_in_history(cls, rows: list, params: dict) -> int:
+        """
+        Counts ``!count_same_trx_by_channel_user_in_last_in_period`` from the rows
+        of ``get_recent_transactions``, which must cover its window and channels.
+
+        Args:
+            rows (list): Rows of origin, destination, channel, amount and created_at.
+            params (Dict[str, Any]): The transform params.
+
+        Returns:
+            int: The same count as ``count_similar_transactions`` over the rows
+            of ``count_transaction_by_user_channel``.
+        """
+        lookback = datetime.now() - timedelta(minutes=params["interval_minutes"])
+        counts = Counter(
+            (int(channel), amount)
+            for _, _, channel, amount, created_at in rows
+            if created_at > lookback
+        )
+        return cls.count_similar_transactions(
+            [
+                (channel, amount, None, None, count)
+                for (channel, amount), count in counts.items()
+            ],
+            params,
+        )
+
     def __destination_account_frequency(
         self, origin_account_id: int, destination_account_id: int
     ) -> int:
         """
         Counts how many times a given destination account has been used by a given
-        origin account.
+        origin account in the last 30 days, from the pair counter.
 
         Args:
             origin_account_id (int): The originating account.
@@ -121,16 +362,49 @@ class RiskEvaluator:
         Returns:
             int: The number of occurrences of the destination account.
         """
-        occurrences = [
-            item.destination_user
-            for item in self.mongo_helper.find_documents(
-                KnowlegedDestinations, {"origin_user": origin_account_id}
+        return self.frequency_helper.get_frequency(
+            origin_account_id, destination_account_id
+        )
+
+    @staticmethod
+    def transform_key(transform: str, params: dict = None) -> tuple | None:
+        """
+        Returns the key identifying a database-backed transform result.
+
+        Two conditions with the same key read the same value for a transaction,
+        so the key is used to store transform results in the evaluation context.
+
+        Args:
+            transform (str): The transform name.
+            params (Dict[str, Any]): The transform params.
+
+        Returns:
+            tuple | None: The key, or None if the transform does not read the
+            database (e.g. ``!time``) and is always computed in place.
+        """
+        params = params or {}
+        if (
+            transform == COUNT_SAME_TRX_TRANSFORM
+            and params.get("channel")
+            and params.get("interval_minutes")
+        ):
+            return (
+                transform,
+                tuple(params["channel"]),
+                params["interval_minutes"],
+                params.get("sensibility_variation_percentage"),
             )
-        ].count(destination_account_id)
-        return occurrences
+        if transform == DESTINATION_FREQUENCY_TRANSFORM:
+            return (transform,)
+        return None
 
     def process_transform(
-        self, transform: str, transaction_field, transform_field, params
+        self,
+        transform: str,
+        transaction_field,
+        transform_field,
+        params,
+        context: dict = None,
     ) -> Any:
         """
         Convert a value based on the specified transform.
@@ -149,37 +423,58 @@ class RiskEvaluator:
             transaction_field (Any): The value to transform.
             transform_field (Any): The value to transform.
             params (Dict[str, Any]): Additional parameters for the transform.
+            context (dict, optional): The evaluation context. Results of
+                database-backed transforms are read from and stored into it.
 
         Returns:
             Any: The transformed value. If the transform is not supported,
             is the given value (in minutes) ago from now
         """
-        if transform == "!time":
-            return datetime.now().replace(**transform_field)
+        if transform == TIME_TRANSFORM:
+            if context is None:
+                return datetime.now().replace(**transform_field)
+            key = (TIME_TRANSFORM, tuple(sorted(transform_field.items())))
+            if key in context:
+                TRANSFORM_HITS[transform].inc()
+            else:
+                with TRANSFORM_TIMERS[transform].time():
+                    context[key] = datetime.now().replace(**transform_field)
+            return context[key]
+
+        key = self.transform_key(transform, params)
+        if key is None:
+            return transform_field
+        if context is not None and key in context:
+            TRANSFORM_HITS[transform].inc()
+            return context[key]
+        with TRANSFORM_TIMERS[transform].time():
+            result = self._process_io_transform(
+                transform, transaction_field, params, context
+            )
+        if context is not None:
+            context[key] = result
+        return result
 
-        if (
-            transform == "!count_same_trx_by_channel_user_in_last_in_period"
-            and params.get("channel")
-            and params.get("interval_minutes")
-        ):
-            result = self.__count_same_trx_by_channel_user_in_last_in_period(
+    def _process_io_transform(
+        self, transform: str, transaction_field, params, context: dict = None
+    ) -> Any:
+        """Computes a database-backed transform that has a ``transform_key``."""
+        if transform == COUNT_SAME_TRX_TRANSFORM:
+            return self.__count_same_trx_by_channel_user_in_last_in_period(
                 interval_minutes=params["interval_minutes"],
                 origin_account_id=transaction_field.origin_account_rel.id,
                 destination_account_id=transaction_field.destination_account_rel.id,
                 params=params,
+                context=context,
             )
-            return result
 
-        if transform == "!destination_account_frequency":
-            return self.__destination_account_frequency(
-                origin_account_id=transaction_field.origin_account_rel.id,
-                destination_account_id=transaction_field.destination_account_rel.id,
-            )
-
-        return transform_field
+        return self.__destination_account_frequency(
+            origin_account_id=transaction_field.origin_account_rel.id,
+            destination_account_id=transaction_field.destination_account_rel.id,
+        )
 
+    @staticmethod
     def compare(
-        self,
         op: str,
         transaction_field_value: Any,
         condition_value: Any,
@@ -210,77 +505,47 @@ class RiskEvaluator:
     ) -> bool:
         """
         Evaluate a single condition against a transaction and its history.
-        """
 
-        if isinstance(condition, dict):
-            if "and" in condition:
-                return all(
-                    self.evaluate_condition(sub, transaction)
-                    for sub in condition["and"]
-                )
-            if "or" in condition:
-                return any(
-                    self.evaluate_condition(sub, transaction) for sub in condition["or"]
-                )
-            condition = SimpleCondition(**condition)
-
-        if hasattr(transaction, condition.field):
-            field_value = getattr(transaction, condition.field)
-
-            if isinstance(field_value, ChannelEnum):
-                if isinstance(condition.value, list):
-                    condition.value = [
-                        ChannelEnum[item].value for item in condition.value
-                    ]
-                else:
-                    condition.value = ChannelEnum[condition.value].value
-                field_value = field_value.value
+        The condition is compiled on every call; rules stored in the ``rules``
+        collection go through ``calculate_risk``, which reuses compiled rules.
+        """
+        return compile_condition(condition)(self, transaction, {})
 
-            if isinstance(field_value, datetime) and isinstance(condition.value, time):
-                field_value = field_value.time()
+    def calculate_risk(
+        self,
+        transaction: Transaction,
+        prefetched: dict = None,
+        rules: Optional[Tuple[CompiledRule, ...]] = None,
+    ) -> bool:
+        """
+        Main entry point for evaluating risk against a rule set.
 
-        if condition.transform:
+        Rules come from the process-wide rule cache, already compiled, so the
+        evaluation does not wait on MongoDB once the cache is warm. Blocks and
+        conditions run cheapest-to-decide first (see ``ConditionOrder``); the
+        logged rule is the first one found to match.
 
-            if condition.transform in ("!time"):
-                # cast: convert the field_value to the same type as condition.value
-                condition_value = self.process_transform(
-                    condition.transform, transaction, condition.value, condition.params
-                )
-                transaction_value = field_value
-            else:
-                # dynamic_funcs: execute the function and return the result like transaction_value
-                transaction_value = self.process_transform(
-                    condition.transform, transaction, condition.value, condition.params
-                )
-                condition_value = condition.value
-            if not condition.op:
-                return False
-            return self.compare(condition.op, transaction_value, condition_value)
-
-        if "." in condition.field:
-            parts = condition.field.split(".")
-            field_value = transaction
-            for part in parts:
-                field_value = getattr(field_value, part)
-            return self.compare(condition.op, field_value, condition.value)
-        if field_value is not None:
-            return self.compare(condition.op, field_value, condition.value)
-        return False
+        Args:
+            transaction (Transaction): The transaction to evaluate.
+            prefetched (dict, optional): Transform results already computed for
+                this transaction, keyed by ``transform_key``.
+            rules (Tuple[CompiledRule, ...], optional): The rule set to evaluate,
+                e.g. the one ``prefetched`` was computed for; the cached rule set
+                when not given.
 
-    def calculate_risk(self, transaction: Transaction) -> bool:
-        """
-        Main entry point for evaluating risk against a rule set.
+        Returns:
+            bool: True if the transaction matched any rule.
         """
-        mongo_helper = MongoHelper()
-        rules = [item["conditions"] for item in mongo_helper.find_documents(Rule)]
-        for rule_blocks in rules:
-            for block in rule_blocks:
-                filter_dict = block.get("filter")
-                if filter_dict and self.evaluate_condition(filter_dict, transaction):
-                    logger.info(
-                        "Transaction matched rule, this trahsaction is suspect: rule: %s",
-                        filter_dict,
-                    )
-
-                    return True
-        return False
+        if rules is None:
+            rules = rule_cache.get_rules()
+        context = EvaluationContext.for_rules(rules, prefetched)
+        matched = get_rule_set_order(rules).first_match(self, transaction, context)
+        if matched is None:
+            return False
+        rule, block = matched
+        logger.info(
+            "Transaction matched rule %s, this transaction is suspect: %s",
+            rule.name,
+            block.filter,
+        )
+        return True
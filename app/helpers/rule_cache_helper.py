@@ -0,0 +1,183 @@
+"""Process-wide cache of the compiled rule set."""
+
+import asyncio
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core.config import RULES_REFRESH_INTERVAL_SECONDS, RULES_WATCH_CHANGES
+from app.core.logger import logger
+from app.core.mongo_database import mongo_connection
+from app.core.rules import CompiledRule, get_compiled_rule, rule_version
+from app.helpers.mongo_helper import MongoHelper
+from app.models.collections.rules_model import Rule
+
+# Error code returned by a standalone mongod when a change stream is requested.
+CHANGE_STREAM_NOT_SUPPORTED = 40573
+
+
+class RuleCache:
+    """
+    Keeps the rules collection compiled in memory.
+
+    The rule set is loaded once at startup and refreshed by a background thread,
+    either when a change stream reports a change in the ``rules`` collection or,
+    when change streams are not available (standalone mongod), every
+    ``refresh_interval`` seconds. Readers never wait on MongoDB after the first load.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: int = RULES_REFRESH_INTERVAL_SECONDS,
+        watch_changes: bool = RULES_WATCH_CHANGES,
+    ):
+        self.mongo_helper = MongoHelper()
+        self.refresh_interval = refresh_interval
+        self.watch_changes = watch_changes
+        self.loaded_at: Optional[datetime] = None
+        self._rules: Tuple[CompiledRule, ...] = ()
+        self._documents: List[dict] = []
+        self._version: Optional[str] = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        """The version of the cached rule set, or None before the first load."""
+        return self._version
+
+    def get_rules(self) -> Tuple[CompiledRule, ...]:
+        """
+        Returns the compiled rules, loading them if the cache is still cold.
+
+        Returns:
+            Tuple[CompiledRule, ...]: The compiled rules, in stored order.
+        """
+        if self._version is None:
+            self.refresh()
+        return self._rules
+
+    async def get_rules_async(self) -> Tuple[CompiledRule, ...]:
+        """
+        Returns the compiled rules; see ``get_rules``.
+
+        A cold cache (the warm-up at startup failed) is loaded in a worker
+        thread, so the event loop is not blocked by the synchronous read.
+
+        Returns:
+            Tuple[CompiledRule, ...]: The compiled rules, in stored order.
+        """
+        if self._version is None:
+            await asyncio.to_thread(self.refresh)
+        return self._rules
+
+    def get_documents(self) -> List[dict]:
+        """
+        Returns the cached rule documents, loading them if the cache is still cold.
+
+        Returns:
+            List[dict]: The rule documents with their name and conditions.
+        """
+        if self._version is None:
+            self.refresh()
+        return self._documents
+
+    def refresh(self) -> bool:
+        """
+        Reloads the rules collection and swaps the cached rule set.
+
+        Only rules whose conditions changed are recompiled.
+
+        Returns:
+            bool: True if the rule set version changed.
+
+        Raises:
+            PyMongoError: If the rules cannot be read from MongoDB.
+        """
+        with self._refresh_lock:
+            documents = self.mongo_helper.find_documents(Rule)
+            rules = tuple(
+                get_compiled_rule(item.name, item.conditions) for item in documents
+            )
+            version = rule_version([[rule.name, rule.version] for rule in rules])
+            changed = version != self._version
+            self._rules = rules
+            self._documents = [
+                {"name": item.name, "conditions": item.conditions}
+                for item in documents
+            ]
+            self._version = version
+            self.loaded_at = datetime.now()
+
+        if changed:
+            logger.info("Rule set loaded, version %s (%s rules)", version, len(rules))
+        return changed
+
+    def start(self):
+        """
+        Warms the cache and starts the background refresh thread.
+
+        A failed warm-up is logged and retried by the background thread.
+        """
+        try:
+            self.refresh()
+        except PyMongoError:
+            logger.error("Error loading rules", exc_info=True)
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="rule-cache-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_interval + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.watch_changes:
+                self._watch()
+            if self._stop.wait(self.refresh_interval):
+                break
+            self._safe_refresh()
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except PyMongoError:
+            logger.error("Error refreshing rules", exc_info=True)
+
+    def _watch(self):
+        """
+        Refreshes the cache on every change reported by the change stream.
+
+        Returns when the stream fails; if the server does not support change
+        streams, watching is disabled and the cache falls back to polling.
+        """
+        try:
+            with mongo_connection():
+                # pylint: disable=protected-access
+                with Rule._get_collection().watch(max_await_time_ms=1000) as stream:
+                    # Changes made before the stream was opened are not reported.
+                    self._safe_refresh()
+                    while not self._stop.is_set() and stream.alive:
+                        if stream.try_next() is not None:
+                            self._safe_refresh()
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAM_NOT_SUPPORTED:
+                logger.info("Change streams not supported, polling rules instead")
+                self.watch_changes = False
+            else:
+                logger.error("Error watching rules", exc_info=True)
+        except PyMongoError:
+            logger.error("Error watching rules", exc_info=True)
+
+
+rule_cache = RuleCache()
@@ -0,0 +1,134 @@
+"""Helper class for scoring an NDJSON stream of transactions."""
+
+import json
+from typing import AsyncIterable, AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import PyMongoError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import STREAM_CHUNK_SIZE, STREAM_MAX_LINE_BYTES
+from app.core.logger import logger
+from app.helpers.batch_scoring_helper import BatchScoringHelper
+from app.schemas.transaction_schemas import PutTransactionRequest
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_line_bytes: int = STREAM_MAX_LINE_BYTES
+) -> AsyncIterator[Tuple[int, bytes, bool]]:
+    """
+    Splits a stream of byte chunks into lines.
+
+    Only the current, incomplete line is buffered. A line longer than
+    ``max_line_bytes`` is discarded up to its end and reported as too long.
+
+    Args:
+        chunks (AsyncIterable[bytes]): The byte chunks, e.g. a request body.
+        max_line_bytes (int): The maximum length of a line.
+
+    Yields:
+        Tuple[int, bytes, bool]: Each non-blank line, with its line number in
+        the input (blank lines included, from 1), and whether it was too long.
+    """
+    buffer = b""
+    oversized = False
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            end = buffer.find(b"\n")
+            if end < 0:
+                break
+            line, buffer = buffer[:end], buffer[end + 1 :]
+            line_number += 1
+            if oversized:
+                oversized = False
+                yield line_number, b"", True
+            elif line.strip():
+                yield line_number, line, len(line) > max_line_bytes
+        if len(buffer) > max_line_bytes:
+            buffer = b""
+            oversized = True
+    if oversized:
+        yield line_number + 1, b"", True
+    elif buffer.strip():
+        yield line_number + 1, buffer, len(buffer) > max_line_bytes
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'body'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+class StreamScoringHelper:
+    """
+    Scores and stores an NDJSON stream of transactions with bounded memory.
+
+    Lines are validated with ``PutTransactionRequest`` as they arrive and scored
+    in chunks of ``chunk_size`` items with ``BatchScoringHelper``; the results of
+    a chunk are yielded, one NDJSON line per input line and in input order,
+    before the next chunk is read. Reading the input is therefore paced by
+    whoever consumes the results, and at most one chunk is held in memory.
+    """
+
+    def __init__(self, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.batch_helper = BatchScoringHelper()
+
+    async def score(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """
+        Scores and stores the transactions of an NDJSON stream.
+
+        Args:
+            chunks (AsyncIterable[bytes]): The NDJSON input, in byte chunks of any size.
+
+        Yields:
+            bytes: One NDJSON line per transaction with its line number and
+            either its suspect flag or the reason it was rejected.
+        """
+        pending: List[Tuple[int, Optional[PutTransactionRequest], str]] = []
+        async for line_number, line, too_long in iter_lines(chunks):
+            if too_long:
+                pending.append((line_number, None, "Line too long"))
+            else:
+                try:
+                    item = PutTransactionRequest.model_validate_json(line)
+                    pending.append((line_number, item, ""))
+                except ValidationError as e:
+                    pending.append((line_number, None, _format_validation_error(e)))
+            if len(pending) >= self.chunk_size:
+                for result in await self._score_chunk(pending):
+                    yield result
+                pending = []
+        if pending:
+            for result in await self._score_chunk(pending):
+                yield result
+
+    async def _score_chunk(
+        self, pending: List[Tuple[int, Optional[PutTransactionRequest], str]]
+    ) -> List[bytes]:
+        """Scores the valid items of a chunk and formats a result line per item."""
+        items = [item for _, item, _ in pending if item is not None]
+        try:
+            scored = iter(await self.batch_helper.score(items) if items else [])
+            database_error = None
+        except (SQLAlchemyError, PyMongoError) as e:
+            logger.error("Database error while scoring a stream chunk", exc_info=True)
+            scored = iter([])
+            database_error = f"Database error: {e.__class__.__name__}"
+
+        lines = []
+        for line_number, item, error in pending:
+            result = {"line": line_number}
+            if item is None:
+                result["error"] = error
+            elif database_error:
+                result.update(
+                    id_da_transacao=item.id_da_transacao, error=database_error
+                )
+            else:
+                result.update(next(scored).model_dump(exclude_none=True))
+            lines.append(json.dumps(result).encode() + b"\n")
+        return lines
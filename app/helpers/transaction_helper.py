@@ -1,12 +1,16 @@
 """Helper class for customer-related database operations."""
 
 from datetime import datetime, timedelta
+from typing import Iterable, Tuple
 
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.core.logger import logger
+from app.core.metrics import timed_query
 from app.core.postgres_database import get_db
+from app.helpers.balance_helper import balance_deltas, balance_upsert
+from app.helpers.history_store_helper import record_transaction
 from app.interfaces.transaction_interface import TransactionInterface
 from app.models.tables.transaction_model import Transaction
 
@@ -20,6 +24,8 @@ class TransactionHelper(TransactionInterface):
         """
         Saves a customer profile into the database.
 
+        The balances of both accounts are updated in the same database transaction.
+
         Args:
             customer_data (PutCustomerRequest): The customer data to be saved.
 
@@ -29,13 +35,16 @@ class TransactionHelper(TransactionInterface):
         with get_db() as db:
             try:
                 db.add(transaction)
+                db.execute(balance_upsert(balance_deltas([transaction])))
                 db.commit()
                 db.refresh(transaction)
+                record_transaction(transaction)
                 return transaction
             except SQLAlchemyError as e:
                 db.rollback()
                 raise e
 
+    @timed_query
     def count_transaction_by_user_channel(
         self,
         channel: tuple,
@@ -85,3 +94,56 @@ class TransactionHelper(TransactionInterface):
                 logger.error("Error counting transactions", exc_info=True)
                 db.rollback()
                 raise e
+
+    @timed_query
+    def get_recent_transactions(
+        self,
+        pairs: Iterable[Tuple[int, int]],
+        lookback: datetime,
+        channels: Iterable[int] = None,
+        with_ids: bool = False,
+    ) -> list:
+        """
+        Retrieves the transactions made after ``lookback`` between the given
+        origin/destination pairs.
+
+        Args:
+            pairs (Iterable[Tuple[int, int]]): The (origin, destination) account ids.
+            lookback (datetime): Timestamp from which to retrieve transactions.
+            channels (Iterable[int], optional): The channel codes to retrieve;
+                every channel when not given.
+            with_ids (bool): Whether to add the transaction id to the rows.
+
+        Returns:
+            list: Rows of origin_account_id, destination_account_id, channel,
+            amount and created_at (and id, with ``with_ids``).
+        """
+        conditions = [
+            tuple_(
+                Transaction.origin_account_id,
+                Transaction.destination_account_id,
+            ).in_(list(pairs)),
+            Transaction.created_at > lookback,
+        ]
+        if channels is not None:
+            conditions.append(Transaction.channel.in_(list(channels)))
+        columns = [
+            Transaction.origin_account_id,
+            Transaction.destination_account_id,
+            Transaction.channel,
+            Transaction.amount,
+            Transaction.created_at,
+        ]
+        if with_ids:
+            columns.append(Transaction.id)
+        with get_db() as db:
+            try:
+                return (
+                    db.query(*columns)
+                    .filter(*conditions)
+                    .all()
+                )
+            except SQLAlchemyError as e:
+                logger.error("Error retrieving transactions", exc_info=True)
+                db.rollback()
+                raise e
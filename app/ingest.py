@@ -0,0 +1,89 @@
+"""
+Scores and stores an NDJSON file of transactions, writing NDJSON results.
+
+Usage::
+
+    python -m app.ingest transactions.jsonl > results.jsonl
+    cat transactions.jsonl | python -m app.ingest
+
+Each input line is a ``PutTransactionRequest`` object, the same format accepted
+by ``POST /api/transaction/stream``, and the results have the same format as
+that endpoint's response.
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import AsyncIterator, BinaryIO
+
+from app.core.config import STREAM_CHUNK_SIZE
+from app.core.mongo_database import close_async_mongo, close_mongo, init_mongo
+from app.core.postgres_database import async_engine
+from app.helpers.stream_scoring_helper import StreamScoringHelper
+
+READ_SIZE = 64 * 1024
+
+
+async def read_chunks(stream: BinaryIO) -> AsyncIterator[bytes]:
+    """
+    Reads a binary stream in chunks without blocking the event loop.
+
+    Args:
+        stream (BinaryIO): The stream to read.
+
+    Yields:
+        bytes: The chunks read, until the end of the stream.
+    """
+    while True:
+        chunk = await asyncio.to_thread(stream.read, READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def ingest(source: BinaryIO, output: BinaryIO, chunk_size: int):
+    """
+    Scores and stores the transactions read from ``source``.
+
+    Args:
+        source (BinaryIO): The NDJSON input.
+        output (BinaryIO): Where the NDJSON results are written.
+        chunk_size (int): How many transactions are scored together.
+    """
+    helper = StreamScoringHelper(chunk_size=chunk_size)
+    try:
+        async for line in helper.score(read_chunks(source)):
+            output.write(line)
+        output.flush()
+    finally:
+        await close_async_mongo()
+        await async_engine.dispose()
+
+
+def main():
+    """Parses the command line and runs the ingestion."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "path", nargs="?", default="-", help="NDJSON file to read, or - for stdin"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=STREAM_CHUNK_SIZE,
+        help="transactions scored together (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    init_mongo()
+    try:
+        if args.path == "-":
+            asyncio.run(ingest(sys.stdin.buffer, sys.stdout.buffer, args.chunk_size))
+        else:
+            with open(args.path, "rb") as source:
+                asyncio.run(ingest(source, sys.stdout.buffer, args.chunk_size))
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
 """
 This module provides a function to migrate the MongoDB database."""
 
-from app.core.mongo_database import mongo_connection
+from datetime import timedelta
+
+from pymongo import UpdateOne
+
+from app.core.mongo_database import close_mongo, mongo_connection
 from app.helpers.mongo_helper import MongoHelper
+from app.models.collections.requests_log_model import RequestLog
 from app.models.collections.rules_model import Rule
+from app.models.collections.user_cache_model import (
+    KNOWN_DESTINATION_TTL_DAYS,
+    DestinationFrequency,
+    KnowlegedDestinations,
+)
 
 INITIAL_RULES = {
     "high_value_dawn": [
@@ -189,5 +199,77 @@ def populate_rules():
         print(e)
 
 
+def create_indexes():
+    """
+    Creates the indexes of the collections written by the asyncio helpers.
+
+    MongoEngine creates the indexes of a collection on the first save, but the
+    asyncio helpers write with the driver directly, so they are created here.
+    """
+    with mongo_connection():
+        KnowlegedDestinations.ensure_indexes()
+        DestinationFrequency.ensure_indexes()
+        RequestLog.ensure_indexes()
+
+
+def backfill_destination_frequency():
+    """
+    Builds the destination_frequency counters from the knowleged_destinations_account
+    documents still alive.
+
+    Each daily bucket is set with ``$max``, so running it again (e.g. on every
+    start) never double counts nor lowers a counter already incremented by
+    new transactions.
+    """
+    # pylint: disable=protected-access
+    with mongo_connection():
+        source = KnowlegedDestinations._get_collection()
+        target = DestinationFrequency._get_collection()
+        pipeline = [
+            {
+                "$group": {
+                    "_id": {
+                        "origin_user": "$origin_user",
+                        "destination_user": "$destination_user",
+                        "day": {
+                            "$dateToString": {"format": "%Y%m%d", "date": "$created_at"}
+                        },
+                    },
+                    "count": {"$sum": 1},
+                    "last": {"$max": "$created_at"},
+                }
+            }
+        ]
+        updates = []
+        for item in source.aggregate(pipeline, allowDiskUse=True):
+            key = item["_id"]
+            updates.append(
+                UpdateOne(
+                    {
+                        "origin_user": key["origin_user"],
+                        "destination_user": key["destination_user"],
+                    },
+                    {
+                        "$max": {
+                            f"days.{key['day']}": item["count"],
+                            "expires_at": item["last"]
+                            + timedelta(days=KNOWN_DESTINATION_TTL_DAYS),
+                        }
+                    },
+                    upsert=True,
+                )
+            )
+            if len(updates) >= 1000:
+                target.bulk_write(updates, ordered=False)
+                updates = []
+        if updates:
+            target.bulk_write(updates, ordered=False)
+
+
 if __name__ == "__main__":
-    populate_rules()
+    try:
+        create_indexes()
+        backfill_destination_frequency()
+        populate_rules()
+    finally:
+        close_mongo()
@@ -1,24 +1,40 @@
-"""Model for knowleged_destinations_account collection"""
+"""Model for request_log collection"""
 
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from mongoengine import DateTimeField, DictField, Document, IntField, StringField
+from mongoengine import (
+    DateTimeField,
+    DictField,
+    Document,
+    DynamicField,
+    FloatField,
+    IntField,
+    StringField,
+)
 
 
 class RequestLog(Document):
     """
-    Model for knowleged_destinations_account collection
+    Model for request_log collection, the audit trail of the API calls.
+
     Attributes:
-        origin_user: IntField(required=True, unique=True)
-        destination_user: IntField(required=True, unique=True)
+        method: StringField(required=True), the HTTP method
+        path: StringField(required=True), the request path
+        params: DictField, the path and query parameters and the JSON body
+        response_status_code: IntField(required=True)
+        response_json: DynamicField, the decoded response body (or its text when
+            it is not JSON, or None when it was too large to keep)
+        duration_ms: FloatField, the time spent serving the request
         created_at: DateTimeField
     """
 
-    response_status_code = IntField(required=True)
-    response_json = IntField(required=True)
-    created_at = DateTimeField(default=datetime.now())
-    params = DictField(required=True)
     method = StringField(required=True)
+    path = StringField(required=True)
+    params = DictField()
+    response_status_code = IntField(required=True)
+    response_json = DynamicField()
+    duration_ms = FloatField()
+    created_at = DateTimeField(default=datetime.now)
     # TTL to expire the document
     meta = {
         "indexes": [
@@ -2,7 +2,10 @@
 
 from datetime import datetime, timedelta
 
-from mongoengine import DateTimeField, Document, IntField
+from mongoengine import DateTimeField, DictField, Document, IntField
+
+# How long a destination stays known to an origin after a transaction to it.
+KNOWN_DESTINATION_TTL_DAYS = 30
 
 
 class KnowlegedDestinations(Document):
@@ -25,3 +28,35 @@ class KnowlegedDestinations(Document):
         ],
         "collection": "knowleged_destinations_account",
     }
+
+
+class DestinationFrequency(Document):
+    """
+    Model for destination_frequency collection, the transaction counter of an
+    origin/destination pair.
+
+    Replaces one ``KnowlegedDestinations`` document per transaction with a
+    single document per pair, updated with an upserted ``$inc`` of the bucket
+    of the day. Buckets older than ``KNOWN_DESTINATION_TTL_DAYS`` are ignored
+    (and pruned), and the whole document expires that long after the last
+    transaction, keeping the 30-day semantics of the old collection.
+
+    Attributes:
+        origin_user: IntField(required=True)
+        destination_user: IntField(required=True)
+        days: DictField, transaction count per day, keyed by ``YYYYMMDD``
+        expires_at: DateTimeField, when the pair stops being known
+    """
+
+    origin_user = IntField(required=True)
+    destination_user = IntField(required=True)
+    days = DictField()
+    expires_at = DateTimeField()
+
+    meta = {
+        "indexes": [
+            {"fields": ["origin_user", "destination_user"], "unique": True},
+            {"fields": ["expires_at"], "expireAfterSeconds": 0},
+        ],
+        "collection": "destination_frequency",
+    }
@@ -0,0 +1,27 @@
+"""Model for the maintained balance of each account."""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric
+
+from app.core.postgres_database import Base
+
+
+class AccountBalance(Base):
+    """
+    Represents the running balance of an account.
+
+    The balance is updated in the same database transaction as every
+    transaction insert (credits added, debits subtracted), so reading it costs
+    the same whatever the account history. ``BalanceHelper.reconcile`` checks
+    it against the ledger.
+
+    Attributes:
+        account_id (int): Primary key, foreign key referencing the account.
+        balance (Decimal): Sum of the credits minus the sum of the debits.
+        updated_at (datetime): When the balance last changed.
+    """
+
+    __tablename__ = "account_balance"
+
+    account_id = Column(Integer, ForeignKey("account.id"), primary_key=True)
+    balance = Column(Numeric(precision=18, scale=2), nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
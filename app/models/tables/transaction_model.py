@@ -8,6 +8,7 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
@@ -36,6 +37,12 @@ class Transaction(Base):
 
     Constraints:
         - The 'amount' field must be greater than 0.
+
+    Indexes:
+        - ix_transaction_velocity: origin, destination, channel and created_at,
+          covering amount, for the velocity rules history queries.
+        - ix_transaction_origin_created_at / ix_transaction_destination_created_at:
+          latest transactions (and balance) of an account, as origin or destination.
     """
 
     __tablename__ = "transaction"
@@ -57,4 +64,26 @@ class Transaction(Base):
     )
 
     # Constraint
-    __table_args__ = (CheckConstraint("amount > 0", name="check_amount_positive"),)
+    __table_args__ = (
+        CheckConstraint("amount > 0", name="check_amount_positive"),
+        Index(
+            "ix_transaction_velocity",
+            "origin_account_id",
+            "destination_account_id",
+            "channel",
+            "created_at",
+            postgresql_include=["amount"],
+        ),
+        Index(
+            "ix_transaction_origin_created_at",
+            origin_account_id,
+            created_at.desc(),
+            postgresql_include=["amount"],
+        ),
+        Index(
+            "ix_transaction_destination_created_at",
+            destination_account_id,
+            created_at.desc(),
+            postgresql_include=["amount"],
+        ),
+    )
@@ -0,0 +1,40 @@
+"""
+Checks the maintained account balances against the transaction ledger.
+
+Usage::
+
+    python -m app.reconcile_balances          # report the drift
+    python -m app.reconcile_balances --fix    # report and correct it
+
+Meant to be scheduled (e.g. daily with cron); the API can also run it
+in-process every ``BALANCE_RECONCILE_INTERVAL_SECONDS``. Exits with status 1
+when drift is found and not fixed.
+"""
+
+import argparse
+import sys
+
+from app.helpers.balance_helper import BalanceHelper
+
+
+def main():
+    """Parses the command line and runs the reconciliation."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--fix", action="store_true", help="correct the drifted balances"
+    )
+    args = parser.parse_args()
+
+    drift = BalanceHelper().reconcile(fix=args.fix)
+    for item in drift:
+        print(
+            f"account {item['account_id']}: stored {item['stored']}, "
+            f"ledger {item['ledger']}, drift {item['drift']}"
+        )
+    print(f"{len(drift)} accounts drifted" + (", fixed" if args.fix and drift else ""))
+    if drift and not args.fix:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
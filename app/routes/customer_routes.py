@@ -1,14 +1,23 @@
 """ "Customer routes"""
 
-from fastapi import APIRouter, HTTPException, status
+import json
+from typing import Annotated, Iterator, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import IntegrityError
 
+from app.core.config import STATEMENT_MAX_PAGE_SIZE, STATEMENT_PAGE_SIZE
 from app.core.logger import logger
 from app.helpers.account_helper import AccountHelper
 from app.helpers.customer_helper import CustomerHelper
 from app.models.tables.account_model import Account
 from app.models.tables.customer_model import Customer
-from app.schemas.account_schemas import AccountInfoResponse
+from app.schemas.account_schemas import (
+    AccountInfoResponse,
+    StatementCursor,
+    StatementEntry,
+)
 from app.schemas.customer_schemas import GetCustomerRequest, PutCustomerRequest
 
 router = APIRouter(prefix="/api/customers")
@@ -98,3 +107,93 @@ def get_customer_info(agencia: int, conta: int):
             detail="Account without transactions",
         )
     return AccountInfoResponse(**result)
+
+
+def _statement_page(rows: Iterator, limit: int) -> Iterator[str]:
+    """
+    Renders a statement page as JSON while its rows are read.
+
+    One row past ``limit`` is requested from the database; if it exists, the
+    page has a next cursor, built from the last row returned.
+    """
+    yield '{"items": ['
+    last = None
+    next_cursor = None
+    for count, row in enumerate(rows):
+        if count == limit:
+            next_cursor = StatementCursor(created_at=last.created_at, id=last.id)
+            break
+        entry = StatementEntry(
+            id_da_transacao=row.id,
+            data_e_hora_da_transacao=row.created_at,
+            type=row.tx_type,
+            agencia=row.agencia,
+            conta=row.conta,
+            valor=row.amount,
+            canal=row.channel,
+            suspect=row.suspect,
+        )
+        yield ("," if last is not None else "") + entry.model_dump_json()
+        last = row
+    yield '], "next_cursor": '
+    yield json.dumps(next_cursor.encode() if next_cursor else None) + "}"
+
+
+@router.get("/{agencia}/{conta}/statement")
+def get_account_statement(
+    agencia: int,
+    conta: int,
+    limit: Annotated[
+        int, Query(ge=1, le=STATEMENT_MAX_PAGE_SIZE, description="Page size")
+    ] = STATEMENT_PAGE_SIZE,
+    cursor: Annotated[
+        Optional[str], Query(description="next_cursor of the previous page")
+    ] = None,
+):
+    """
+    Retrieves a page of an account's transactions, newest first.
+
+    Pages are addressed with keyset pagination: pass the ``next_cursor`` of a
+    page to get the following one, until it is null. Every page costs the same,
+    however far back in the history it is. The page is streamed as it is read
+    from the database.
+
+    Args:
+        agencia (int): Agency number.
+        conta (int): Account number.
+        limit (int): The maximum number of transactions in the page.
+        cursor (Optional[str]): The opaque cursor returned by the previous page.
+
+    Returns:
+        JSON response with the transactions of the page and the cursor of the next one.
+
+    Raises:
+        HTTPException: If the cursor is invalid or the account is not found.
+    """
+    position = None
+    if cursor:
+        try:
+            position = StatementCursor.decode(cursor)
+        except ValueError as e:
+            logger.error("Invalid statement cursor: %s", cursor)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            ) from e
+
+    account_helper = AccountHelper()
+    request_model = GetCustomerRequest(agencia=agencia, conta=conta)
+    account = account_helper.get_account(
+        Account(agency=request_model.agencia, account=request_model.conta)
+    )
+    if account is None:
+        logger.error("Account not found for agency/account: %s/%s", agencia, conta)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Account not found"
+        )
+
+    rows = account_helper.iter_statement(
+        account, limit + 1, position, fetch_size=min(limit + 1, STATEMENT_PAGE_SIZE)
+    )
+    return StreamingResponse(
+        _statement_page(rows, limit), media_type="application/json"
+    )
@@ -0,0 +1,77 @@
+"""Metrics routes"""
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.core.mongo_database import pool_metrics
+from app.helpers.async_request_log_helper import request_log_writer
+from app.helpers.async_risk_engine_helper import degraded_metrics
+from app.helpers.history_store_helper import history_store
+from app.helpers.lookup_cache_helper import account_cache, customer_cache
+
+router = APIRouter(prefix="/metrics")
+
+
+@router.get("")
+def get_prometheus_metrics():
+    """
+    Retrieves the risk evaluation metrics in the Prometheus text format.
+
+    Returns:
+        Response with the timing histograms per rule, transform and helper
+        query, the rule matches and the degraded-mode counters.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/mongo")
+def get_mongo_pool_metrics():
+    """
+    Retrieves the MongoDB connection pool metrics.
+
+    Returns:
+        JSON response with the checked-out and open connections, the number of
+        checkouts and the time spent waiting for a connection.
+    """
+    return pool_metrics.snapshot()
+
+
+@router.get("/scoring")
+def get_scoring_metrics():
+    """
+    Retrieves how often transactions were evaluated in degraded mode, with
+    transforms approximated or skipped to stay within the latency budget.
+
+    Returns:
+        JSON response with the evaluation counters.
+    """
+    return degraded_metrics.snapshot()
+
+
+@router.get("/cache")
+def get_lookup_cache_metrics():
+    """
+    Retrieves the account and customer lookup cache metrics, and those of the
+    sliding-window transaction history.
+
+    Returns:
+        JSON response with the size, hits, misses, evictions and expirations
+        of each cache.
+    """
+    return {
+        "account": account_cache.stats(),
+        "customer": customer_cache.stats(),
+        "history": history_store.stats(),
+    }
+
+
+@router.get("/request-log")
+def get_request_log_metrics():
+    """
+    Retrieves the request audit log writer metrics.
+
+    Returns:
+        JSON response with the entries queued, written to MongoDB, spilled to
+        the local file and dropped.
+    """
+    return request_log_writer.stats()
@@ -1,34 +1,43 @@
 """FastAPI application entry point."""
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from app.core.constants import ChannelEnum
 from app.core.logger import logger
-from app.helpers.account_helper import AccountHelper
-from app.helpers.customer_helper import CustomerHelper
-from app.helpers.mongo_helper import MongoHelper
-from app.helpers.risk_engine_helper import RiskEvaluator
-from app.helpers.transaction_helper import TransactionHelper
-from app.models.collections.user_cache_model import KnowlegedDestinations
+from app.helpers.async_account_helper import AsyncAccountHelper
+from app.helpers.async_frequency_buffer_helper import frequency_buffer
+from app.helpers.async_risk_engine_helper import AsyncRiskEvaluator
+from app.helpers.async_transaction_helper import AsyncTransactionHelper
+from app.helpers.batch_scoring_helper import BatchScoringHelper
+from app.helpers.stream_scoring_helper import StreamScoringHelper
 from app.models.tables.account_model import Account
 from app.models.tables.transaction_model import Transaction
-from app.schemas.transaction_schemas import PutTransactionRequest
+from app.schemas.transaction_schemas import (
+    BatchTransactionRequest,
+    PutTransactionRequest,
+)
 
 router = APIRouter(prefix="/api/transaction")
 
 
 @router.put("/create", status_code=status.HTTP_201_CREATED)
-def put_transaction(data: PutTransactionRequest):
+async def put_transaction(data: PutTransactionRequest):
     """
     Create a new transaction based on the given data.
 
+    Every database call is awaited, so a single worker can keep many
+    transactions in flight instead of being limited by the threadpool size.
+
     Args:
         data (PutTransactionRequest): The transaction data.
         db (Session): The database session.
 
     Returns:
         JSON response with a message and a boolean indicating if the transaction is suspect.
+        Rules evaluated in degraded mode, past the latency budget, are listed in
+        ``degraded_rules``.
 
     Raises:
         HTTPException: If the channel code is invalid or if any unexpected error happens.
@@ -46,17 +55,19 @@ def put_transaction(data: PutTransactionRequest):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Origin and destination accounts cannot be the same",
         )
-    transaction_helper = TransactionHelper()
-    account_helper = AccountHelper()
-    customer_helper = CustomerHelper()
-    mongo_helper = MongoHelper()
+    transaction_helper = AsyncTransactionHelper()
+    account_helper = AsyncAccountHelper()
     origin_account = Account(
         agency=data.agencia_de_origem, account=data.conta_de_origem
     )
     dest_account = Account(
         agency=data.agencia_de_destino, account=data.conta_de_destino
     )
-    origin_account = account_helper.get_account(origin_account)
+    accounts = await account_helper.resolve_transfer_accounts(
+        origin_account, dest_account
+    )
+    origin_account = accounts.origin
+    dest_account = accounts.destination
     if not origin_account:
         logger.error(
             "Origin account not found (agency/account) %s/%s",
@@ -67,7 +78,6 @@ def put_transaction(data: PutTransactionRequest):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Origin account not found",
         )
-    dest_account = account_helper.get_account(dest_account)
     if not dest_account:
         logger.error(
             "Destination account not found (agency/account) %s/%s",
@@ -79,16 +89,11 @@ def put_transaction(data: PutTransactionRequest):
             detail="Destination account not found",
         )
 
-    risk_evaluator = RiskEvaluator()
+    risk_evaluator = AsyncRiskEvaluator()
 
     try:
-        if isinstance(data.canal, int):
-            channel = ChannelEnum(data.canal)
-        elif data.canal in [member.name for member in ChannelEnum]:
-            channel = ChannelEnum[data.canal]
-        else:
-            raise ValueError
-    except (ValueError, KeyError) as e:
+        channel = ChannelEnum.from_code(data.canal)
+    except ValueError as e:
         logger.error(
             "Invalid channel code, use one of the following values: %s",
             [member.name for member in ChannelEnum],
@@ -98,11 +103,10 @@ def put_transaction(data: PutTransactionRequest):
             detail=f"Invalid channel code, use one of the following values",
         ) from e
 
-    origin_account.customer_rel = customer_helper.get_customer_by_id(origin_account)
     transaction = Transaction(
         id=data.id_da_transacao,
-        origin_account_id=origin_account.customer_id,
-        destination_account_id=dest_account.customer_id,
+        origin_account_id=origin_account.id,
+        destination_account_id=dest_account.id,
         amount=data.valor_da_transacao,
         channel=channel,
         created_at=data.data_e_hora_da_transacao.replace(tzinfo=None),
@@ -110,12 +114,12 @@ def put_transaction(data: PutTransactionRequest):
         destination_account_rel=dest_account,
     )
 
-    is_suspect = risk_evaluator.calculate_risk(transaction=transaction)
+    decision = await risk_evaluator.decide_async(transaction)
 
-    transaction.suspect = is_suspect
+    transaction.suspect = decision.suspect
 
     try:
-        transaction = transaction_helper.insert(transaction)
+        transaction = await transaction_helper.insert(transaction)
         # Use o estilo %s
         logger.info("Transaction created %s", transaction.id)
 
@@ -137,11 +141,76 @@ def put_transaction(data: PutTransactionRequest):
             status_code=status.WS_1011_INTERNAL_ERROR, detail=str(e)
         ) from e
 
-    mongo_helper.save(
-        KnowlegedDestinations(
-            origin_user=transaction.origin_account_id,
-            destination_user=transaction.destination_account_id,
-        )
+    await frequency_buffer.record(
+        transaction.origin_account_id, transaction.destination_account_id
     )
 
-    return {"message": "Created", "suspect": transaction.suspect}
+    response = {"message": "Created", "suspect": transaction.suspect}
+    if decision.degraded_rules:
+        response["degraded_rules"] = list(decision.degraded_rules)
+    return response
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK)
+async def post_transaction_batch(data: BatchTransactionRequest):
+    """
+    Score and create many transactions at once.
+
+    Accounts, history and existing ids are read in bulk for the whole batch and
+    the accepted transactions are stored with a single bulk insert. Items are
+    evaluated in order, so each one sees the items before it as history.
+
+    Args:
+        data (BatchTransactionRequest): The transactions to create.
+
+    Returns:
+        JSON response with the number of created and rejected transactions and,
+        for each item, its suspect flag or the reason it was rejected.
+
+    Raises:
+        HTTPException: If a database error or any unexpected error happens.
+    """
+    try:
+        results = await BatchScoringHelper().score(data.items)
+    except SQLAlchemyError as e:
+        logger.error("Database error", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+    except Exception as e:
+        logger.error("An unexpected error occurred", exc_info=True)
+        raise HTTPException(
+            status_code=status.WS_1011_INTERNAL_ERROR, detail=str(e)
+        ) from e
+
+    rejected = sum(1 for result in results if result.error)
+    return {
+        "message": "Processed",
+        "created": len(results) - rejected,
+        "rejected": rejected,
+        "results": [result.model_dump(exclude_none=True) for result in results],
+    }
+
+
+@router.post("/stream", status_code=status.HTTP_200_OK)
+async def post_transaction_stream(request: Request):
+    """
+    Score and create the transactions of an NDJSON request body.
+
+    Each body line is a ``PutTransactionRequest`` object. The body is read
+    incrementally and the results are streamed back as NDJSON, one line per
+    input line, as soon as each chunk of transactions is decided. The body is
+    only read as fast as the client reads the results, so uploads of any size
+    are processed with bounded memory.
+
+    Args:
+        request (Request): The request, with a (chunked) NDJSON body.
+
+    Returns:
+        StreamingResponse: NDJSON lines with the input line number and either
+        the suspect flag or the reason the transaction was rejected.
+    """
+    return StreamingResponse(
+        StreamScoringHelper().score(request.stream()),
+        media_type="application/x-ndjson",
+    )
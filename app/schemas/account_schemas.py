@@ -1,9 +1,14 @@
 """Account Schemas"""
 
-from typing import List
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
+from app.models.tables.account_model import Account
 from app.schemas.transaction_schemas import TransactionSummary
 
 
@@ -12,3 +17,111 @@ class AccountInfoResponse(BaseModel):
     idade: int
     balance: float
     last_transactions: List[TransactionSummary]
+
+
+class AccountResolution(BaseModel):
+    """
+    Accounts involved in a transfer, resolved in a single query.
+
+    Attributes:
+        origin (Optional[Account]): The origin account, with its customer loaded,
+            or None if it does not exist.
+        destination (Optional[Account]): The destination account, or None if it
+            does not exist.
+    """
+
+    model_config = {"arbitrary_types_allowed": True}
+    origin: Optional[Account] = None
+    destination: Optional[Account] = None
+
+    @classmethod
+    def from_accounts(
+        cls, accounts: Iterable[Account], origin: Account, destination: Account
+    ) -> "AccountResolution":
+        """
+        Matches the accounts returned by the query to the origin and destination.
+
+        Args:
+            accounts (Iterable[Account]): The accounts found.
+            origin (Account): The agency and account numbers of the origin.
+            destination (Account): The agency and account numbers of the destination.
+
+        Returns:
+            AccountResolution: The resolved accounts.
+        """
+        by_number = {(item.agency, item.account): item for item in accounts}
+        return cls(
+            origin=by_number.get((origin.agency, origin.account)),
+            destination=by_number.get((destination.agency, destination.account)),
+        )
+
+
+class StatementEntry(BaseModel):
+    """
+    A transaction of an account statement.
+
+    Attributes:
+        id_da_transacao (str): Transaction ID.
+        data_e_hora_da_transacao (datetime): Transaction timestamp.
+        type (Literal["credit", "debit"]): Transaction type, from the account view.
+        agencia (int): Branch number of the other account.
+        conta (int): Account number of the other account.
+        valor (Decimal): Transaction amount.
+        canal (int): Channel code.
+        suspect (Optional[bool]): Whether the transaction is suspect.
+    """
+
+    id_da_transacao: str
+    data_e_hora_da_transacao: datetime
+    type: Literal["credit", "debit"]
+    agencia: Optional[int]
+    conta: Optional[int]
+    valor: Decimal
+    canal: int
+    suspect: Optional[bool]
+
+
+class StatementCursor(BaseModel):
+    """
+    Position of a statement page: the key of the last transaction returned.
+
+    Statements are ordered by ``(created_at, id)`` descending, so the next page
+    starts right after this key. Clients only see the opaque ``encode()`` form.
+
+    Attributes:
+        created_at (datetime): Timestamp of the last transaction returned.
+        id (str): ID of the last transaction returned.
+    """
+
+    created_at: datetime
+    id: str
+
+    def encode(self) -> str:
+        """
+        Returns the opaque form of the cursor.
+
+        Returns:
+            str: The cursor as URL-safe base64.
+        """
+        payload = json.dumps([self.created_at.isoformat(), self.id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "StatementCursor":
+        """
+        Parses the opaque form of a cursor.
+
+        Args:
+            token (str): The cursor returned by a previous page.
+
+        Returns:
+            StatementCursor: The cursor.
+
+        Raises:
+            ValueError: If the token is not a valid cursor.
+        """
+        try:
+            created_at, transaction_id = json.loads(base64.urlsafe_b64decode(token))
+            return cls(created_at=created_at, id=transaction_id)
+        except (ValueError, TypeError, ValidationError) as e:
+            raise ValueError("Invalid cursor") from e
@@ -3,10 +3,11 @@
 import hashlib
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Annotated, Literal, Union
+from typing import Annotated, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
+from app.core.config import BATCH_MAX_ITEMS
 from app.core.constants import ChannelEnum
 
 
@@ -75,6 +76,35 @@ class PutTransactionRequest(BaseModel):
     ]
 
 
+class BatchTransactionRequest(BaseModel):
+    """
+    BatchTransactionRequest defines the schema for scoring many transactions at once.
+
+    Attributes:
+        items (List[PutTransactionRequest]): The transactions, evaluated in order.
+    """
+
+    items: Annotated[
+        List[PutTransactionRequest],
+        Field(..., min_length=1, max_length=BATCH_MAX_ITEMS),
+    ]
+
+
+class BatchTransactionResult(BaseModel):
+    """
+    BatchTransactionResult defines the outcome of a single item of a batch.
+
+    Attributes:
+        id_da_transacao (str): Transaction ID.
+        suspect (Optional[bool]): Whether the transaction is suspect, if it was created.
+        error (Optional[str]): Why the transaction was rejected, if it was.
+    """
+
+    id_da_transacao: str
+    suspect: Optional[bool] = None
+    error: Optional[str] = None
+
+
 class TransactionSummary(BaseModel):
     """
     TransactionSummary defines the schema for a transaction summary.
@@ -0,0 +1 @@
+"""Benchmarks run against a real PostgreSQL/MongoDB, outside the test suite."""
@@ -0,0 +1,484 @@
+"""
+Load-tests the scoring API: throughput, latency percentiles and database calls.
+
+Usage::
+
+    python -m benchmarks.load_test --customers 2000 --history 200000 \\
+        --requests 5000 --concurrency 50 --output results.json
+    python -m benchmarks.load_test --requests 5000 --compare results.json
+
+The FastAPI application is started in-process, with its lifespan, against the
+configured PostgreSQL and MongoDB, and called through its ASGI interface (the
+HTTP server and the network are left out of the measure). ``--customers``
+customers are created with accounts in agency ``--agency``, and ``--history``
+past transactions between them are loaded with the bulk loader (so balances
+and destination frequencies are maintained), each origin sending to
+``--fanout`` destinations over ``--days`` days. A later run reuses the seeded
+agency; ``--cleanup`` deletes it at the end.
+
+``--requests`` calls to ``PUT /api/transaction/create``,
+``GET /api/customers/{agencia}/{conta}`` and ``GET /rules``, mixed by
+``--mix``, are made by ``--concurrency`` concurrent clients after ``--warmup``
+unmeasured ones. The SQL statements and MongoDB commands run while serving each
+request are counted; those of the background writers are not. Results are
+printed, stored as JSON with ``--output``, and compared with a previous result
+with ``--compare``; the exit code is 1 when a p95 latency grew more than
+``--max-regression`` percent.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pymongo import monitoring
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import event, text
+
+from app.api import app
+from app.core.mongo_database import close_mongo, mongo_connection
+from app.core.postgres_database import async_engine, engine
+from app.helpers.bulk_load_helper import BulkLoadHelper, Record
+from app.models.collections.user_cache_model import DestinationFrequency
+
+ENDPOINTS = ("create", "customer", "rules")
+
+console = Console()
+
+# Database calls made while serving the current request, None outside of one.
+request_calls: ContextVar[Optional[Counter]] = ContextVar("request_calls", default=None)
+
+
+def count_call(kind: str):
+    """Counts a database call for the request being served, if any."""
+    calls = request_calls.get()
+    if calls is not None:
+        calls[kind] += 1
+
+
+class MongoCommandCounter(monitoring.CommandListener):
+    """Counts the MongoDB commands sent while serving a request."""
+
+    def started(self, _event):
+        count_call("mongo")
+
+    def succeeded(self, _event):
+        pass
+
+    def failed(self, _event):
+        pass
+
+
+def count_sql(*_):
+    """Counts the SQL statements run while serving a request."""
+    count_call("sql")
+
+
+def random_amount() -> Decimal:
+    """Returns a log-normal transaction amount, in whole cents."""
+    return Decimal(max(1, round(random.lognormvariate(5, 1.5) * 100))) / 100
+
+
+def destination_of(origin: int, offset: int, customers: int) -> int:
+    """
+    Returns the account ``offset`` accounts after ``origin``, wrapping around
+    the ``customers`` accounts and skipping ``origin`` itself.
+    """
+    offset = 1 + (offset - 1) % (customers - 1)
+    return 1 + (origin - 1 + offset) % customers
+
+
+def seed(agency: int, customers: int, history: int, fanout: int, days: int):
+    """
+    Creates the customers and accounts of ``agency``, unless already there, and
+    loads their transaction history.
+
+    Each origin account sends to ``fanout`` destinations at most, so pairs have
+    a history of realistic length.
+    """
+    with engine.begin() as conn:
+        existing = conn.execute(
+            text("SELECT count(*) FROM account WHERE agency = :agency"),
+            {"agency": agency},
+        ).scalar()
+        if existing:
+            console.print(f"Reusing the {existing} accounts of agency {agency}")
+            return
+        conn.execute(
+            text(
+                """
+                WITH customers AS (
+                    INSERT INTO customer (name, age)
+                    SELECT 'load customer ' || g, 18 + g % 70
+                    FROM generate_series(1, :n) g
+                    RETURNING id
+                )
+                INSERT INTO account (agency, account, customer_id)
+                SELECT :agency, row_number() OVER (ORDER BY id), id FROM customers
+                """
+            ),
+            {"n": customers, "agency": agency},
+        )
+
+    def records() -> Iterator[Record]:
+        now = datetime.now()
+        for index in range(history):
+            origin = random.randint(1, customers)
+            destination = destination_of(
+                origin, random.randint(1, fanout), customers
+            )
+            created_at = now - timedelta(seconds=random.uniform(0, days * 86400))
+            yield {
+                "id_da_transacao": f"load-{agency}-{index}",
+                "data_e_hora_da_transacao": int(created_at.timestamp()),
+                "valor_da_transacao": random_amount(),
+                "canal": random.randint(0, 3),
+                "agencia_de_origem": agency,
+                "conta_de_origem": origin,
+                "agencia_de_destino": agency,
+                "conta_de_destino": destination,
+            }, ""
+
+    started = time.perf_counter()
+    stats = BulkLoadHelper().load(records())
+    console.print(
+        f"Seeded {customers} customers and {stats.loaded} transactions "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    if stats.rejected:
+        raise RuntimeError(f"Seed transactions rejected: {dict(stats.rejected)}")
+
+
+def cleanup(agency: int):
+    """Deletes the customers, accounts and transactions of ``agency``."""
+    with engine.begin() as conn:
+        ids = conn.execute(
+            text("SELECT id FROM account WHERE agency = :agency"), {"agency": agency}
+        ).scalars()
+        ids = list(ids)
+        conn.execute(
+            text(
+                "DELETE FROM transaction WHERE origin_account_id = ANY(:ids) "
+                "OR destination_account_id = ANY(:ids)"
+            ),
+            {"ids": ids},
+        )
+        conn.execute(
+            text("DELETE FROM account_balance WHERE account_id = ANY(:ids)"),
+            {"ids": ids},
+        )
+        customers = conn.execute(
+            text("DELETE FROM account WHERE id = ANY(:ids) RETURNING customer_id"),
+            {"ids": ids},
+        ).scalars()
+        conn.execute(
+            text("DELETE FROM customer WHERE id = ANY(:ids)"),
+            {"ids": list(customers)},
+        )
+    with mongo_connection():
+        DestinationFrequency.objects(origin_user__in=ids).delete()
+    close_mongo()
+    console.print(f"Deleted the {len(ids)} accounts of agency {agency}")
+
+
+async def call(method: str, path: str, body: Optional[dict] = None) -> int:
+    """Calls the application through ASGI; returns the response status."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    status = 500
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            # Only read again to detect a disconnection, after the response.
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(
+        {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"content-type", b"application/json")],
+            "client": ("127.0.0.1", 0),
+            "server": ("benchmark", 80),
+        },
+        receive,
+        send,
+    )
+    return status
+
+
+class Workload:
+    """Builds the requests of the load test, picked at random by ``mix``."""
+
+    def __init__(self, agency: int, customers: int, fanout: int, mix: Dict[str, int]):
+        self.agency = agency
+        self.customers = customers
+        self.fanout = fanout
+        self.endpoints = list(mix)
+        self.weights = list(mix.values())
+        self.run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+        self.sequence = 0
+
+    def next_request(self) -> Tuple[str, str, str, Optional[dict]]:
+        """Returns the endpoint, method, path and body of a request."""
+        endpoint = random.choices(self.endpoints, self.weights)[0]
+        origin = random.randint(1, self.customers)
+        if endpoint == "customer":
+            return endpoint, "GET", f"/api/customers/{self.agency}/{origin}", None
+        if endpoint == "rules":
+            return endpoint, "GET", "/rules", None
+
+        self.sequence += 1
+        # Mostly known destinations, sometimes a new one.
+        offset = random.randint(1, self.fanout if random.random() < 0.8 else 1000)
+        body = {
+            "id_da_transacao": f"load-{self.run_id}-{self.sequence}",
+            "data_e_hora_da_transacao": int(time.time()),
+            "valor_da_transacao": float(random_amount()),
+            "canal": random.randint(0, 3),
+            "agencia_de_origem": self.agency,
+            "conta_de_origem": origin,
+            "agencia_de_destino": self.agency,
+            "conta_de_destino": destination_of(origin, offset, self.customers),
+        }
+        return endpoint, "PUT", "/api/transaction/create", body
+
+
+async def run_load(
+    workload: Workload, requests: int, concurrency: int
+) -> Tuple[Dict[str, List[dict]], float]:
+    """
+    Makes ``requests`` calls from ``concurrency`` concurrent clients.
+
+    Returns:
+        Tuple[Dict[str, List[dict]], float]: The status, latency and database
+        calls of every request per endpoint, and the elapsed seconds.
+    """
+    samples: Dict[str, List[dict]] = {endpoint: [] for endpoint in ENDPOINTS}
+    remaining = requests
+
+    async def client():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            endpoint, method, path, body = workload.next_request()
+            calls = Counter()
+            request_calls.set(calls)
+            started = time.perf_counter()
+            status = await call(method, path, body)
+            samples[endpoint].append(
+                {
+                    "status": status,
+                    "ms": (time.perf_counter() - started) * 1000,
+                    "sql": calls["sql"],
+                    "mongo": calls["mongo"],
+                }
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples: List[dict], elapsed: float) -> dict:
+    """
+    Computes the throughput, latency percentiles and database calls.
+
+    Any response other than 2xx is an error; errors are left out of the
+    throughput and the latencies, since they are usually answered early.
+    """
+    succeeded = [sample for sample in samples if 200 <= sample["status"] < 300]
+    latencies = [sample["ms"] for sample in succeeded]
+    if len(latencies) < 2:
+        latencies = latencies * 2 or [0.0, 0.0]
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(succeeded),
+        "statuses": dict(Counter(str(sample["status"]) for sample in samples)),
+        "throughput": len(succeeded) / elapsed if elapsed else 0.0,
+        "p50_ms": percentiles[49],
+        "p95_ms": percentiles[94],
+        "p99_ms": percentiles[98],
+        "sql_per_request": statistics.fmean([s["sql"] for s in samples] or [0]),
+        "mongo_per_request": statistics.fmean([s["mongo"] for s in samples] or [0]),
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Returns the checked out commit, if run from a git repository."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict, baseline: Optional[dict]):
+    """Prints the results, with the change from ``baseline`` if given."""
+    table = Table(title=f"{results['concurrency']} concurrent clients")
+    columns = ("endpoint", "requests", "errors", "req/s", "p50 ms", "p95 ms")
+    for column in columns + ("p99 ms", "SQL/req", "Mongo/req"):
+        table.add_column(column, justify="left" if column == "endpoint" else "right")
+    if baseline:
+        table.add_column("p95 change", justify="right")
+
+    for name, stats in results["endpoints"].items():
+        row = [
+            name,
+            f"{stats['requests']}",
+            f"{stats['errors']}",
+            f"{stats['throughput']:.1f}",
+            f"{stats['p50_ms']:.2f}",
+            f"{stats['p95_ms']:.2f}",
+            f"{stats['p99_ms']:.2f}",
+            f"{stats['sql_per_request']:.1f}",
+            f"{stats['mongo_per_request']:.1f}",
+        ]
+        if baseline:
+            change = regression(stats, baseline["endpoints"].get(name))
+            row.append(f"{change:+.1f}%" if change is not None else "-")
+        table.add_row(*row)
+    console.print(table)
+
+
+def regression(stats: dict, baseline: Optional[dict]) -> Optional[float]:
+    """Returns how much the p95 latency grew from ``baseline``, in percent."""
+    if not baseline or not baseline["p95_ms"] or not stats["requests"]:
+        return None
+    return (stats["p95_ms"] / baseline["p95_ms"] - 1) * 100
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Parses ``create=70,customer=25,rules=5`` into weights per endpoint."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}")
+        mix[name] = int(weight)
+    return mix
+
+
+async def benchmark(args: argparse.Namespace) -> dict:
+    """Seeds the data, then runs the warm-up and the measured load."""
+    monitoring.register(MongoCommandCounter())
+    event.listen(engine, "before_cursor_execute", count_sql)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_sql)
+
+    async with app.router.lifespan_context(app):
+        await asyncio.to_thread(
+            seed, args.agency, args.customers, args.history, args.fanout, args.days
+        )
+        workload = Workload(args.agency, args.customers, args.fanout, args.mix)
+        if args.warmup:
+            await run_load(workload, args.warmup, args.concurrency)
+        samples, elapsed = await run_load(workload, args.requests, args.concurrency)
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "concurrency": args.concurrency,
+        "parameters": {
+            key: value for key, value in vars(args).items() if key != "compare"
+        },
+        "elapsed_seconds": elapsed,
+        "endpoints": {
+            **{
+                endpoint: summarize(samples[endpoint], elapsed)
+                for endpoint in ENDPOINTS
+                if samples[endpoint]
+            },
+            "all": summarize(
+                [sample for items in samples.values() for sample in items], elapsed
+            ),
+        },
+    }
+
+
+def main():
+    """Parses the command line and runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--agency", type=int, default=9999)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=200_000)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="create=70,customer=25,rules=5",
+        help="endpoint weights (default: %(default)s)",
+    )
+    parser.add_argument("--output", help="file to store the results as JSON")
+    parser.add_argument("--compare", help="results of a previous run, as JSON")
+    parser.add_argument("--max-regression", type=float, default=10.0)
+    parser.add_argument("--cleanup", action="store_true", help="delete the agency")
+    args = parser.parse_args()
+    if args.customers < 2:
+        parser.error("--customers must be at least 2")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as stream:
+            baseline = json.load(stream)
+
+    try:
+        results = asyncio.run(benchmark(args))
+    finally:
+        if args.cleanup:
+            cleanup(args.agency)
+
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as stream:
+            json.dump(results, stream, indent=2)
+        console.print(f"Results stored in {args.output}")
+
+    if baseline:
+        regressed = {
+            name: change
+            for name, stats in results["endpoints"].items()
+            if (change := regression(stats, baseline["endpoints"].get(name)))
+            is not None
+            and change > args.max_regression
+        }
+        for name, change in regressed.items():
+            console.print(f"[red]{name}: p95 latency {change:+.1f}%[/red]")
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Benchmarks the risk-engine queries before and after the transaction indexes.
+
+Usage::
+
+    python -m benchmarks.query_indexes --rows 2000000 --accounts 20000
+
+A dedicated schema is created in the configured PostgreSQL database (or the
+one given with ``--database-url``) and seeded with ``--rows`` transactions
+spread over ``--days`` days. Every query shape is timed and explained first
+without, then with, the indexes of the ``transaction`` model (the ones created by
+migration ``5c1d2e7a9b34``). The schema is dropped at the end unless
+``--keep`` is given.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import (
+    case,
+    create_engine,
+    desc,
+    func,
+    or_,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from app.core.postgres_database import DATABASE_URL, Base
+from app.models.tables.account_model import Account  # pylint: disable=unused-import
+from app.models.tables.customer_model import Customer  # pylint: disable=unused-import
+from app.models.tables.transaction_model import Transaction
+
+SCHEMA = "benchmark_indexes"
+# Window of the widest velocity rule in the seeded rule set.
+VELOCITY_WINDOW_MINUTES = 43200
+VELOCITY_CHANNELS = (2, 3)
+
+console = Console()
+
+
+def seed(conn: Connection, rows: int, accounts: int, fanout: int, days: int):
+    """
+    Seeds customers, accounts and transactions with ``generate_series``.
+
+    Each origin account sends to ``fanout`` destinations at most, so pairs have
+    a history of realistic length.
+    """
+    conn.execute(
+        text(
+            "INSERT INTO customer (id, name, age) "
+            "SELECT g, 'customer ' || g, 18 + g % 70 FROM generate_series(1, :n) g"
+        ),
+        {"n": accounts},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO account (id, agency, account, customer_id) "
+            "SELECT g, 1 + g % 100, g, g FROM generate_series(1, :n) g"
+        ),
+        {"n": accounts},
+    )
+    conn.execute(
+        text(
+            """
+            INSERT INTO transaction (id, created_at, amount, channel, suspect,
+                                     origin_account_id, destination_account_id)
+            SELECT 'bench-' || g,
+                   localtimestamp
+                       - random() * make_interval(days => CAST(:days AS int)),
+                   round((1 + random() * 5000)::numeric, 2),
+                   floor(random() * 4)::int,
+                   false,
+                   origin,
+                   1 + (origin + floor(random() * :fanout)::int) % :accounts
+            FROM (
+                SELECT g, 1 + floor(random() * :accounts)::int AS origin
+                FROM generate_series(1, :rows) g
+            ) s
+            """
+        ),
+        {"rows": rows, "accounts": accounts, "fanout": fanout, "days": days},
+    )
+    conn.execute(text("ANALYZE"))
+
+
+def query_shapes(pair: tuple) -> Dict[str, Select]:
+    """Returns the statement of each query shape for an (origin, destination) pair."""
+    origin, destination = pair
+    lookback = datetime.now() - timedelta(minutes=VELOCITY_WINDOW_MINUTES)
+    is_origin = or_(
+        Transaction.origin_account_id == origin,
+        Transaction.destination_account_id == origin,
+    )
+    return {
+        # TransactionHelper.count_transaction_by_user_channel
+        "velocity count": select(
+            Transaction.channel,
+            Transaction.amount,
+            Transaction.destination_account_id,
+            Transaction.origin_account_id,
+            func.count(Transaction.id),  # pylint: disable=not-callable
+        )
+        .where(
+            Transaction.channel.in_(VELOCITY_CHANNELS),
+            Transaction.created_at > lookback,
+            Transaction.origin_account_id == origin,
+            Transaction.destination_account_id == destination,
+        )
+        .group_by(
+            Transaction.channel,
+            Transaction.amount,
+            Transaction.destination_account_id,
+            Transaction.origin_account_id,
+        ),
+        # TransactionHelper.get_recent_transactions (history warm-up)
+        "pair history": select(
+            Transaction.origin_account_id,
+            Transaction.destination_account_id,
+            Transaction.channel,
+            Transaction.amount,
+            Transaction.created_at,
+        ).where(
+            tuple_(
+                Transaction.origin_account_id, Transaction.destination_account_id
+            ).in_([pair]),
+            Transaction.created_at > lookback,
+        ),
+        # AccountHelper.__get_transactions_subquery
+        "last transactions": select(
+            Transaction.id, Transaction.created_at, Transaction.amount
+        )
+        .where(is_origin)
+        .order_by(desc(Transaction.created_at))
+        .limit(10),
+        # AccountHelper.__get_balance_subquery
+        "balance": select(
+            func.coalesce(
+                func.sum(
+                    case(
+                        (
+                            Transaction.destination_account_id == origin,
+                            Transaction.amount,
+                        ),
+                        else_=-Transaction.amount,
+                    )
+                ),
+                0,
+            )
+        ).where(is_origin),
+    }
+
+
+def measure(conn: Connection, pairs: List[tuple], label: str) -> Dict[str, dict]:
+    """Times every query shape over the sampled pairs and prints one plan of each."""
+    timings: Dict[str, List[float]] = {}
+    for index, pair in enumerate(pairs):
+        for name, statement in query_shapes(pair).items():
+            started = time.perf_counter()
+            conn.execute(statement).all()
+            elapsed = (time.perf_counter() - started) * 1000
+            timings.setdefault(name, []).append(elapsed)
+            if index == 0:
+                compiled = statement.compile(
+                    dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+                )
+                plan = conn.execute(
+                    text(f"EXPLAIN (ANALYZE, BUFFERS) {compiled}")
+                ).scalars()
+                console.rule(f"{label}: {name}")
+                console.print("\n".join(plan), highlight=False)
+
+    return {
+        name: {
+            "p50": statistics.median(values),
+            "p95": (
+                statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+            ),
+        }
+        for name, values in timings.items()
+    }
+
+
+def main():
+    """Parses the command line and runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--accounts", type=int, default=20_000)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded schema")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    indexes = list(Transaction.__table__.indexes)
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        Base.metadata.create_all(conn)
+        for index in indexes:
+            index.drop(conn)
+        conn.commit()
+
+        started = time.perf_counter()
+        seed(conn, args.rows, args.accounts, args.fanout, args.days)
+        conn.commit()
+        elapsed = time.perf_counter() - started
+        console.print(f"Seeded {args.rows} rows in {elapsed:.1f}s")
+
+        pairs = conn.execute(
+            text(
+                "SELECT DISTINCT origin_account_id, destination_account_id "
+                "FROM transaction LIMIT :n"
+            ),
+            {"n": args.samples * 10},
+        ).all()
+        pairs = random.sample(
+            [tuple(pair) for pair in pairs], min(args.samples, len(pairs))
+        )
+
+        before = measure(conn, pairs, "without indexes")
+
+        started = time.perf_counter()
+        for index in indexes:
+            index.create(conn)
+        conn.execute(text("ANALYZE transaction"))
+        conn.commit()
+        console.print(f"Indexes built in {time.perf_counter() - started:.1f}s")
+
+        after = measure(conn, pairs, "with indexes")
+
+        table = Table(title=f"Latency over {len(pairs)} samples (ms)")
+        for column in ("query", "p50 before", "p50 after", "p95 before", "p95 after"):
+            table.add_column(column)
+        table.add_column("speedup")
+        for name, stats in before.items():
+            table.add_row(
+                name,
+                f"{stats['p50']:.2f}",
+                f"{after[name]['p50']:.2f}",
+                f"{stats['p95']:.2f}",
+                f"{after[name]['p95']:.2f}",
+                f"{stats['p50'] / after[name]['p50']:.1f}x",
+            )
+        console.print(table)
+
+        if not args.keep:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
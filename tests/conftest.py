@@ -0,0 +1,12 @@
+import pytest
+
+from app.helpers.history_store_helper import history_store
+from app.helpers.lookup_cache_helper import account_cache, customer_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_lookup_cache():
+    account_cache.clear()
+    customer_cache.clear()
+    history_store.clear()
+    yield
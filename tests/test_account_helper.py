@@ -1,3 +1,4 @@
+from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -5,8 +6,10 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from app.helpers.account_helper import AccountHelper
 from app.models.tables.account_model import Account
+from app.schemas.account_schemas import StatementCursor
 
 sample_account = Account(id=1, agency="123", account="456", customer_id=10)
+sample_destination = Account(id=2, agency="123", account="789", customer_id=11)
 
 
 @pytest.fixture
@@ -62,5 +65,90 @@ def test_get_account_failure(mock_get_db, account_helper):
         account_helper.get_account(sample_account)
 
 
+@patch("app.helpers.account_helper.get_db")
+def test_get_account_uses_cache(mock_get_db, account_helper):
+    mock_db = MagicMock()
+    mock_db.query.return_value.filter.return_value.first.return_value = sample_account
+    mock_get_db.return_value.__enter__.return_value = mock_db
+
+    account_helper.get_account(sample_account)
+    result = account_helper.get_account(sample_account)
+
+    assert result is not sample_account
+    assert (result.id, result.customer_id) == (1, 10)
+    mock_db.query.assert_called_once()
+
+
+@patch("app.helpers.account_helper.get_db")
+def test_save_account_invalidates_cache(mock_get_db, account_helper):
+    mock_db = MagicMock()
+    mock_db.query.return_value.filter.return_value.first.return_value = sample_account
+    mock_get_db.return_value.__enter__.return_value = mock_db
+
+    account_helper.get_account(sample_account)
+    account_helper.save_account(sample_account)
+    account_helper.get_account(sample_account)
+
+    assert mock_db.query.call_count == 2
+
+
+@patch("app.helpers.account_helper.get_db")
+def test_resolve_transfer_accounts_success(mock_get_db, account_helper):
+    mock_db = MagicMock()
+    mock_db.query.return_value.options.return_value.filter.return_value.all.return_value = [
+        sample_destination,
+        sample_account,
+    ]
+    mock_get_db.return_value.__enter__.return_value = mock_db
+
+    result = account_helper.resolve_transfer_accounts(
+        Account(agency="123", account="456"), Account(agency="123", account="789")
+    )
+
+    assert result.origin == sample_account
+    assert result.destination == sample_destination
+
+
+@patch("app.helpers.account_helper.get_db")
+def test_resolve_transfer_accounts_missing_destination(mock_get_db, account_helper):
+    mock_db = MagicMock()
+    mock_db.query.return_value.options.return_value.filter.return_value.all.return_value = [
+        sample_account
+    ]
+    mock_get_db.return_value.__enter__.return_value = mock_db
+
+    result = account_helper.resolve_transfer_accounts(
+        Account(agency="123", account="456"), Account(agency="123", account="789")
+    )
+
+    assert result.origin == sample_account
+    assert result.destination is None
+
+
+@patch("app.helpers.account_helper.get_db")
+def test_iter_statement_streams_after_cursor(mock_get_db, account_helper):
+    mock_db = MagicMock()
+    mock_db.execute.return_value = iter(["row"])
+    mock_get_db.return_value.__enter__.return_value = mock_db
+    cursor = StatementCursor(created_at=datetime(2025, 1, 1), id="abc")
+
+    rows = list(account_helper.iter_statement(sample_account, 11, cursor, fetch_size=11))
+
+    statement = mock_db.execute.call_args.args[0]
+    assert rows == ["row"]
+    assert statement.get_execution_options()["stream_results"] is True
+    assert statement.get_execution_options()["yield_per"] == 11
+    assert "OFFSET" not in str(statement)
+    assert str(statement).count("(transaction.created_at, transaction.id) <") == 2
+
+
+def test_statement_cursor_round_trip():
+    cursor = StatementCursor(created_at=datetime(2025, 1, 1, 10, 30), id="abc")
+
+    assert StatementCursor.decode(cursor.encode()) == cursor
+    with pytest.raises(ValueError):
+        StatementCursor.decode("not-a-cursor")
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
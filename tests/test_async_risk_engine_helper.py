@@ -0,0 +1,185 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.constants import ChannelEnum
+from app.core.rules import compile_rule
+from app.helpers.async_risk_engine_helper import AsyncRiskEvaluator, degraded_metrics
+from app.helpers.history_store_helper import history_store, load_pair
+
+sample_transaction = SimpleNamespace(
+    id="sample",
+    amount=15000,
+    channel=ChannelEnum.IBK,
+    created_at=datetime(2025, 1, 1, 12, 0, 0),
+    origin_account_rel=SimpleNamespace(id=1, customer_rel=SimpleNamespace(age=30)),
+    destination_account_rel=SimpleNamespace(id=2),
+)
+
+frequency_rule = compile_rule(
+    "not_frequent",
+    [
+        {
+            "filter": {
+                "and": [
+                    {
+                        "field": "",
+                        "transform": "!destination_account_frequency",
+                        "op": "lte",
+                        "value": 2,
+                    },
+                    {"field": "amount", "op": "gte", "value": 10000},
+                ]
+            }
+        }
+    ],
+)
+velocity_rule = compile_rule(
+    "velocity",
+    [
+        {
+            "filter": {
+                "field": "",
+                "transform": "!count_same_trx_by_channel_user_in_last_in_period",
+                "params": {"channel": ["IBK"], "interval_minutes": 10},
+                "op": "gte",
+                "value": 3,
+            }
+        }
+    ],
+)
+
+
+@pytest.fixture
+def evaluator():
+    risk_evaluator = AsyncRiskEvaluator()
+    risk_evaluator.transaction_helper = MagicMock()
+    risk_evaluator.frequency_helper = MagicMock()
+    risk_evaluator.async_transaction_helper = AsyncMock()
+    risk_evaluator.async_frequency_helper = AsyncMock()
+    return risk_evaluator
+
+
+def test_prefetch_collects_rule_transforms(evaluator):
+    evaluator.async_frequency_helper.get_frequency.return_value = 1
+    evaluator.async_transaction_helper.get_recent_transactions.return_value = [
+        (1, 2, ChannelEnum.IBK.value, Decimal("10"), datetime.now())
+    ] * 4
+
+    prefetched = asyncio.run(
+        evaluator.prefetch(sample_transaction, (frequency_rule, velocity_rule))
+    )
+
+    assert sorted(prefetched.values()) == [1, 4]
+    evaluator.async_transaction_helper.count_transaction_by_user_channel.assert_not_called()
+
+
+@patch("app.helpers.async_risk_engine_helper.rule_cache")
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_calculate_risk_async_does_not_use_sync_helpers(
+    mock_rule_cache, mock_async_rule_cache, evaluator
+):
+    mock_rule_cache.get_rules.return_value = (frequency_rule,)
+    mock_async_rule_cache.get_rules_async = AsyncMock(return_value=(frequency_rule,))
+    evaluator.async_frequency_helper.get_frequency.return_value = 0
+
+    assert asyncio.run(evaluator.calculate_risk_async(sample_transaction)) is True
+    evaluator.frequency_helper.get_frequency.assert_not_called()
+
+
+def test_prefetch_runs_lookups_concurrently(evaluator):
+    history_store.clear()
+    frequency_started = asyncio.Event()
+    history_started = asyncio.Event()
+
+    async def get_frequency(*_):
+        frequency_started.set()
+        await history_started.wait()
+        return 1
+
+    async def get_recent_transactions(*_, **__):
+        history_started.set()
+        await frequency_started.wait()
+        return []
+
+    evaluator.async_frequency_helper.get_frequency.side_effect = get_frequency
+    evaluator.async_transaction_helper.get_recent_transactions.side_effect = (
+        get_recent_transactions
+    )
+
+    prefetched = asyncio.run(
+        asyncio.wait_for(
+            evaluator.prefetch(sample_transaction, (frequency_rule, velocity_rule)),
+            timeout=1,
+        )
+    )
+
+    assert sorted(prefetched.values()) == [0, 1]
+
+
+async def never_returns(*_):
+    await asyncio.Event().wait()
+
+
+@patch("app.helpers.async_risk_engine_helper.rule_cache")
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_decide_skips_transforms_past_budget(
+    mock_rule_cache, mock_async_rule_cache, evaluator
+):
+    history_store.clear()
+    mock_rule_cache.get_rules.return_value = (frequency_rule,)
+    mock_async_rule_cache.get_rules_async = AsyncMock(return_value=(frequency_rule,))
+    evaluator.latency_budget = 0.05
+    evaluator.async_frequency_helper.get_frequency.side_effect = never_returns
+    degraded = degraded_metrics.snapshot()["degraded"]
+
+    decision = asyncio.run(evaluator.decide_async(sample_transaction))
+
+    assert decision.suspect is False
+    assert decision.degraded_rules == ("not_frequent",)
+    assert degraded_metrics.snapshot()["degraded"] == degraded + 1
+    evaluator.frequency_helper.get_frequency.assert_not_called()
+
+
+@patch("app.helpers.async_risk_engine_helper.rule_cache")
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_decide_approximates_from_history_past_budget(
+    mock_rule_cache, mock_async_rule_cache, evaluator
+):
+    history_store.clear()
+    load_pair(1, 2, [(1, 2, ChannelEnum.IBK.value, Decimal("10"), datetime.now())])
+    mock_rule_cache.get_rules.return_value = (frequency_rule,)
+    mock_async_rule_cache.get_rules_async = AsyncMock(return_value=(frequency_rule,))
+    evaluator.latency_budget = 0.05
+    evaluator.async_frequency_helper.get_frequency.side_effect = never_returns
+
+    decision = asyncio.run(evaluator.decide_async(sample_transaction))
+
+    assert decision.suspect is True
+    assert decision.degraded_rules == ("not_frequent",)
+    history_store.clear()
+
+
+@patch("app.helpers.async_risk_engine_helper.rule_cache")
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_decide_evaluates_the_rules_it_prefetched(
+    mock_rule_cache, mock_async_rule_cache, evaluator
+):
+    # The rule set is refreshed after the prefetch read it
+    mock_async_rule_cache.get_rules_async = AsyncMock(return_value=(frequency_rule,))
+    mock_rule_cache.get_rules.return_value = ()
+    evaluator.async_frequency_helper.get_frequency.return_value = 1
+
+    decision = asyncio.run(evaluator.decide_async(sample_transaction))
+
+    assert decision.suspect is True
+    mock_rule_cache.get_rules.assert_not_called()
+    mock_async_rule_cache.get_rules_async.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.helpers.backtest_helper import BacktestHelper, BacktestResult, replay_partition
+from app.models.tables.account_model import Account
+from app.models.tables.customer_model import Customer
+from app.models.tables.transaction_model import Transaction
+
+RULES = {
+    "velocity": [
+        {
+            "filter": {
+                "field": "",
+                "transform": "!count_same_trx_by_channel_user_in_last_in_period",
+                "params": {"channel": ["IBK"], "interval_minutes": 10},
+                "op": "gte",
+                "value": 1,
+            }
+        }
+    ],
+    "big": [{"filter": {"field": "amount", "op": "gte", "value": 1000}}],
+}
+START = datetime(2024, 1, 1)
+account = Account(id=1, customer_rel=Customer(id=1, name="x", age=30))
+
+
+def make_transaction(transaction_id, created_at, amount="100.00", suspect=False):
+    return Transaction(
+        id=transaction_id,
+        created_at=created_at,
+        amount=Decimal(amount),
+        channel=2,
+        suspect=suspect,
+        origin_account_id=1,
+        destination_account_id=2,
+        origin_account_rel=account,
+        destination_account_rel=account,
+    )
+
+
+@patch("app.helpers.backtest_helper.get_db")
+def test_replay_partition_counts_hits_and_diff(mock_get_db):
+    mock_db = MagicMock()
+    mock_get_db.return_value.__enter__.return_value = mock_db
+    mock_db.scalars.return_value = [
+        # Before the range: history only.
+        make_transaction("warmup", START - timedelta(minutes=5), amount="5000"),
+        make_transaction("a", START + timedelta(minutes=1), suspect=True),
+        make_transaction("b", START + timedelta(hours=1), amount="5000"),
+        make_transaction("c", START + timedelta(hours=2), suspect=True),
+    ]
+
+    result = replay_partition(RULES, START, START + timedelta(days=1), (1, 100))
+
+    assert result.evaluated == 3
+    assert result.rule_hits == {"velocity": 1, "big": 1}
+    assert (result.flagged, result.stored_suspect) == (2, 2)
+    assert result.newly_flagged_ids == ["b"]
+    assert result.cleared_ids == ["c"]
+
+
+@patch("app.helpers.backtest_helper.get_db")
+def test_replay_partition_error(mock_get_db):
+    mock_db = MagicMock()
+    mock_get_db.return_value.__enter__.return_value = mock_db
+    mock_db.scalars.side_effect = SQLAlchemyError("DB error")
+
+    with pytest.raises(SQLAlchemyError):
+        replay_partition(RULES, START, START + timedelta(days=1), (1, 100))
+    mock_db.rollback.assert_called_once()
+
+
+def test_merge_keeps_counts_and_caps_samples():
+    result = BacktestResult(evaluated=2, newly_flagged=2, newly_flagged_ids=["a", "b"])
+    result.rule_hits.update({"big": 1})
+    other = BacktestResult(evaluated=3, newly_flagged=1, newly_flagged_ids=["c"])
+    other.rule_hits.update({"big": 2, "velocity": 1})
+
+    result.merge(other, sample_size=2)
+
+    assert (result.evaluated, result.newly_flagged) == (5, 3)
+    assert result.rule_hits == {"big": 3, "velocity": 1}
+    assert result.newly_flagged_ids == ["a", "b"]
+
+
+@patch("app.helpers.backtest_helper.replay_partition")
+@patch.object(BacktestHelper, "partitions", return_value=[(1, 10), (11, 20)])
+def test_run_in_process_merges_partitions(mock_partitions, mock_replay):
+    mock_replay.side_effect = lambda *args, **kwargs: BacktestResult(evaluated=1)
+
+    result = BacktestHelper().run(RULES, START, START + timedelta(days=1), workers=1)
+
+    assert result.evaluated == 2
+    assert [call.args[3] for call in mock_replay.call_args_list] == [(1, 10), (11, 20)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,90 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.helpers.balance_helper import BalanceHelper, balance_deltas, balance_upsert
+from app.models.tables.transaction_model import Transaction
+
+
+def test_balance_deltas_debits_origin_and_credits_destination():
+    deltas = balance_deltas(
+        [
+            Transaction(origin_account_id=1, destination_account_id=2, amount=100),
+            {
+                "origin_account_id": 2,
+                "destination_account_id": 3,
+                "amount": Decimal("30.50"),
+            },
+        ]
+    )
+    assert deltas == {1: Decimal("-100"), 2: Decimal("69.50"), 3: Decimal("30.50")}
+
+
+def test_balance_upsert_adds_to_stored_balance_in_account_order():
+    statement = balance_upsert({3: Decimal("1"), 1: Decimal("-1")})
+    compiled = statement.compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+
+    assert "ON CONFLICT (account_id) DO UPDATE" in sql
+    assert "balance = (account_balance.balance + excluded.balance)" in sql
+    ids = [
+        value for key, value in compiled.params.items() if key.startswith("account_id")
+    ]
+    assert ids == [1, 3]
+
+
+@patch("app.helpers.balance_helper.get_db")
+def test_reconcile_reports_drift(mock_get_db):
+    mock_db = MagicMock()
+    mock_get_db.return_value.__enter__.return_value = mock_db
+    mock_db.execute.return_value = [
+        SimpleNamespace(account_id=1, stored=Decimal("10"), ledger=Decimal("12"))
+    ]
+
+    drift = BalanceHelper().reconcile()
+
+    assert drift == [
+        {
+            "account_id": 1,
+            "stored": Decimal("10"),
+            "ledger": Decimal("12"),
+            "drift": Decimal("2"),
+        }
+    ]
+    mock_db.connection.assert_called_once_with(
+        execution_options={"isolation_level": "REPEATABLE READ"}
+    )
+    assert mock_db.execute.call_count == 1
+
+
+@patch("app.helpers.balance_helper.get_db")
+def test_reconcile_fixes_drift(mock_get_db):
+    mock_db = MagicMock()
+    mock_get_db.return_value.__enter__.return_value = mock_db
+    mock_db.execute.return_value = [
+        SimpleNamespace(account_id=1, stored=Decimal("10"), ledger=Decimal("12"))
+    ]
+
+    BalanceHelper().reconcile(fix=True)
+
+    assert mock_db.execute.call_count == 2
+    assert mock_db.commit.call_count == 2
+
+
+@patch("app.helpers.balance_helper.get_db")
+def test_reconcile_error(mock_get_db):
+    mock_db = MagicMock()
+    mock_get_db.return_value.__enter__.return_value = mock_db
+    mock_db.execute.side_effect = SQLAlchemyError("DB error")
+
+    with pytest.raises(SQLAlchemyError):
+        BalanceHelper().reconcile()
+    mock_db.rollback.assert_called_once()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
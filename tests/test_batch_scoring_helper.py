@@ -0,0 +1,151 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.constants import ChannelEnum
+from app.core.rules import compile_rule
+from app.helpers.batch_scoring_helper import BatchScoringHelper
+from app.schemas.transaction_schemas import PutTransactionRequest
+
+velocity_rule = compile_rule(
+    "velocity",
+    [
+        {
+            "filter": {
+                "field": "",
+                "transform": "!count_same_trx_by_channel_user_in_last_in_period",
+                "params": {"channel": ["IBK"], "interval_minutes": 10},
+                "op": "gte",
+                "value": 2,
+            }
+        }
+    ],
+)
+frequency_rule = compile_rule(
+    "not_frequent",
+    [
+        {
+            "filter": {
+                "field": "",
+                "transform": "!destination_account_frequency",
+                "op": "eq",
+                "value": 0,
+            }
+        }
+    ],
+)
+
+origin_account = SimpleNamespace(
+    id=1, agency=1, account=10, customer_rel=SimpleNamespace(age=30)
+)
+destination_account = SimpleNamespace(
+    id=2, agency=2, account=20, customer_rel=SimpleNamespace(age=40)
+)
+
+
+def make_item(transaction_id, **overrides):
+    data = {
+        "id_da_transacao": transaction_id,
+        "data_e_hora_da_transacao": datetime.now(),
+        "valor_da_transacao": Decimal("100.00"),
+        "agencia_de_origem": 1,
+        "conta_de_origem": 10,
+        "agencia_de_destino": 2,
+        "conta_de_destino": 20,
+        "canal": "INTERNET_BANKING",
+    }
+    data.update(overrides)
+    return PutTransactionRequest(**data)
+
+
+@pytest.fixture
+def helper():
+    batch_helper = BatchScoringHelper()
+    batch_helper.account_helper = AsyncMock()
+    batch_helper.transaction_helper = AsyncMock()
+    batch_helper.frequency_helper = AsyncMock()
+    batch_helper.account_helper.get_accounts_by_numbers.return_value = {
+        (1, 10): origin_account,
+        (2, 20): destination_account,
+    }
+    batch_helper.transaction_helper.get_existing_ids.return_value = set()
+    batch_helper.transaction_helper.get_recent_transactions.return_value = []
+    batch_helper.transaction_helper.insert_many.side_effect = lambda rows: {
+        row["id"] for row in rows
+    }
+    batch_helper.frequency_helper.get_frequencies.return_value = Counter()
+    return batch_helper
+
+
+@patch("app.helpers.batch_scoring_helper.rule_cache")
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_score_uses_earlier_items_as_history(
+    mock_rule_cache, mock_batch_rule_cache, helper
+):
+    mock_rule_cache.get_rules.return_value = (velocity_rule,)
+    mock_batch_rule_cache.get_rules_async = AsyncMock(return_value=(velocity_rule,))
+    helper.transaction_helper.get_recent_transactions.return_value = [
+        (1, 2, ChannelEnum.IBK.value, Decimal("100.00"), datetime.now())
+    ]
+
+    results = asyncio.run(helper.score([make_item("a"), make_item("b")]))
+
+    assert [result.suspect for result in results] == [False, True]
+    helper.transaction_helper.get_recent_transactions.assert_awaited_once()
+    helper.transaction_helper.insert_many.assert_awaited_once()
+    helper.frequency_helper.increment_many.assert_awaited_once_with(Counter({(1, 2): 2}))
+
+
+@patch("app.helpers.batch_scoring_helper.rule_cache")
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_score_counts_known_destinations(
+    mock_rule_cache, mock_batch_rule_cache, helper
+):
+    mock_rule_cache.get_rules.return_value = (frequency_rule,)
+    mock_batch_rule_cache.get_rules_async = AsyncMock(return_value=(frequency_rule,))
+
+    results = asyncio.run(helper.score([make_item("a"), make_item("b")]))
+
+    assert [result.suspect for result in results] == [True, False]
+    helper.transaction_helper.get_recent_transactions.assert_not_awaited()
+
+
+@patch("app.helpers.batch_scoring_helper.rule_cache")
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_score_rejects_invalid_items(mock_rule_cache, mock_batch_rule_cache, helper):
+    mock_rule_cache.get_rules.return_value = ()
+    mock_batch_rule_cache.get_rules_async = AsyncMock(return_value=())
+    helper.transaction_helper.get_existing_ids.return_value = {"stored"}
+
+    results = asyncio.run(
+        helper.score(
+            [
+                make_item("ok"),
+                make_item("ok"),
+                make_item("same", agencia_de_destino=1, conta_de_destino=10),
+                make_item("missing", conta_de_destino=99),
+                make_item("channel", canal=9),
+                make_item("stored"),
+            ]
+        )
+    )
+
+    assert results[0].suspect is False and results[0].error is None
+    assert [result.error for result in results[1:]] == [
+        "Duplicate transaction id in batch",
+        "Origin and destination accounts cannot be the same",
+        "Destination account not found",
+        "Invalid channel code",
+        "Transaction already exists",
+    ]
+    rows = helper.transaction_helper.insert_many.await_args.args[0]
+    assert [row["id"] for row in rows] == ["ok"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,156 @@
+import io
+from collections import Counter
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.rules import compile_rule
+from app.helpers.bulk_load_helper import (
+    COPY_STAGE,
+    MERGE_STAGE,
+    BulkLoadHelper,
+    read_csv,
+    read_ndjson,
+)
+from app.helpers.offline_scoring_helper import PointInTimeScorer
+from app.models.tables.account_model import Account
+from app.models.tables.customer_model import Customer
+
+velocity_rule = compile_rule(
+    "velocity",
+    [
+        {
+            "filter": {
+                "field": "",
+                "transform": "!count_same_trx_by_channel_user_in_last_in_period",
+                "params": {"channel": ["IBK"], "interval_minutes": 10},
+                "op": "gte",
+                "value": 1,
+            }
+        }
+    ],
+)
+record = {
+    "id_da_transacao": "trx",
+    "data_e_hora_da_transacao": "2024-01-01T12:00:00",
+    "valor_da_transacao": "100.00",
+    "canal": "2",
+    "agencia_de_origem": "1",
+    "conta_de_origem": "10",
+    "agencia_de_destino": "2",
+    "conta_de_destino": "20",
+}
+
+
+@pytest.fixture
+def helper():
+    bulk_helper = BulkLoadHelper(batch_size=2, score=True)
+    bulk_helper.frequency_helper = MagicMock()
+    bulk_helper.accounts = {(1, 10): 1, (2, 20): 2}
+    bulk_helper.accounts_by_id = {
+        account_id: Account(
+            id=account_id, customer_rel=Customer(id=account_id, name="x", age=30)
+        )
+        for account_id in (1, 2)
+    }
+    return bulk_helper
+
+
+def row(transaction_id, created_at, channel=2):
+    return {
+        "id": transaction_id,
+        "created_at": created_at,
+        "amount": Decimal("100.00"),
+        "channel": channel,
+        "suspect": False,
+        "origin_account_id": 1,
+        "destination_account_id": 2,
+    }
+
+
+def test_readers_parse_csv_and_ndjson():
+    csv_input = io.StringIO("id_da_transacao,canal,conta_de_origem\na,2,\n")
+    ndjson_input = io.StringIO('{"id_da_transacao": "a"}\n\nnot json\n[1]\n')
+
+    assert list(read_csv(csv_input)) == [({"id_da_transacao": "a", "canal": "2"}, "")]
+    assert list(read_ndjson(ndjson_input)) == [
+        ({"id_da_transacao": "a"}, ""),
+        (None, "Invalid JSON"),
+        (None, "Invalid JSON"),
+    ]
+
+
+def test_to_row_resolves_accounts(helper):
+    loaded, error = helper._to_row(record, "")
+
+    assert error == ""
+    assert loaded == row("trx", datetime(2024, 1, 1, 12, 0))
+
+
+@pytest.mark.parametrize(
+    "overrides, expected",
+    [
+        ({"valor_da_transacao": "abc"}, "Invalid fields: valor_da_transacao"),
+        ({"valor_da_transacao": "-1"}, "Transaction amount must be greater than zero"),
+        ({"canal": "9"}, "Invalid channel code"),
+        ({"conta_de_origem": "99"}, "Origin account not found"),
+        ({"conta_de_destino": "99"}, "Destination account not found"),
+        (
+            {"agencia_de_destino": "1", "conta_de_destino": "10"},
+            "Origin and destination accounts cannot be the same",
+        ),
+    ],
+)
+def test_to_row_rejects_invalid_records(helper, overrides, expected):
+    assert helper._to_row({**record, **overrides}, "") == (None, expected)
+
+
+def test_score_uses_earlier_loaded_transactions(helper):
+    helper.scorer = PointInTimeScorer((velocity_rule,))
+    start = datetime(2024, 1, 1, 12, 0)
+
+    results = helper.scorer.score_many(
+        [
+            helper._transaction(row("a", start)),
+            helper._transaction(row("b", start + timedelta(minutes=5))),
+            helper._transaction(row("c", start + timedelta(minutes=30))),
+        ]
+    )
+
+    assert results == [False, True, False]
+
+
+@patch("app.helpers.bulk_load_helper.rule_cache")
+@patch("app.helpers.bulk_load_helper.engine")
+def test_load_copies_batches_and_counts_recent_days(
+    mock_engine, mock_rule_cache, helper
+):
+    mock_rule_cache.get_rules.return_value = ()
+    helper.score = False
+    connection = mock_engine.raw_connection.return_value
+    cursor = connection.cursor.return_value
+    today = date.today()
+    cursor.fetchall.side_effect = [
+        [(1, 2, today, 1), (1, 2, date(2000, 1, 1), 1)],
+        [],
+    ]
+
+    stats = helper.load(
+        [(record, ""), (record, ""), (record, ""), (None, "Invalid JSON")]
+    )
+
+    assert cursor.copy_expert.call_count == 2
+    assert cursor.copy_expert.call_args.args[0] == COPY_STAGE
+    cursor.execute.assert_called_with(MERGE_STAGE)
+    assert (stats.read, stats.loaded, stats.duplicates) == (4, 2, 1)
+    assert stats.rejected == Counter({"Invalid JSON": 1})
+    helper.frequency_helper.increment_many.assert_called_once_with(
+        Counter({(1, 2): 1}), datetime.combine(today, datetime.max.time())
+    )
+    connection.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
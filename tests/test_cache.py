@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.core.cache import TTLCache
+
+
+def test_get_and_set():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+@patch("app.core.cache.time.monotonic")
+def test_entries_expire(mock_monotonic):
+    cache = TTLCache(maxsize=2, ttl=10)
+    mock_monotonic.return_value = 100
+    cache.set("a", 1)
+
+    mock_monotonic.return_value = 111
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidate_where():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", {"customer_id": 1})
+    cache.set("b", {"customer_id": 2})
+
+    removed = cache.invalidate_where(lambda _, value: value["customer_id"] == 1)
+
+    assert removed == 1
+    assert cache.get("a") is None
+    assert cache.get("b") == {"customer_id": 2}
+
+
+def test_disabled_cache():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,67 @@
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.helpers.destination_frequency_helper import (
+    DestinationFrequencyHelper,
+    count_recent,
+    increment_update,
+)
+
+NOW = datetime(2025, 3, 31, 12, 0, 0)
+
+
+def test_increment_update_targets_today_bucket():
+    update = increment_update(2, NOW)
+
+    assert update["$inc"] == {"days.20250331": 2}
+    assert update["$max"]["expires_at"] == datetime(2025, 4, 30, 12, 0, 0)
+
+
+def test_count_recent_ignores_expired_buckets():
+    total, stale = count_recent({"20250331": 2, "20250302": 1, "20250301": 5}, NOW)
+
+    # 30 daily buckets, today's included
+    assert total == 3
+    assert stale == ["20250301"]
+
+
+@pytest.fixture
+def collection():
+    with patch("app.helpers.destination_frequency_helper.mongo_connection"), patch(
+        "app.helpers.destination_frequency_helper.DestinationFrequency"
+    ) as mock_model:
+        mock_collection = MagicMock()
+        mock_model._get_collection.return_value = mock_collection
+        yield mock_collection
+
+
+def test_get_frequency_is_a_point_read(collection):
+    collection.find_one.return_value = {"_id": 1, "days": {"20000101": 4}}
+
+    assert DestinationFrequencyHelper().get_frequency(1, 2) == 0
+    collection.find_one.assert_called_once_with(
+        {"origin_user": 1, "destination_user": 2}, {"days": 1}
+    )
+    collection.update_one.assert_called_once_with(
+        {"_id": 1}, {"$unset": {"days.20000101": ""}}
+    )
+
+
+def test_get_frequency_missing_pair(collection):
+    collection.find_one.return_value = None
+
+    assert DestinationFrequencyHelper().get_frequency(1, 2) == 0
+
+
+def test_increment_upserts(collection):
+    DestinationFrequencyHelper().increment(1, 2)
+
+    args, kwargs = collection.update_one.call_args
+    assert args[0] == {"origin_user": 1, "destination_user": 2}
+    assert kwargs == {"upsert": True}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,149 @@
+import asyncio
+from collections import Counter
+from unittest.mock import AsyncMock
+
+import pytest
+from pymongo.errors import (
+    BulkWriteError,
+    NetworkTimeout,
+    PyMongoError,
+    ServerSelectionTimeoutError,
+)
+
+from app.helpers.async_frequency_buffer_helper import FrequencyWriteBuffer
+
+
+def buffer_with(
+    mode="buffered", flush_interval=60, max_pairs=1000, max_retry_pairs=1000
+):
+    buffer = FrequencyWriteBuffer(mode, flush_interval, max_pairs, max_retry_pairs)
+    buffer.frequency_helper = AsyncMock()
+    return buffer
+
+
+def test_buffer_coalesces_pairs_into_one_bulk_write():
+    buffer = buffer_with()
+
+    async def run():
+        buffer.start()
+        for pair in [(1, 2), (1, 2), (3, 4), (1, 2)]:
+            await buffer.record(*pair)
+        pending = buffer.pending((1, 2))
+        buffer.frequency_helper.increment_many.assert_not_awaited()
+        await buffer.stop()
+        return pending
+
+    assert asyncio.run(run()) == 3
+    buffer.frequency_helper.increment.assert_not_awaited()
+    buffer.frequency_helper.increment_many.assert_awaited_once_with(
+        Counter({(1, 2): 3, (3, 4): 1})
+    )
+    assert buffer.pending((1, 2)) == 0
+
+
+def test_buffer_flushes_when_max_pairs_are_pending():
+    buffer = buffer_with(max_pairs=2)
+
+    async def run():
+        buffer.start()
+        await buffer.record(1, 2)
+        await buffer.record(3, 4)
+        await asyncio.sleep(0.05)
+        flushed = buffer.frequency_helper.increment_many.await_count
+        await buffer.stop()
+        return flushed
+
+    assert asyncio.run(run()) == 1
+
+
+def test_failed_updates_of_a_bulk_write_are_retried():
+    buffer = buffer_with(flush_interval=0.01)
+    partial_failure = BulkWriteError(
+        {"writeErrors": [{"index": 1, "code": 2, "errmsg": "failed"}]}
+    )
+    buffer.frequency_helper.increment_many.side_effect = [partial_failure, None]
+
+    async def run():
+        buffer.start()
+        await buffer.record(1, 2)
+        await buffer.record(3, 4)
+        await buffer.record(3, 4)
+        await asyncio.sleep(0.1)
+        await buffer.stop()
+
+    asyncio.run(run())
+    calls = buffer.frequency_helper.increment_many.await_args_list
+    assert [call.args[0] for call in calls] == [
+        Counter({(1, 2): 1, (3, 4): 2}),
+        Counter({(3, 4): 2}),
+    ]
+
+
+@pytest.mark.parametrize("error", [PyMongoError("failed"), NetworkTimeout("slow")])
+def test_write_that_may_have_been_applied_is_not_retried(error):
+    buffer = buffer_with(flush_interval=0.01)
+    buffer.frequency_helper.increment_many.side_effect = [error, None]
+
+    async def run():
+        buffer.start()
+        await buffer.record(1, 2)
+        await asyncio.sleep(0.1)
+        await buffer.stop()
+
+    asyncio.run(run())
+    buffer.frequency_helper.increment_many.assert_awaited_once_with(
+        Counter({(1, 2): 1})
+    )
+    assert buffer.pending((1, 2)) == 0
+
+
+def test_write_without_a_server_is_retried_up_to_max_retry_pairs():
+    buffer = buffer_with(flush_interval=0.01, max_retry_pairs=1)
+    buffer.frequency_helper.increment_many.side_effect = [
+        ServerSelectionTimeoutError("no primary"),
+        None,
+    ]
+
+    async def run():
+        buffer.start()
+        await buffer.record(1, 2)
+        await buffer.record(1, 2)
+        await buffer.record(3, 4)
+        await asyncio.sleep(0.1)
+        await buffer.stop()
+
+    asyncio.run(run())
+    calls = buffer.frequency_helper.increment_many.await_args_list
+    assert [call.args[0] for call in calls] == [
+        Counter({(1, 2): 2, (3, 4): 1}),
+        Counter({(1, 2): 2}),
+    ]
+
+
+def test_fire_and_forget_discards_pending_on_stop():
+    buffer = buffer_with("fire_and_forget")
+
+    async def run():
+        buffer.start()
+        await buffer.record(1, 2)
+        await buffer.stop()
+
+    asyncio.run(run())
+    buffer.frequency_helper.increment_many.assert_not_awaited()
+
+
+def test_sync_mode_writes_before_returning():
+    buffer = buffer_with("sync")
+
+    async def run():
+        buffer.start()
+        await buffer.record(1, 2)
+        await buffer.stop()
+
+    asyncio.run(run())
+    buffer.frequency_helper.increment.assert_awaited_once_with(1, 2)
+    buffer.frequency_helper.increment_many.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
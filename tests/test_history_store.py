@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.core.history_store import TransactionHistoryStore
+
+PAIR = (1, 2)
+
+
+def minutes_ago(minutes):
+    return datetime.now() - timedelta(minutes=minutes)
+
+
+def test_queries_need_a_warm_pair():
+    store = TransactionHistoryStore(max_window_minutes=60, max_pairs=10, ttl=60)
+
+    assert store.count(PAIR, [2], 10) is None
+    store.record(PAIR, 2, 100, minutes_ago(1))
+    store.load(PAIR, [])
+
+    assert store.count(PAIR, [2], 10) == 0
+    assert store.stats()["misses"] == 1
+
+
+def test_window_and_channel_filters():
+    store = TransactionHistoryStore(max_window_minutes=60, max_pairs=10, ttl=60)
+    store.load(PAIR, [(2, 100, minutes_ago(30)), (2, 50, minutes_ago(5))])
+    store.record(PAIR, 3, 70, minutes_ago(2))
+    store.record(PAIR, 2, 10, minutes_ago(90))
+
+    assert store.count(PAIR, [2], 10) == 1
+    assert store.count(PAIR, [2, 3], 10) == 2
+    assert store.total(PAIR, [2, 3], 60) == 220
+    assert store.stats()["transactions"] == 3
+
+
+def test_count_similar_uses_median_band():
+    store = TransactionHistoryStore(max_window_minutes=60, max_pairs=10, ttl=60)
+    store.load(
+        PAIR,
+        [(2, 100, minutes_ago(3)), (2, 100, minutes_ago(2)), (3, 110, minutes_ago(1))],
+    )
+    store.record(PAIR, 2, 1000, minutes_ago(1))
+
+    assert store.count_similar(PAIR, [2, 3], 10, 0.2) == 3
+    assert store.count_similar(PAIR, [2, 3], 10) == 4
+
+
+def test_wider_window_is_not_covered():
+    store = TransactionHistoryStore(max_window_minutes=60, max_pairs=10, ttl=60)
+    store.load(PAIR, [])
+
+    assert store.count(PAIR, [2], 61) is None
+    assert TransactionHistoryStore(60, 0, 60).covers(10) is False
+
+
+def test_pairs_expire_and_are_evicted():
+    store = TransactionHistoryStore(max_window_minutes=60, max_pairs=1, ttl=60)
+    store.load(PAIR, [])
+    store.load((1, 3), [])
+
+    assert store.is_warm(PAIR) is False
+    with patch("app.core.history_store.time.monotonic", return_value=10**9):
+        assert store.is_warm((1, 3)) is False
+    assert store.stats()["evictions"] == 1
+    assert store.stats()["expirations"] == 1
+
+
+def test_transactions_recorded_while_loading_are_merged():
+    store = TransactionHistoryStore(max_window_minutes=60, max_pairs=10, ttl=60)
+    with store.loading(PAIR):
+        # Read before the transaction 2 commit, recorded before the load ends
+        rows = [(2, 100, minutes_ago(5), 1)]
+        store.record(PAIR, 2, 50, minutes_ago(1), 2)
+        store.load(PAIR, rows)
+    store.record(PAIR, 2, 10, minutes_ago(0), 3)
+
+    assert store.count(PAIR, [2], 10) == 3
+    assert store.total(PAIR, [2], 10) == 160
+
+
+def test_concurrent_loads_do_not_count_transactions_twice():
+    store = TransactionHistoryStore(max_window_minutes=60, max_pairs=10, ttl=60)
+    first = [(2, 100, minutes_ago(5), 1)]
+    second = [(2, 100, minutes_ago(5), 1), (2, 50, minutes_ago(1), 2)]
+    with store.loading(PAIR), store.loading(PAIR):
+        store.record(PAIR, 2, 50, minutes_ago(1), 2)
+        store.load(PAIR, second)
+        store.load(PAIR, first)
+
+    assert store.count(PAIR, [2], 10) == 2
+    assert store.total(PAIR, [2], 10) == 150
+    assert store.stats()["transactions"] == 2
+
+
+def test_late_transactions_keep_running_totals():
+    store = TransactionHistoryStore(max_window_minutes=60, max_pairs=10, ttl=60)
+    store.load(PAIR, [(2, 100, minutes_ago(30)), (2, 50, minutes_ago(5))])
+    store.record(PAIR, 2, 20, minutes_ago(20))
+    store.record(PAIR, 2, 7, minutes_ago(1))
+
+    assert store.count(PAIR, [2], 25) == 3
+    assert store.total(PAIR, [2], 25) == 77
+    assert store.total(PAIR, [2], 60) == 177
+
+
+def test_median_band_follows_the_sliding_window():
+    store = TransactionHistoryStore(max_window_minutes=60, max_pairs=10, ttl=60)
+    store.load(PAIR, [(2, 100, minutes_ago(8)), (2, 100, minutes_ago(7))])
+    assert store.count_similar(PAIR, [2], 10, 0.2) == 2
+
+    store.record(PAIR, 2, 1000, minutes_ago(1))
+    store.record(PAIR, 3, 1000, minutes_ago(1))
+    assert store.count_similar(PAIR, [2], 10, 0.2) == 2
+    assert store.count_similar(PAIR, [2], 5, 0.2) == 1
+
+    # Four minutes later, the transactions of 100 are out of the 10 minutes
+    with patch("app.core.history_store.datetime", wraps=datetime) as mock_datetime:
+        mock_datetime.now.return_value = datetime.now() + timedelta(minutes=4)
+        assert store.count_similar(PAIR, [2], 10, 0.2) == 1
+        assert store.count_similar(PAIR, [2, 3], 10, 0.2) == 2
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,75 @@
+import io
+import json
+import logging
+import queue
+from unittest.mock import patch
+
+import pytest
+
+from app.core.logger import NonBlockingQueueHandler, SamplingFilter, configure_logging
+
+
+@pytest.fixture
+def prod_output():
+    output = io.StringIO()
+    with patch("sys.stdout", output):
+        handler = configure_logging("prod", "INFO", 1.0, 100)
+    yield handler, output
+    configure_logging("dev")
+
+
+def test_prod_mode_writes_json_lines(prod_output):
+    handler, output = prod_output
+    logger = logging.getLogger("app.test")
+
+    logger.info("Transaction matched rule %s", "large_amount")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.error("Unexpected error", exc_info=True)
+    handler.close()
+
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == [
+        "Transaction matched rule large_amount",
+        "Unexpected error",
+    ]
+    assert lines[0]["level"] == "INFO" and lines[0]["logger"] == "app.test"
+    assert "ValueError: boom" in lines[1]["exception"]
+
+
+def test_configure_logging_keeps_host_handlers(caplog):
+    root_handlers = list(logging.getLogger().handlers)
+
+    handler = configure_logging("dev")
+    logging.getLogger("app.test").warning("Seen by the host")
+
+    assert logging.getLogger().handlers == root_handlers
+    assert "Seen by the host" in caplog.text
+    assert logging.getLogger("rich").handlers == [handler]
+    assert logging.getLogger("app").handlers == [handler]
+
+
+def test_queue_handler_drops_records_when_queue_is_full():
+    handler = NonBlockingQueueHandler(queue.Queue(100))
+
+    for index in range(150):
+        handler.handle(
+            logging.LogRecord("app", logging.INFO, __file__, 1, "%s", (index,), None)
+        )
+
+    assert handler.dropped == 50
+    assert handler.queue.get_nowait().getMessage() == "0"
+
+
+def test_sampling_keeps_warnings():
+    sampling = SamplingFilter(0.0)
+    info = logging.LogRecord("app", logging.INFO, __file__, 1, "info", None, None)
+    warning = logging.LogRecord("app", logging.WARNING, __file__, 1, "warn", None, None)
+
+    assert sampling.filter(info) is False
+    assert sampling.filter(warning) is True
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
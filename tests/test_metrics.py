@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.metrics import timed_query
+from app.core.rules import compile_rule
+from app.helpers.async_destination_frequency_helper import (
+    AsyncDestinationFrequencyHelper,
+)
+from app.helpers.risk_engine_helper import RiskEvaluator
+from app.routes.metrics_routes import get_prometheus_metrics
+
+large_amount_rule = compile_rule(
+    "large_amount_metrics",
+    [{"filter": {"field": "amount", "op": "gte", "value": 10000}}],
+)
+
+
+class SampleHelper:
+    @timed_query
+    def query(self):
+        return 1
+
+    @timed_query
+    async def async_query(self):
+        return 2
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_timed_query_observes_sync_and_async_queries():
+    labels = {"helper": "SampleHelper"}
+    before = sample("risk_query_seconds_count", query="query", **labels)
+    async_before = sample("risk_query_seconds_count", query="async_query", **labels)
+
+    assert SampleHelper().query() == 1
+    assert asyncio.run(SampleHelper().async_query()) == 2
+
+    assert sample("risk_query_seconds_count", query="query", **labels) == before + 1
+    assert (
+        sample("risk_query_seconds_count", query="async_query", **labels)
+        == async_before + 1
+    )
+
+
+class EmptyCursor:
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+
+@patch("app.helpers.async_destination_frequency_helper._collection")
+def test_frequency_lookup_is_observed_once(mock_collection):
+    mock_collection.return_value = MagicMock(find=MagicMock(return_value=EmptyCursor()))
+    labels = {"helper": "AsyncDestinationFrequencyHelper"}
+    before = sample("risk_query_seconds_count", query="get_frequencies", **labels)
+
+    assert asyncio.run(AsyncDestinationFrequencyHelper().get_frequency(1, 2)) == 0
+
+    assert (
+        sample("risk_query_seconds_count", query="get_frequencies", **labels)
+        == before + 1
+    )
+    assert not sample("risk_query_seconds_count", query="get_frequency", **labels)
+
+
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_calculate_risk_records_rule_metrics(mock_rule_cache):
+    mock_rule_cache.get_rules.return_value = (large_amount_rule,)
+    rule = large_amount_rule.name
+    evaluations = sample("risk_rule_evaluation_seconds_count", rule=rule)
+    matches = sample("risk_rule_matches_total", rule=rule)
+
+    evaluator = RiskEvaluator()
+    assert evaluator.calculate_risk(SimpleNamespace(amount=20000)) is True
+    assert evaluator.calculate_risk(SimpleNamespace(amount=10)) is False
+
+    assert sample("risk_rule_evaluation_seconds_count", rule=rule) == evaluations + 2
+    assert sample("risk_rule_matches_total", rule=rule) == matches + 1
+
+
+def test_prometheus_endpoint_uses_text_format():
+    response = get_prometheus_metrics()
+
+    assert response.media_type.startswith("text/plain")
+    assert b"risk_rule_evaluation_seconds" in response.body
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.core import mongo_database
+from app.core.mongo_database import PoolMetricsListener
+
+
+def test_pool_metrics_checkout_and_checkin():
+    listener = PoolMetricsListener()
+
+    listener.connection_created(SimpleNamespace())
+    listener.connection_checked_out(SimpleNamespace(duration=0.2))
+    listener.connection_checked_out(SimpleNamespace(duration=0.4))
+    listener.connection_checked_in(SimpleNamespace())
+
+    metrics = listener.snapshot()
+    assert metrics["open_connections"] == 1
+    assert metrics["checked_out"] == 1
+    assert metrics["checkouts"] == 2
+    assert metrics["wait_time_max_seconds"] == 0.4
+    assert metrics["wait_time_avg_seconds"] == pytest.approx(0.3)
+
+
+@patch("app.core.mongo_database.disconnect")
+@patch("app.core.mongo_database.connect")
+def test_init_mongo_connects_once(mock_connect, mock_disconnect):
+    mongo_database.init_mongo()
+    mongo_database.init_mongo()
+    mongo_database.close_mongo()
+
+    mock_connect.assert_called_once()
+    mock_disconnect.assert_called_once()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
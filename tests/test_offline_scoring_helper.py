@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.core.rules import compile_rule
+from app.helpers.offline_scoring_helper import PointInTimeScorer
+from app.models.tables.account_model import Account
+from app.models.tables.customer_model import Customer
+from app.models.tables.transaction_model import Transaction
+
+velocity_rule = compile_rule(
+    "velocity",
+    [
+        {
+            "filter": {
+                "field": "",
+                "transform": "!count_same_trx_by_channel_user_in_last_in_period",
+                "params": {"channel": ["IBK"], "interval_minutes": 10},
+                "op": "gte",
+                "value": 1,
+            }
+        }
+    ],
+)
+new_destination_rule = compile_rule(
+    "new_destination",
+    [
+        {
+            "filter": {
+                "field": "",
+                "transform": "!destination_account_frequency",
+                "op": "eq",
+                "value": 0,
+            }
+        }
+    ],
+)
+dawn_rule = compile_rule(
+    "dawn",
+    [
+        {
+            "filter": {
+                "field": "created_at",
+                "transform": "!time",
+                "op": "lte",
+                "value": {"hour": 5, "minute": 0, "second": 0},
+            }
+        }
+    ],
+)
+
+account = Account(id=1, customer_rel=Customer(id=1, name="x", age=30))
+
+
+def make_transaction(created_at, destination=2, channel=2):
+    return Transaction(
+        id=str(created_at),
+        created_at=created_at,
+        amount=Decimal("100.00"),
+        channel=channel,
+        origin_account_id=1,
+        destination_account_id=destination,
+        origin_account_rel=account,
+        destination_account_rel=account,
+    )
+
+
+def test_retention_covers_the_widest_window():
+    scorer = PointInTimeScorer((velocity_rule, new_destination_rule))
+    assert scorer.retention == timedelta(days=30)
+
+    wide_rule = compile_rule(
+        "wide",
+        [
+            {
+                "filter": {
+                    "field": "",
+                    "transform": "!count_same_trx_by_channel_user_in_last_in_period",
+                    "params": {"channel": ["IBK"], "interval_minutes": 60 * 24 * 60},
+                    "op": "gte",
+                    "value": 1,
+                }
+            }
+        ],
+    )
+    assert PointInTimeScorer((wide_rule,)).retention == timedelta(days=60)
+
+
+def test_matched_rules_sees_only_prior_transactions():
+    scorer = PointInTimeScorer((velocity_rule, new_destination_rule))
+    start = datetime(2024, 1, 1, 12, 0)
+
+    assert scorer.matched_rules(make_transaction(start)) == ["new_destination"]
+    assert scorer.matched_rules(make_transaction(start + timedelta(minutes=5))) == [
+        "velocity"
+    ]
+    assert scorer.matched_rules(make_transaction(start + timedelta(days=31))) == [
+        "new_destination"
+    ]
+
+
+def test_add_builds_history_without_scoring():
+    scorer = PointInTimeScorer((velocity_rule,))
+    start = datetime(2024, 1, 1, 12, 0)
+    scorer.add(make_transaction(start))
+
+    assert scorer.score(make_transaction(start + timedelta(minutes=1))) is True
+    assert scorer.score(make_transaction(start, destination=3)) is False
+
+
+def test_time_conditions_are_anchored_on_transaction_day():
+    scorer = PointInTimeScorer((dawn_rule,))
+
+    assert scorer.score(make_transaction(datetime(2020, 5, 1, 3, 0))) is True
+    assert scorer.score(make_transaction(datetime(2020, 5, 1, 9, 0))) is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
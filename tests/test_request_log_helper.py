@@ -0,0 +1,197 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import bson
+import pytest
+from bson import json_util
+from fastapi import FastAPI
+
+from app.core.request_audit import RequestAuditMiddleware
+from app.helpers.async_request_log_helper import RequestLogWriter
+
+
+def sample_entry(index=0):
+    return {
+        "method": "PUT",
+        "path": "/transaction",
+        "path_params": {},
+        "query_string": b"channel=IBK",
+        "request_body": b'{"amount": %d}' % index,
+        "status": 200,
+        "response_body": b'{"suspect": false}',
+        "duration_ms": 1.5,
+        "created_at": datetime(2025, 1, 1),
+    }
+
+
+def mongo_with(insert_many):
+    database = MagicMock()
+    database.__getitem__.return_value.insert_many = insert_many
+    return patch(
+        "app.helpers.async_request_log_helper.get_async_mongo_db",
+        return_value=database,
+    )
+
+
+def test_writer_batches_entries_by_size_and_on_stop():
+    insert_many = AsyncMock()
+    writer = RequestLogWriter(10, 2, 60, 1)
+
+    async def run():
+        writer.start()
+        for index in range(3):
+            writer.submit(sample_entry(index))
+        await writer.stop()
+
+    with mongo_with(insert_many):
+        asyncio.run(run())
+
+    assert [len(call.args[0]) for call in insert_many.await_args_list] == [2, 1]
+    document = insert_many.await_args_list[0].args[0][1]
+    assert document["params"] == {"query": {"channel": "IBK"}, "body": {"amount": 1}}
+    assert document["response_json"] == {"suspect": False}
+    assert insert_many.await_args_list[0].kwargs == {"ordered": False}
+    assert writer.stats() == {"queued": 0, "written": 3, "spilled": 0, "dropped": 0}
+
+
+def test_writer_flushes_partial_batch_after_interval():
+    insert_many = AsyncMock()
+    writer = RequestLogWriter(10, 100, 0.01, 1)
+
+    async def run():
+        writer.start()
+        writer.submit(sample_entry())
+        await asyncio.sleep(0.1)
+        written = writer.written
+        await writer.stop()
+        return written
+
+    with mongo_with(insert_many):
+        assert asyncio.run(run()) == 1
+
+
+def test_writer_spills_batches_when_mongo_is_slow(tmp_path):
+    async def slow_insert(*_, **__):
+        await asyncio.sleep(10)
+
+    spill_path = tmp_path / "request_log.jsonl"
+    writer = RequestLogWriter(10, 2, 60, 0.01, str(spill_path))
+
+    async def run():
+        writer.start()
+        writer.submit(sample_entry(1))
+        writer.submit(sample_entry(2))
+        await writer.stop()
+
+    with mongo_with(slow_insert):
+        asyncio.run(run())
+
+    lines = spill_path.read_text().splitlines()
+    assert [json_util.loads(line)["params"]["body"] for line in lines] == [
+        {"amount": 1},
+        {"amount": 2},
+    ]
+    assert writer.spilled == 2 and writer.written == 0
+
+
+def test_writer_drops_only_entries_bson_cannot_encode():
+    written = []
+
+    async def insert_many(documents, ordered):
+        for document in documents:
+            bson.encode(document)
+        written.extend(documents)
+
+    writer = RequestLogWriter(10, 2, 60, 1)
+    too_large = dict(sample_entry(), request_body=b'{"amount": %d}' % 2**100)
+
+    async def run():
+        writer.start()
+        writer.submit(sample_entry(1))
+        writer.submit(too_large)
+        writer.submit(sample_entry(2))
+        await writer.stop()
+
+    with mongo_with(insert_many):
+        asyncio.run(run())
+
+    assert [document["params"]["body"] for document in written] == [
+        {"amount": 1},
+        {"amount": 2},
+    ]
+    assert writer.stats() == {"queued": 0, "written": 2, "spilled": 0, "dropped": 1}
+
+
+def test_writer_keeps_running_after_unexpected_error():
+    insert_many = AsyncMock(side_effect=[RuntimeError("boom"), None])
+    writer = RequestLogWriter(10, 1, 60, 1)
+
+    async def run():
+        writer.start()
+        writer.submit(sample_entry(1))
+        writer.submit(sample_entry(2))
+        await writer.stop()
+
+    with mongo_with(insert_many):
+        asyncio.run(run())
+
+    assert writer.dropped == 1 and writer.written == 1
+
+
+def test_submit_drops_entries_when_queue_is_full():
+    writer = RequestLogWriter(2, 10, 60, 1)
+
+    async def run():
+        writer.start()
+        for index in range(5):
+            writer.submit(sample_entry(index))
+        dropped = writer.dropped
+        writer._task.cancel()
+        return dropped
+
+    assert asyncio.run(run()) == 3
+
+
+def test_middleware_submits_call_without_changing_response():
+    app = FastAPI()
+
+    @app.get("/customer/{customer_id}")
+    def get_customer(customer_id: int):
+        return {"id": customer_id}
+
+    writer = MagicMock()
+    audited = RequestAuditMiddleware(app, writer=writer)
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/customer/7",
+        "raw_path": b"/customer/7",
+        "root_path": "",
+        "query_string": b"verbose=1",
+        "headers": [],
+        "server": ("test", 80),
+    }
+    asyncio.run(audited(scope, receive, send))
+
+    assert sent[0]["status"] == 200 and sent[1]["body"] == b'{"id":7}'
+    entry = writer.submit.call_args.args[0]
+    assert entry["method"] == "GET" and entry["status"] == 200
+    assert entry["path_params"] == {"customer_id": "7"}
+    assert entry["query_string"] == b"verbose=1"
+    assert entry["response_body"] == b'{"id":7}'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.constants import ChannelEnum
+from app.core.rules import compile_rule
+from app.helpers.risk_engine_helper import EvaluationContext, RiskEvaluator
+
+COUNT_PARAMS = {
+    "channel": ["IBK", "MBK"],
+    "interval_minutes": 10,
+    "sensibility_variation_percentage": 0.2,
+}
+
+sample_transaction = SimpleNamespace(
+    amount=600,
+    channel=ChannelEnum.IBK,
+    created_at=datetime(2025, 1, 1, 12, 0, 0),
+    origin_account_rel=SimpleNamespace(id=1, customer_rel=SimpleNamespace(age=70)),
+    destination_account_rel=SimpleNamespace(id=2),
+)
+
+velocity_rule = compile_rule(
+    "velocity",
+    [
+        {
+            "filter": {
+                "field": "",
+                "transform": "!count_same_trx_by_channel_user_in_last_in_period",
+                "params": COUNT_PARAMS,
+                "op": "gte",
+                "value": 3,
+            }
+        }
+    ],
+)
+
+
+@pytest.fixture
+def evaluator():
+    risk_evaluator = RiskEvaluator()
+    risk_evaluator.transaction_helper = MagicMock()
+    risk_evaluator.frequency_helper = MagicMock()
+    return risk_evaluator
+
+
+def test_count_similar_transactions_uses_median_band():
+    result = [
+        (ChannelEnum.IBK.value, Decimal("100"), 2, 1, 2),
+        (ChannelEnum.MBK.value, Decimal("110"), 2, 1, 1),
+        (ChannelEnum.IBK.value, Decimal("1000"), 2, 1, 1),
+    ]
+    assert RiskEvaluator.count_similar_transactions(result, COUNT_PARAMS) == 3
+
+
+def test_transform_key():
+    assert RiskEvaluator.transform_key("!time", {}) is None
+    assert RiskEvaluator.transform_key(
+        "!count_same_trx_by_channel_user_in_last_in_period", {"channel": ["IBK"]}
+    ) is None
+    assert RiskEvaluator.transform_key("!destination_account_frequency") == (
+        "!destination_account_frequency",
+    )
+
+
+def test_process_transform_reads_context(evaluator):
+    key = RiskEvaluator.transform_key(
+        "!count_same_trx_by_channel_user_in_last_in_period", COUNT_PARAMS
+    )
+    result = evaluator.process_transform(
+        "!count_same_trx_by_channel_user_in_last_in_period",
+        sample_transaction,
+        3,
+        COUNT_PARAMS,
+        {key: 5},
+    )
+
+    assert result == 5
+    evaluator.transaction_helper.count_transaction_by_user_channel.assert_not_called()
+
+
+def test_process_transform_stores_context(evaluator):
+    evaluator.frequency_helper.get_frequency.return_value = 1
+    context = {}
+
+    for _ in range(2):
+        result = evaluator.process_transform(
+            "!destination_account_frequency", sample_transaction, 2, None, context
+        )
+
+    assert result == 1
+    evaluator.frequency_helper.get_frequency.assert_called_once_with(1, 2)
+
+
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_calculate_risk_with_prefetched(mock_rule_cache, evaluator):
+    mock_rule_cache.get_rules.return_value = (velocity_rule,)
+    key = RiskEvaluator.transform_key(
+        "!count_same_trx_by_channel_user_in_last_in_period", COUNT_PARAMS
+    )
+
+    assert evaluator.calculate_risk(sample_transaction, prefetched={key: 3}) is True
+    assert evaluator.calculate_risk(sample_transaction, prefetched={key: 0}) is False
+    evaluator.transaction_helper.count_transaction_by_user_channel.assert_not_called()
+
+
+def test_count_transform_warms_history_once(evaluator):
+    evaluator.transaction_helper.get_recent_transactions.return_value = [
+        (1, 2, ChannelEnum.IBK.value, Decimal("600"), datetime.now()),
+        (1, 2, ChannelEnum.MBK.value, Decimal("620"), datetime.now()),
+    ]
+
+    for _ in range(2):
+        result = evaluator.process_transform(
+            "!count_same_trx_by_channel_user_in_last_in_period",
+            sample_transaction,
+            3,
+            COUNT_PARAMS,
+        )
+
+    assert result == 2
+    evaluator.transaction_helper.get_recent_transactions.assert_called_once()
+    evaluator.transaction_helper.count_transaction_by_user_channel.assert_not_called()
+
+
+def test_count_transform_wider_than_history_uses_database(evaluator):
+    evaluator.transaction_helper.count_transaction_by_user_channel.return_value = [
+        (ChannelEnum.IBK.value, Decimal("600"), 2, 1, 3)
+    ]
+    params = dict(COUNT_PARAMS, interval_minutes=10**7)
+
+    result = evaluator.process_transform(
+        "!count_same_trx_by_channel_user_in_last_in_period",
+        sample_transaction,
+        3,
+        params,
+    )
+
+    assert result == 3
+    evaluator.transaction_helper.get_recent_transactions.assert_not_called()
+
+
+def wide_velocity_rule(name, channels, interval_minutes, value):
+    return compile_rule(
+        name,
+        [
+            {
+                "filter": {
+                    "field": "",
+                    "transform": "!count_same_trx_by_channel_user_in_last_in_period",
+                    "params": {
+                        "channel": channels,
+                        "interval_minutes": interval_minutes,
+                    },
+                    "op": "gte",
+                    "value": value,
+                }
+            }
+        ],
+    )
+
+
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_calculate_risk_reads_widest_history_once(mock_rule_cache, evaluator):
+    mock_rule_cache.get_rules.return_value = (
+        wide_velocity_rule("ibk", ["IBK"], 10**7, 3),
+        wide_velocity_rule("mbk", ["IBK", "MBK"], 2 * 10**7, 4),
+    )
+    evaluator.transaction_helper.get_recent_transactions.return_value = [
+        (1, 2, ChannelEnum.IBK.value, Decimal("600"), datetime.now()),
+        (1, 2, ChannelEnum.MBK.value, Decimal("620"), datetime.now()),
+    ]
+
+    assert evaluator.calculate_risk(sample_transaction) is False
+
+    evaluator.transaction_helper.get_recent_transactions.assert_called_once()
+    _, lookback, channels = (
+        evaluator.transaction_helper.get_recent_transactions.call_args.args
+    )
+    assert datetime.now() - lookback > timedelta(minutes=2 * 10**7 - 1)
+    assert channels == {ChannelEnum.IBK.value, ChannelEnum.MBK.value}
+    evaluator.transaction_helper.count_transaction_by_user_channel.assert_not_called()
+
+
+def test_count_in_history_matches_database_count():
+    now = datetime.now()
+    rows = [
+        (1, 2, ChannelEnum.IBK.value, Decimal("100"), now),
+        (1, 2, ChannelEnum.IBK.value, Decimal("100"), now),
+        (1, 2, ChannelEnum.MBK.value, Decimal("110"), now),
+        (1, 2, ChannelEnum.IBK.value, Decimal("1000"), now),
+        (1, 2, ChannelEnum.IBK.value, Decimal("100"), now - timedelta(minutes=20)),
+    ]
+    assert RiskEvaluator.count_in_history(rows, COUNT_PARAMS) == 3
+
+
+def test_time_transform_is_memoized(evaluator):
+    context = EvaluationContext()
+    first = evaluator.process_transform("!time", None, {"hour": 6}, None, context)
+    second = evaluator.process_transform("!time", None, {"hour": 6}, None, context)
+
+    assert first is second
+    assert first.hour == 6
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
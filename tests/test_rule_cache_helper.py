@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from app.helpers.rule_cache_helper import RuleCache
+
+high_amount_rule = SimpleNamespace(
+    name="high_amount",
+    conditions=[{"filter": {"field": "amount", "op": "gte", "value": 10000}}],
+)
+low_amount_rule = SimpleNamespace(
+    name="low_amount",
+    conditions=[{"filter": {"field": "amount", "op": "lte", "value": 1}}],
+)
+
+
+@pytest.fixture
+def rule_cache():
+    cache = RuleCache(refresh_interval=1, watch_changes=False)
+    cache.mongo_helper = MagicMock()
+    cache.mongo_helper.find_documents.return_value = [high_amount_rule]
+    return cache
+
+
+def test_get_rules_loads_once(rule_cache):
+    first = rule_cache.get_rules()
+    second = rule_cache.get_rules()
+
+    assert first is second
+    assert [rule.name for rule in first] == ["high_amount"]
+    rule_cache.mongo_helper.find_documents.assert_called_once()
+
+
+def test_refresh_changes_version(rule_cache):
+    assert rule_cache.refresh() is True
+    version = rule_cache.version
+
+    assert rule_cache.refresh() is False
+    assert rule_cache.version == version
+
+    rule_cache.mongo_helper.find_documents.return_value = [
+        high_amount_rule,
+        low_amount_rule,
+    ]
+    assert rule_cache.refresh() is True
+    assert rule_cache.version != version
+    assert [item["name"] for item in rule_cache.get_documents()] == [
+        "high_amount",
+        "low_amount",
+    ]
+
+
+def test_refresh_failure_keeps_rules(rule_cache):
+    rule_cache.refresh()
+    rules = rule_cache.get_rules()
+    rule_cache.mongo_helper.find_documents.side_effect = PyMongoError("down")
+
+    with pytest.raises(PyMongoError):
+        rule_cache.refresh()
+
+    assert rule_cache.get_rules() is rules
+
+
+def test_get_rules_async_loads_cold_cache_in_a_thread(rule_cache):
+    threads = []
+
+    def find_documents(_):
+        threads.append(threading.current_thread())
+        return [high_amount_rule]
+
+    rule_cache.mongo_helper.find_documents.side_effect = find_documents
+
+    rules = asyncio.run(rule_cache.get_rules_async())
+
+    assert [rule.name for rule in rules] == ["high_amount"]
+    assert threads and threads[0] is not threading.main_thread()
+    assert asyncio.run(rule_cache.get_rules_async()) is rules
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
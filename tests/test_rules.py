@@ -0,0 +1,233 @@
+import random
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.constants import ChannelEnum
+from app.core.rules import (
+    ConditionOrder,
+    RuleCompilationError,
+    compile_condition,
+    compile_rule,
+    get_compiled_rule,
+    get_rule_set_order,
+)
+from app.helpers.risk_engine_helper import RiskEvaluator
+
+sample_transaction = SimpleNamespace(
+    amount=15000,
+    channel=ChannelEnum.ATM,
+    created_at=datetime(2025, 1, 1, 3, 0, 0),
+    origin_account_rel=SimpleNamespace(id=1, customer_rel=SimpleNamespace(age=70)),
+    destination_account_rel=SimpleNamespace(id=2),
+)
+
+
+@pytest.fixture
+def evaluator():
+    return RiskEvaluator()
+
+
+def test_compile_leaf_compare(evaluator):
+    predicate = compile_condition({"field": "amount", "op": "gte", "value": 10000})
+    assert predicate(evaluator, sample_transaction, {}) is True
+
+
+def test_compile_channel_names(evaluator):
+    eq_predicate = compile_condition({"field": "channel", "op": "eq", "value": "ATM"})
+    in_predicate = compile_condition(
+        {"field": "channel", "op": "in", "value": ["IBK", "MBK"]}
+    )
+    assert eq_predicate(evaluator, sample_transaction, {}) is True
+    assert in_predicate(evaluator, sample_transaction, {}) is False
+
+
+def test_compile_dotted_field(evaluator):
+    predicate = compile_condition(
+        {"field": "origin_account_rel.customer_rel.age", "op": "gte", "value": 60}
+    )
+    assert predicate(evaluator, sample_transaction, {}) is True
+
+
+def test_dotted_field_through_missing_relation_is_false(evaluator):
+    predicate = compile_condition(
+        {
+            "and": [
+                {"field": "amount", "op": "gte", "value": 10000},
+                {
+                    "field": "origin_account_rel.customer_rel.age",
+                    "op": "gte",
+                    "value": 60,
+                },
+            ]
+        }
+    )
+    without_customer = SimpleNamespace(
+        amount=15000, origin_account_rel=SimpleNamespace(id=1, customer_rel=None)
+    )
+    without_age = SimpleNamespace(
+        amount=15000,
+        origin_account_rel=SimpleNamespace(
+            id=1, customer_rel=SimpleNamespace(age=None)
+        ),
+    )
+
+    assert predicate(evaluator, without_customer, {}) is False
+    assert predicate(evaluator, without_age, {}) is False
+
+
+def test_compile_and_or(evaluator):
+    predicate = compile_condition(
+        {
+            "or": [
+                {"field": "amount", "op": "lt", "value": 100},
+                {
+                    "and": [
+                        {"field": "channel", "op": "eq", "value": "ATM"},
+                        {"field": "amount", "op": "gte", "value": 10000},
+                    ]
+                },
+            ]
+        }
+    )
+    assert predicate(evaluator, sample_transaction, {}) is True
+
+
+def test_compile_transform_uses_evaluator():
+    evaluator = MagicMock()
+    evaluator.process_transform.return_value = 1
+    predicate = compile_condition(
+        {
+            "field": "",
+            "transform": "!destination_account_frequency",
+            "op": "lte",
+            "value": 2,
+        }
+    )
+
+    predicate(evaluator, sample_transaction, {})
+
+    evaluator.process_transform.assert_called_once_with(
+        "!destination_account_frequency", sample_transaction, 2, None, {}
+    )
+    evaluator.compare.assert_called_once_with("lte", 1, 2)
+
+
+def test_compile_invalid_condition():
+    with pytest.raises(RuleCompilationError):
+        compile_condition({"$and": [{"field": "amount", "op": "$gt", "value": 1}]})
+
+
+def test_compile_rule_skips_invalid_blocks():
+    rule = compile_rule(
+        "mixed",
+        [
+            {"filter": {"field": "amount", "op": "gte", "value": 1}},
+            {"filter": {"$and": []}},
+            {"suspect": True},
+        ],
+    )
+    assert len(rule.blocks) == 1
+
+
+def test_get_compiled_rule_cached_by_version():
+    conditions = [{"filter": {"field": "amount", "op": "gte", "value": 1}}]
+    first = get_compiled_rule("cached", conditions)
+    assert get_compiled_rule("cached", conditions) is first
+
+    changed = [{"filter": {"field": "amount", "op": "gte", "value": 2}}]
+    second = get_compiled_rule("cached", changed)
+    assert second is not first
+    assert second.version != first.version
+
+
+def test_compile_runs_field_compare_before_io_transform():
+    evaluator = MagicMock()
+    evaluator.compare.side_effect = RiskEvaluator.compare
+    evaluator.process_transform.return_value = 5
+    predicate = compile_condition(
+        {
+            "and": [
+                {
+                    "field": "",
+                    "transform": "!destination_account_frequency",
+                    "op": "eq",
+                    "value": 0,
+                },
+                {"field": "amount", "op": "lt", "value": 100},
+            ]
+        }
+    )
+
+    assert predicate.order == (1, 0)
+    assert predicate(evaluator, sample_transaction, {}) is False
+    evaluator.process_transform.assert_not_called()
+
+
+def test_condition_order_follows_measured_selectivity():
+    never = MagicMock(return_value=False)
+    always = MagicMock(return_value=True)
+    node = ConditionOrder(
+        [never, always], [1_000, 1_000], True, sample_interval=1, reorder_samples=4
+    )
+
+    for _ in range(4):
+        assert node(None, sample_transaction, {}) is True
+    assert node.order == (1, 0)
+
+    never.reset_mock()
+    assert node(None, sample_transaction, {}) is True
+    never.assert_not_called()
+
+
+def random_tree(rng, depth=0):
+    if depth < 3 and rng.random() < 0.5:
+        key = rng.choice(["and", "or"])
+        return {key: [random_tree(rng, depth + 1) for _ in range(rng.randint(1, 4))]}
+    return {
+        "field": "amount",
+        "op": rng.choice(["eq", "lt", "gt", "gte", "lte"]),
+        "value": rng.randint(0, 10),
+    }
+
+
+def reference(tree, transaction):
+    if "and" in tree:
+        return all(reference(sub, transaction) for sub in tree["and"])
+    if "or" in tree:
+        return any(reference(sub, transaction) for sub in tree["or"])
+    return RiskEvaluator.compare(tree["op"], transaction.amount, tree["value"])
+
+
+def test_condition_order_keeps_outcome(evaluator):
+    rng = random.Random(7)
+    for _ in range(20):
+        tree = random_tree(rng)
+        predicate = compile_condition(tree)
+        for _ in range(1500):
+            transaction = SimpleNamespace(amount=rng.randint(0, 10))
+            assert predicate(evaluator, transaction, {}) == reference(
+                tree, transaction
+            )
+
+
+def test_get_rule_set_order_cached_by_versions():
+    rules = (
+        compile_rule(
+            "small", [{"filter": {"field": "amount", "op": "lt", "value": 1}}]
+        ),
+        compile_rule(
+            "large", [{"filter": {"field": "amount", "op": "gte", "value": 1}}]
+        ),
+    )
+    order = get_rule_set_order(rules)
+    assert get_rule_set_order(list(rules)) is order
+
+    rule, _ = order.first_match(RiskEvaluator(), sample_transaction, {})
+    assert rule.name == "large"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
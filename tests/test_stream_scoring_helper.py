@@ -0,0 +1,67 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.helpers.stream_scoring_helper import StreamScoringHelper, iter_lines
+from app.schemas.transaction_schemas import BatchTransactionResult
+
+sample_line = json.dumps(
+    {
+        "id_da_transacao": "trx",
+        "data_e_hora_da_transacao": 1704070800,
+        "valor_da_transacao": 100.0,
+        "canal": 0,
+        "agencia_de_origem": 1,
+        "conta_de_origem": 10,
+        "agencia_de_destino": 2,
+        "conta_de_destino": 20,
+    }
+)
+
+
+async def as_stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_iter_lines_joins_chunks_and_skips_blank_lines():
+    lines = asyncio.run(collect(iter_lines(as_stream(b'{"a"', b': 1}\n\n{"b": 2}'))))
+    assert lines == [(1, b'{"a": 1}', False), (3, b'{"b": 2}', False)]
+
+
+def test_iter_lines_reports_long_lines():
+    lines = asyncio.run(
+        collect(iter_lines(as_stream(b"x" * 8, b"x" * 8, b"\nok\n"), max_line_bytes=10))
+    )
+    assert lines == [(1, b"", True), (2, b"ok", False)]
+
+
+def test_score_streams_results_in_input_order():
+    helper = StreamScoringHelper(chunk_size=2)
+    helper.batch_helper = AsyncMock()
+    helper.batch_helper.score.side_effect = lambda items: [
+        BatchTransactionResult(id_da_transacao=item.id_da_transacao, suspect=False)
+        for item in items
+    ]
+    body = "\n".join([sample_line, "", "not json", sample_line]).encode()
+
+    results = [
+        json.loads(line)
+        for line in asyncio.run(collect(helper.score(as_stream(body))))
+    ]
+
+    # Numbered as input lines, the blank one included
+    assert [result["line"] for result in results] == [1, 3, 4]
+    assert results[0] == {"line": 1, "id_da_transacao": "trx", "suspect": False}
+    assert "error" in results[1]
+    assert helper.batch_helper.score.await_count == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
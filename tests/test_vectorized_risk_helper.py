@@ -0,0 +1,166 @@
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.core.constants import ChannelEnum
+from app.core.rules import compile_rule
+from app.helpers.offline_scoring_helper import OfflineRiskEvaluator
+from app.helpers.risk_engine_helper import RiskEvaluator
+from app.helpers.vectorized_risk_helper import (
+    TransactionFrame,
+    VectorizedRiskEvaluator,
+    stack_context,
+)
+from app.migrate import INITIAL_RULES
+from app.models.tables.account_model import Account
+from app.models.tables.customer_model import Customer
+from app.models.tables.transaction_model import Transaction
+
+RULES = tuple(
+    compile_rule(name, conditions) for name, conditions in INITIAL_RULES.items()
+)
+
+
+def random_batch(size, seed=7):
+    generator = random.Random(seed)
+    day = datetime(2024, 5, 10)
+    transactions = []
+    contexts = []
+    for index in range(size):
+        origin = Account(
+            id=1,
+            customer_rel=Customer(id=1, name="x", age=generator.randint(18, 90)),
+        )
+        transactions.append(
+            Transaction(
+                id=str(index),
+                created_at=day + timedelta(seconds=generator.randint(0, 86399)),
+                amount=Decimal(generator.choice(["9999.99", "10000.00", "500.00"]))
+                + Decimal(generator.randint(0, 1000)),
+                channel=generator.choice(list(ChannelEnum)),
+                origin_account_id=1,
+                destination_account_id=2,
+                origin_account_rel=origin,
+                destination_account_rel=origin,
+            )
+        )
+        contexts.append(
+            {
+                RiskEvaluator.transform_key(transform, params): generator.randint(0, 6)
+                for rule in RULES
+                for transform, params in rule.transforms
+                if RiskEvaluator.transform_key(transform, params) is not None
+            }
+        )
+    return transactions, contexts
+
+
+def vectorized_risk(evaluator, transactions, contexts):
+    frame = TransactionFrame.from_transactions(
+        transactions, VectorizedRiskEvaluator.fields(RULES)
+    )
+    return evaluator.calculate_risk(
+        RULES, frame, stack_context(contexts, len(transactions))
+    ).tolist()
+
+
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_offline_results_match_calculate_risk(mock_rule_cache):
+    mock_rule_cache.get_rules.return_value = RULES
+    transactions, contexts = random_batch(500)
+    evaluator = OfflineRiskEvaluator()
+
+    expected = [
+        evaluator.calculate_risk(transaction, prefetched=context)
+        for transaction, context in zip(transactions, contexts)
+    ]
+
+    assert vectorized_risk(
+        VectorizedRiskEvaluator(offline=True), transactions, contexts
+    ) == expected
+    assert any(expected) and not all(expected)
+
+
+@patch("app.helpers.risk_engine_helper.rule_cache")
+def test_online_results_match_calculate_risk(mock_rule_cache):
+    mock_rule_cache.get_rules.return_value = RULES
+    transactions, contexts = random_batch(200, seed=3)
+    for transaction in transactions:
+        transaction.created_at = datetime.combine(
+            date.today(), transaction.created_at.time()
+        )
+
+    expected = [
+        RiskEvaluator().calculate_risk(transaction, prefetched=context)
+        for transaction, context in zip(transactions, contexts)
+    ]
+
+    result = vectorized_risk(VectorizedRiskEvaluator(), transactions, contexts)
+    assert result == expected
+
+
+def test_decimal_columns_compare_exactly():
+    rule = compile_rule(
+        "cents", [{"filter": {"field": "amount", "op": "gte", "value": 0.29}}]
+    )
+    transactions = [
+        Transaction(amount=Decimal("0.28")),
+        Transaction(amount=Decimal("0.29")),
+        Transaction(amount=Decimal("0.30")),
+    ]
+    frame = TransactionFrame.from_transactions(transactions, ["amount"])
+
+    masks = VectorizedRiskEvaluator().rule_masks((rule,), frame, {})
+
+    assert frame.scales == {"amount": 2}
+    assert masks["cents"].tolist() == [
+        transaction.amount >= 0.29 for transaction in transactions
+    ]
+
+
+def test_missing_values_never_match():
+    rule = compile_rule(
+        "age",
+        [
+            {
+                "filter": {
+                    "field": "origin_account_rel.customer_rel.age",
+                    "op": "lte",
+                    "value": 30,
+                }
+            }
+        ],
+    )
+    transactions = [
+        Transaction(origin_account_rel=Account(customer_rel=Customer(age=20))),
+        Transaction(origin_account_rel=Account(customer_rel=Customer(age=None))),
+        Transaction(origin_account_rel=Account(customer_rel=Customer(age=40))),
+    ]
+    frame = TransactionFrame.from_transactions(
+        transactions, VectorizedRiskEvaluator.fields((rule,))
+    )
+
+    mask = VectorizedRiskEvaluator().calculate_risk((rule,), frame, {})
+
+    assert mask.tolist() == [True, False, False]
+    assert frame.columns["origin_account_rel.customer_rel.age"].dtype == np.float64
+
+
+def test_missing_transform_results_raise():
+    rule = compile_rule(
+        "new_destination", INITIAL_RULES["high_value_account_destination_not_frequent"]
+    )
+    frame = TransactionFrame.from_transactions(
+        [Transaction(amount=Decimal("1"))], ["amount"]
+    )
+
+    with pytest.raises(KeyError):
+        VectorizedRiskEvaluator().calculate_risk((rule,), frame, {})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])